@@ -4,24 +4,127 @@ Créé avec FastAPI pour être utilisé avec n8n et autres outils d'automatisati
 """
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field, field_validator, model_validator
+from contextlib import asynccontextmanager
+from typing import List, Optional, Dict, Any, AsyncIterator
+import asyncio
+import json
 import os
-from dotenv import load_dotenv
 
-from youtube_api import get_transcript_from_url
-from title_generator import generate_titles, generate_titles_from_description
+from cache import get_transcript_cache, get_result_cache
+from circuit import circuit_breaker_stats
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, render_metrics
+from clients import aclose_clients, prewarm_clients
+from config import env_bool, env_float, env_int, load_env
+from jobs import JobManager, create_job_manager, validate_callback_url
+from logging_config import configure_logging, get_logger, log_context
+
+from youtube_api import (
+    MAX_IDS_PER_REQUEST, TRANSCRIPT_API_URL, get_transcript_from_url_async, get_transcripts_async, extract_video_id
+)
+from title_generator import (
+    generate_titles_async,
+    generate_titles_from_description_async,
+    stream_titles_async,
+    stream_titles_from_description_async,
+)
+from prompt_registry import get_prompt_registry, DEFAULT_PROMPT_NAME
+from ratelimit import rate_limiter_stats
+from singleflight import single_flight_stats
+from title_history import DEFAULT_CHANNEL, get_title_history
+from word_balance import rerank, score_titles
 
 # Charger les variables d'environnement
-load_dotenv()
+load_env()
+
+# Logs JSON par défaut (LOG_FORMAT=text pour le format lisible), niveau LOG_LEVEL
+configure_logging(default_format="json")
+logger = get_logger("api")
+
+# Limites du endpoint /generate-titles/batch
+BATCH_MAX_ITEMS = env_int("BATCH_MAX_ITEMS", 100)
+BATCH_CONCURRENCY = env_int("BATCH_CONCURRENCY", 4)
+
+# Nombre maximal de titres notés par appel à /score-titles
+SCORE_MAX_TITLES = env_int("SCORE_MAX_TITLES", 5000)
+
+# Préchauffage au démarrage (PREWARM_CONNECTIONS=1) : SDK importés et connexions ouvertes
+# vers youtube-transcript.io et Anthropic avant la première requête (hébergeurs qui
+# endorment le service). Chaque connexion est abandonnée après PREWARM_TIMEOUT secondes
+PREWARM_CONNECTIONS = env_bool("PREWARM_CONNECTIONS", False)
+PREWARM_TIMEOUT = env_float("PREWARM_TIMEOUT", 5.0)
+
+# Gestionnaire des tâches asynchrones (/jobs), créé au démarrage de l'API
+job_manager: Optional[JobManager] = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Cycle de vie de l'API : préchauffe les connexions (PREWARM_CONNECTIONS), démarre les
+    workers des tâches (/jobs) et reprend les tâches non terminées ; à l'arrêt, stoppe
+    les workers et ferme les clients partagés
+    """
+    global job_manager
+    if PREWARM_CONNECTIONS:
+        warmed = await prewarm_clients(os.getenv("ANTHROPIC_API_KEY"), {"youtube": TRANSCRIPT_API_URL},
+                                       timeout=PREWARM_TIMEOUT)
+        logger.info("Connexions préchauffées", extra={"prewarm": warmed})
+    job_manager = create_job_manager(_run_job)
+    await job_manager.start()
+    logger.info("API démarrée", extra={"job_workers": job_manager.max_workers})
+    yield
+    await job_manager.stop()
+    job_manager.store.close()
+    await aclose_clients()
+
 
 # Créer l'application FastAPI
 app = FastAPI(
     title="YouTube Title Generator API",
     description="API pour générer des titres YouTube optimisés avec Claude AI",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+
+class RequestContextMiddleware:
+    """
+    Middleware ASGI : associe un request_id et un correlation_id à tous les logs d'une
+    requête (transcription comme génération, streaming compris) et les renvoie dans les
+    en-têtes X-Request-ID / X-Correlation-ID. Un client (ex: n8n) peut fournir son propre
+    X-Correlation-ID pour relier plusieurs appels.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1")[:128] or None
+        correlation_id = headers.get(b"x-correlation-id", b"").decode("latin-1")[:128] or None
+
+        with log_context(request_id=request_id, correlation_id=correlation_id) as context:
+            response_headers = [
+                (b"x-request-id", context["request_id"].encode("latin-1")),
+                (b"x-correlation-id", context["correlation_id"].encode("latin-1")),
+            ]
+
+            async def send_with_ids(message):
+                if message["type"] == "http.response.start":
+                    message = {**message, "headers": list(message.get("headers", [])) + response_headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_ids)
+
+
+app.add_middleware(RequestContextMiddleware)
+
 # Configurer CORS pour permettre les requêtes depuis n'importe où
 app.add_middleware(
     CORSMiddleware,
@@ -29,6 +132,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "X-Correlation-ID"],
 )
 
 
@@ -36,12 +140,17 @@ app.add_middleware(
 class GenerateTitlesRequest(BaseModel):
     youtube_url: str = Field(..., description="URL complète de la vidéo YouTube")
     num_titles: int = Field(default=5, ge=1, le=10, description="Nombre de titres à générer (1-10)")
+    force_refresh: bool = Field(default=False, description="Ignorer le cache et régénérer les titres")
+    prompt: Optional[str] = Field(default=None, description="Nom du system prompt à utiliser (fichier prompts/<nom>.txt)")
+    languages: Optional[List[str]] = Field(default=None, description="Langues de transcription préférées, par ordre (ex: [\"fr\", \"en\"])")
+    channel: Optional[str] = Field(default=None, max_length=200, description="Chaîne YouTube : les titres sont comparés à son historique (quasi-doublons signalés)")
 
     class Config:
         json_schema_extra = {
             "example": {
                 "youtube_url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
-                "num_titles": 5
+                "num_titles": 5,
+                "channel": "ma-chaine"
             }
         }
 
@@ -49,6 +158,9 @@ class GenerateTitlesRequest(BaseModel):
 class GenerateFromDescriptionRequest(BaseModel):
     description: str = Field(..., min_length=10, description="Description du contenu de la vidéo")
     num_titles: int = Field(default=5, ge=1, le=10, description="Nombre de titres à générer (1-10)")
+    force_refresh: bool = Field(default=False, description="Ignorer le cache et régénérer les titres")
+    prompt: Optional[str] = Field(default=None, description="Nom du system prompt à utiliser (fichier prompts/<nom>.txt)")
+    channel: Optional[str] = Field(default=None, max_length=200, description="Chaîne YouTube : les titres sont comparés à son historique (quasi-doublons signalés)")
 
     class Config:
         json_schema_extra = {
@@ -59,12 +171,34 @@ class GenerateFromDescriptionRequest(BaseModel):
         }
 
 
+class SimilarTitle(BaseModel):
+    title: str = Field(..., description="Titre déjà présent dans l'historique de la chaîne")
+    similarity: float = Field(..., description="Similarité de Jaccard (4-grammes de caractères, 0-1)")
+    created_at: float
+
+
+class TitleDetail(BaseModel):
+    title: str
+    score: Optional[float] = Field(default=None, description="Score de performance estimé sur 10 par Claude")
+    analysis: Optional[str] = Field(default=None, description="Analyse du titre (Word Balance, justification)")
+    local_score: Optional[float] = Field(default=None, description="Note Word Balance sur 10, calculée localement")
+    word_balance: Optional[Dict[str, float]] = Field(default=None, description="% de mots communs, peu communs, émotionnels et de pouvoir")
+    similar_to: Optional[List[SimilarTitle]] = Field(default=None, description="Titres proches déjà utilisés sur la chaîne (vide si aucun)")
+
+
 class GenerateTitlesResponse(BaseModel):
     success: bool
     titles: Optional[List[str]] = None
+    scores: Optional[List[Optional[float]]] = None
+    local_scores: Optional[List[float]] = None
+    details: Optional[List[TitleDetail]] = None
+    filtered_titles: Optional[List[str]] = Field(default=None, description="Quasi-doublons retirés (TITLE_HISTORY_MODE=filter)")
     analysis: Optional[str] = None
     error: Optional[str] = None
     transcript_length: Optional[int] = None
+    usage: Optional[Dict[str, int]] = None
+    cached: bool = False
+    prompt: Optional[str] = None
 
     class Config:
         json_schema_extra = {
@@ -75,18 +209,264 @@ class GenerateTitlesResponse(BaseModel):
                     "Comment gagner 1000€/mois avec cette méthode simple",
                     "Le secret pour réussir en 2024 (révélé)"
                 ],
-                "analysis": "Analyse Word Balance et scores...",
+                "scores": [8, 7.5, 7],
+                "local_scores": [7.6, 8.1, 7.4],
+                "details": [
+                    {"title": "🔥 Top 5 des astuces que PERSONNE ne connaît !", "score": 8,
+                     "analysis": "Communs 30 %, émotionnels 10 %, pouvoir : PERSONNE", "local_score": 7.6,
+                     "word_balance": {"common": 33.3, "uncommon": 0.0, "emotional": 0.0, "power": 11.1}}
+                ],
+                "analysis": "Vidéo pratique orientée débutants : titres axés sur le bénéfice...",
                 "transcript_length": 15430,
-                "error": None
+                "error": None,
+                "usage": {
+                    "input_tokens": 812,
+                    "output_tokens": 950,
+                    "cache_creation_input_tokens": 0,
+                    "cache_read_input_tokens": 1024
+                },
+                "cached": False
+            }
+        }
+
+
+class ScoreTitlesRequest(BaseModel):
+    titles: List[str] = Field(..., min_length=1, max_length=SCORE_MAX_TITLES, description="Titres à noter")
+    rerank: bool = Field(default=True, description="Classer par note décroissante (et retirer les doublons)")
+    limit: Optional[int] = Field(default=None, ge=1, description="Ne garder que les N meilleurs titres (avec rerank)")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "titles": [
+                    "Le secret que les dentistes ne veulent pas révéler (choquant)",
+                    "Comment j'ai tout perdu"
+                ],
+                "limit": 1
             }
         }
 
 
+class ScoredTitle(BaseModel):
+    title: str
+    score: float = Field(..., description="Note Word Balance sur 10")
+    word_balance: Dict[str, float] = Field(..., description="% de mots communs, peu communs, émotionnels et de pouvoir")
+    power_words: List[str]
+    emotional_words: List[str]
+    length: int = Field(..., description="Longueur en caractères")
+    issues: List[str] = Field(..., description="Règles non respectées (pas de mot de pouvoir, trop long...)")
+
+
+class ScoreTitlesResponse(BaseModel):
+    results: List[ScoredTitle]
+
+
 class HealthResponse(BaseModel):
     status: str
     message: str
 
 
+class JobRequest(BaseModel):
+    youtube_url: Optional[str] = Field(default=None, description="URL complète de la vidéo YouTube")
+    description: Optional[str] = Field(default=None, min_length=10, description="Description du contenu de la vidéo")
+    num_titles: int = Field(default=5, ge=1, le=10, description="Nombre de titres à générer (1-10)")
+    force_refresh: bool = Field(default=False, description="Ignorer le cache et régénérer les titres")
+    prompt: Optional[str] = Field(default=None, description="Nom du system prompt à utiliser (fichier prompts/<nom>.txt)")
+    languages: Optional[List[str]] = Field(default=None, description="Langues de transcription préférées, par ordre (ex: [\"fr\", \"en\"])")
+    callback_url: Optional[str] = Field(default=None, description="URL appelée en POST (JSON) quand la tâche est terminée")
+    channel: Optional[str] = Field(default=None, max_length=200, description="Chaîne YouTube : les titres sont comparés à son historique (quasi-doublons signalés)")
+
+    @model_validator(mode="after")
+    def check_source(self):
+        if bool(self.youtube_url) == bool(self.description):
+            raise ValueError("Fournissez soit youtube_url, soit description (un seul des deux)")
+        return self
+
+    @field_validator("callback_url")
+    @classmethod
+    def check_callback_url(cls, value: Optional[str]) -> Optional[str]:
+        # Refusée dès la soumission (422) plutôt qu'en échec d'envoi à la fin de la tâche
+        return validate_callback_url(value) if value else None
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "youtube_url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+                "num_titles": 5,
+                "callback_url": "https://votre-n8n.com/webhook/titres-prets"
+            }
+        }
+
+
+class BatchItem(BaseModel):
+    id: Optional[str] = Field(default=None, description="Identifiant libre renvoyé tel quel (ex: numéro de ligne)")
+    youtube_url: Optional[str] = Field(default=None, description="URL complète de la vidéo YouTube")
+    description: Optional[str] = Field(default=None, min_length=10, description="Description du contenu de la vidéo")
+
+    @model_validator(mode="after")
+    def check_source(self):
+        if bool(self.youtube_url) == bool(self.description):
+            raise ValueError("Fournissez soit youtube_url, soit description (un seul des deux)")
+        return self
+
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS, description="Vidéos à traiter")
+    num_titles: int = Field(default=5, ge=1, le=10, description="Nombre de titres à générer (1-10)")
+    force_refresh: bool = Field(default=False, description="Ignorer le cache et régénérer les titres")
+    prompt: Optional[str] = Field(default=None, description="Nom du system prompt à utiliser (fichier prompts/<nom>.txt)")
+    languages: Optional[List[str]] = Field(default=None, description="Langues de transcription préférées, par ordre (ex: [\"fr\", \"en\"])")
+    channel: Optional[str] = Field(default=None, max_length=200, description="Chaîne YouTube : les titres sont comparés à son historique (quasi-doublons signalés)")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "items": [
+                    {"id": "ligne-2", "youtube_url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ"},
+                    {"id": "ligne-3", "description": "Une vidéo sur la conservation des aliments sans électricité"}
+                ],
+                "num_titles": 5
+            }
+        }
+
+
+class StatsResponse(BaseModel):
+    single_flight: Dict[str, Dict[str, int]] = Field(..., description="Appels reçus, regroupés et en cours, par étape")
+    rate_limits: Dict[str, Dict[str, Any]] = Field(..., description="Débit courant, attentes et 429 reçus, par service amont")
+    circuit_breakers: Dict[str, Dict[str, Any]] = Field(..., description="État des disjoncteurs (closed, open, half_open), par service amont")
+    caches: Dict[str, Optional[Dict[str, Any]]] = Field(..., description="Statistiques des caches (null si désactivé)")
+    title_history: Optional[Dict[str, Any]] = Field(default=None, description="Titres enregistrés, recherches et quasi-doublons trouvés (null si désactivé)")
+
+
+class TitleHistoryRequest(BaseModel):
+    titles: List[str] = Field(..., min_length=1, max_length=SCORE_MAX_TITLES, description="Titres publiés à enregistrer")
+    channel: Optional[str] = Field(default=None, max_length=200, description="Chaîne YouTube (défaut: historique commun)")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "channel": "ma-chaine",
+                "titles": ["Le secret que les dentistes ne veulent pas révéler (choquant)"]
+            }
+        }
+
+
+class TitleHistoryResponse(BaseModel):
+    added: int = Field(..., description="Titres ajoutés (les titres déjà connus sont ignorés)")
+    total: int = Field(..., description="Titres enregistrés pour la chaîne")
+
+
+class JobResponse(BaseModel):
+    job_id: str
+    status: str = Field(..., description="queued, running, succeeded ou failed")
+    created_at: float
+    updated_at: float
+    result: Optional[GenerateTitlesResponse] = None
+    error: Optional[str] = None
+    callback_url: Optional[str] = None
+    callback_status: Optional[str] = None
+
+
+class PromptsResponse(BaseModel):
+    prompts: List[str]
+    default: str
+
+
+def _response_from_result(result: Dict[str, Any], transcript_length: Optional[int]) -> GenerateTitlesResponse:
+    """Convertit le dict retourné par title_generator en réponse de l'API"""
+    titles = result.get("titles", [])
+    raw_response = result.get("raw_response", "")
+
+    if not titles:
+        return GenerateTitlesResponse(
+            success=False,
+            titles=None,
+            analysis=None,
+            error=result.get("error") or "Impossible de générer les titres avec Claude AI",
+            transcript_length=transcript_length
+        )
+
+    # Succès ! (sortie structurée : scores et analyse par titre ; sinon texte brut en analyse)
+    return GenerateTitlesResponse(
+        success=True,
+        titles=titles,
+        scores=result.get("scores"),
+        local_scores=result.get("local_scores"),
+        details=result.get("details"),
+        filtered_titles=result.get("filtered_titles"),
+        analysis=result.get("analysis") or raw_response or None,
+        error=None,
+        transcript_length=transcript_length,
+        usage=result.get("usage"),
+        cached=result.get("cached", False),
+        prompt=result.get("prompt_name")
+    )
+
+
+async def _titles_for_url(youtube_url: str, anthropic_api_key: str, num_titles: int = 5,
+                          force_refresh: bool = False, prompt: Optional[str] = None,
+                          languages: Optional[List[str]] = None,
+                          channel: Optional[str] = None) -> GenerateTitlesResponse:
+    """Pipeline complet pour une URL : transcription puis génération des titres"""
+    # Étape 1: Récupérer la transcription
+    transcript, error = await get_transcript_from_url_async(youtube_url, languages=languages)
+
+    if not transcript:
+        return GenerateTitlesResponse(
+            success=False,
+            titles=None,
+            error=error or "Impossible de récupérer la transcription",
+            transcript_length=None
+        )
+
+    # Étape 2: Générer les titres
+    result = await generate_titles_async(
+        transcript,
+        anthropic_api_key,
+        num_titles=num_titles,
+        force_refresh=force_refresh,
+        prompt_name=prompt,
+        channel=channel
+    )
+
+    return _response_from_result(result, len(transcript))
+
+
+async def _titles_for_description(description: str, anthropic_api_key: str, num_titles: int = 5,
+                                  force_refresh: bool = False, prompt: Optional[str] = None,
+                                  channel: Optional[str] = None) -> GenerateTitlesResponse:
+    """Génération des titres depuis une description"""
+    result = await generate_titles_from_description_async(
+        description,
+        anthropic_api_key,
+        num_titles=num_titles,
+        force_refresh=force_refresh,
+        prompt_name=prompt,
+        channel=channel
+    )
+
+    return _response_from_result(result, len(description))
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    """Formate un événement Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _sse_events(events: AsyncIterator[Dict[str, Any]], transcript_length: Optional[int]) -> AsyncIterator[str]:
+    """Convertit les événements de title_generator.stream_* en flux SSE"""
+    async for event in events:
+        if event["type"] == "done":
+            response = _response_from_result(event["result"], transcript_length)
+            yield _sse("done", response.model_dump())
+        else:
+            yield _sse(event["type"], {key: value for key, value in event.items() if key != "type"})
+
+
+# En-têtes SSE : pas de mise en cache ni de buffering par un proxy (nginx, Render...)
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
 # Routes
 @app.get("/", response_model=HealthResponse)
 async def root():
@@ -114,6 +494,48 @@ async def health_check():
     }
 
 
+@app.get("/prompts", response_model=PromptsResponse)
+async def list_prompts():
+    """Liste les system prompts disponibles (fichiers du dossier prompts/)"""
+    return {
+        "prompts": get_prompt_registry().list_prompts(),
+        "default": DEFAULT_PROMPT_NAME
+    }
+
+
+@app.get("/stats", response_model=StatsResponse)
+async def get_stats():
+    """
+    Statistiques de fonctionnement : appels identiques simultanés regroupés
+    (single-flight), limiteurs de débit, état des disjoncteurs, efficacité des caches
+    et historique des titres
+    """
+    transcript_cache = get_transcript_cache()
+    result_cache = get_result_cache()
+    history = get_title_history()
+    return {
+        "single_flight": single_flight_stats(),
+        "rate_limits": rate_limiter_stats(),
+        "circuit_breakers": circuit_breaker_stats(),
+        "caches": {
+            "transcripts": transcript_cache.stats() if transcript_cache is not None else None,
+            "results": result_cache.stats() if result_cache is not None else None,
+        },
+        # COUNT(*) sur la table des titres : hors de la boucle d'événements
+        "title_history": await asyncio.to_thread(history.stats) if history is not None else None
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Métriques au format Prometheus : durée de chaque étape (ytg_stage_duration_seconds),
+    codes HTTP des services amont, nouvelles tentatives, ratios de hits des caches
+    et tokens consommés par modèle
+    """
+    return PlainTextResponse(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+
 @app.post("/generate-titles", response_model=GenerateTitlesResponse)
 async def generate_youtube_titles(request: GenerateTitlesRequest):
     """
@@ -121,6 +543,10 @@ async def generate_youtube_titles(request: GenerateTitlesRequest):
 
     - **youtube_url**: URL complète de la vidéo YouTube
     - **num_titles**: Nombre de titres à générer (1-10, défaut: 5)
+    - **force_refresh**: Ignorer le cache et régénérer (défaut: false)
+    - **prompt**: Nom du system prompt à utiliser (voir /prompts, défaut: system_prompt)
+    - **languages**: Langues de transcription préférées, par ordre (ex: ["fr", "en"])
+    - **channel**: Chaîne YouTube ; chaque titre est comparé à son historique (`similar_to`)
 
     Retourne une liste de titres optimisés pour maximiser les vues
     """
@@ -133,47 +559,19 @@ async def generate_youtube_titles(request: GenerateTitlesRequest):
         )
 
     try:
-        # Étape 1: Récupérer la transcription
-        transcript, error = get_transcript_from_url(request.youtube_url)
-
-        if not transcript:
-            return GenerateTitlesResponse(
-                success=False,
-                titles=None,
-                error=error or "Impossible de récupérer la transcription",
-                transcript_length=None
-            )
-
-        # Étape 2: Générer les titres
-        result = generate_titles(
-            transcript,
+        return await _titles_for_url(
+            request.youtube_url,
             anthropic_api_key,
-            num_titles=request.num_titles
-        )
-
-        titles = result.get("titles", [])
-        raw_response = result.get("raw_response", "")
-
-        if not titles:
-            return GenerateTitlesResponse(
-                success=False,
-                titles=None,
-                analysis=None,
-                error="Impossible de générer les titres avec Claude AI",
-                transcript_length=len(transcript)
-            )
-
-        # Succès !
-        return GenerateTitlesResponse(
-            success=True,
-            titles=titles,
-            analysis=raw_response if raw_response else None,
-            error=None,
-            transcript_length=len(transcript)
+            num_titles=request.num_titles,
+            force_refresh=request.force_refresh,
+            prompt=request.prompt,
+            languages=request.languages,
+            channel=request.channel
         )
 
     except Exception as e:
         # Gérer les erreurs inattendues
+        logger.exception("Erreur interne sur /generate-titles")
         raise HTTPException(
             status_code=500,
             detail=f"Erreur interne: {str(e)}"
@@ -187,6 +585,9 @@ async def generate_titles_from_desc(request: GenerateFromDescriptionRequest):
 
     - **description**: Description du contenu de la vidéo (minimum 10 caractères)
     - **num_titles**: Nombre de titres à générer (1-10, défaut: 5)
+    - **force_refresh**: Ignorer le cache et régénérer (défaut: false)
+    - **prompt**: Nom du system prompt à utiliser (voir /prompts, défaut: system_prompt)
+    - **channel**: Chaîne YouTube ; chaque titre est comparé à son historique (`similar_to`)
 
     Retourne une liste de titres optimisés pour maximiser les vues
     """
@@ -199,40 +600,295 @@ async def generate_titles_from_desc(request: GenerateFromDescriptionRequest):
         )
 
     try:
-        # Générer les titres depuis la description
-        result = generate_titles_from_description(
+        return await _titles_for_description(
             request.description,
             anthropic_api_key,
-            num_titles=request.num_titles
+            num_titles=request.num_titles,
+            force_refresh=request.force_refresh,
+            prompt=request.prompt,
+            channel=request.channel
+        )
+
+    except Exception as e:
+        logger.exception("Erreur interne sur /generate-from-description")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur interne: {str(e)}"
         )
 
-        titles = result.get("titles", [])
-        raw_response = result.get("raw_response", "")
 
-        if not titles:
-            return GenerateTitlesResponse(
-                success=False,
-                titles=None,
-                analysis=None,
-                error="Impossible de générer les titres avec Claude AI",
-                transcript_length=None
-            )
+@app.post("/score-titles", response_model=ScoreTitlesResponse)
+async def score_youtube_titles(request: ScoreTitlesRequest):
+    """
+    Note des titres avec la grille Word Balance, localement (sans appel à Claude)
 
-        # Succès !
-        return GenerateTitlesResponse(
-            success=True,
-            titles=titles,
-            analysis=raw_response if raw_response else None,
-            error=None,
-            transcript_length=len(request.description)
+    - **titles**: Titres à noter (jusqu'à SCORE_MAX_TITLES, défaut 5000)
+    - **rerank**: Classer par note décroissante et retirer les doublons (défaut: true)
+    - **limit**: Ne garder que les N meilleurs (avec rerank)
+
+    Retourne la note sur 10 de chaque titre, sa répartition Word Balance et les règles non respectées
+    """
+    # Calcul local rapide, mais exécuté hors de la boucle d'événements pour les gros lots
+    if request.rerank:
+        results = await asyncio.to_thread(rerank, request.titles, request.limit)
+    else:
+        results = await asyncio.to_thread(score_titles, request.titles)
+    return {"results": results}
+
+
+@app.post("/title-history", response_model=TitleHistoryResponse)
+async def add_title_history(request: TitleHistoryRequest):
+    """
+    Enregistre des titres publiés dans l'historique d'une chaîne
+
+    - **titles**: Titres déjà utilisés (les titres générés sont enregistrés automatiquement)
+    - **channel**: Chaîne YouTube (la même que pour /generate-titles)
+
+    Les prochains titres générés pour cette chaîne qui leur ressemblent seront signalés
+    (ou retirés avec TITLE_HISTORY_MODE=filter)
+    """
+    history = get_title_history()
+    if history is None:
+        raise HTTPException(status_code=503, detail="Historique des titres désactivé (TITLE_HISTORY_ENABLED=0)")
+
+    added = await asyncio.to_thread(history.add, request.channel, request.titles, "published")
+    total = await asyncio.to_thread(history.count, request.channel or DEFAULT_CHANNEL)
+    return {"added": added, "total": total}
+
+
+@app.post("/generate-titles/stream")
+async def generate_youtube_titles_stream(request: GenerateTitlesRequest):
+    """
+    Variante streamée de /generate-titles (Server-Sent Events)
+
+    Événements envoyés :
+    - **transcript**: transcription récupérée (`transcript_length`)
+    - **token**: morceau de texte généré par Claude (`text`)
+    - **title**: titre complet dès que sa ligne est terminée (`index`, `title`)
+    - **done**: réponse finale, même format que /generate-titles
+    - **error**: échec de récupération de la transcription (`error`)
+    """
+    anthropic_api_key = os.getenv("ANTHROPIC_API_KEY")
+    if not anthropic_api_key:
+        raise HTTPException(
+            status_code=500,
+            detail="Clé API Anthropic non configurée"
         )
 
-    except Exception as e:
+    async def events():
+        transcript, error = await get_transcript_from_url_async(request.youtube_url, languages=request.languages)
+
+        if not transcript:
+            yield _sse("error", {"error": error or "Impossible de récupérer la transcription"})
+            return
+
+        yield _sse("transcript", {"transcript_length": len(transcript)})
+
+        stream = stream_titles_async(
+            transcript,
+            anthropic_api_key,
+            num_titles=request.num_titles,
+            force_refresh=request.force_refresh,
+            prompt_name=request.prompt,
+            channel=request.channel
+        )
+        async for chunk in _sse_events(stream, len(transcript)):
+            yield chunk
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@app.post("/generate-from-description/stream")
+async def generate_titles_from_desc_stream(request: GenerateFromDescriptionRequest):
+    """
+    Variante streamée de /generate-from-description (Server-Sent Events)
+
+    Événements envoyés : **token**, **title** puis **done** (voir /generate-titles/stream)
+    """
+    anthropic_api_key = os.getenv("ANTHROPIC_API_KEY")
+    if not anthropic_api_key:
         raise HTTPException(
             status_code=500,
-            detail=f"Erreur interne: {str(e)}"
+            detail="Clé API Anthropic non configurée"
         )
 
+    stream = stream_titles_from_description_async(
+        request.description,
+        anthropic_api_key,
+        num_titles=request.num_titles,
+        force_refresh=request.force_refresh,
+        prompt_name=request.prompt,
+        channel=request.channel
+    )
+    return StreamingResponse(
+        _sse_events(stream, len(request.description)),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
+@app.post("/generate-titles/batch")
+async def generate_titles_batch(request: BatchRequest):
+    """
+    Génère des titres pour plusieurs vidéos en un seul appel (ex: Google Sheets)
+
+    - **items**: liste d'objets avec `youtube_url` ou `description` (+ `id` optionnel)
+    - **num_titles**, **force_refresh**, **prompt**, **languages**, **channel**: appliqués à tous les éléments
+
+    Les transcriptions sont récupérées par paquets de 50 IDs (dédupliqués) et chaque vidéo
+    est traitée dès que son paquet arrive ; les descriptions partent tout de suite. Les titres
+    sont générés avec une concurrence limitée (BATCH_CONCURRENCY).
+    La réponse est en NDJSON : une ligne JSON par élément, dans l'ordre de fin de traitement,
+    avec `index` (position dans items), `id` et les champs de /generate-titles.
+    """
+    anthropic_api_key = os.getenv("ANTHROPIC_API_KEY")
+    if not anthropic_api_key:
+        raise HTTPException(
+            status_code=500,
+            detail="Clé API Anthropic non configurée"
+        )
+
+    return StreamingResponse(_batch_lines(request, anthropic_api_key), media_type="application/x-ndjson")
+
+
+async def _batch_lines(request: BatchRequest, anthropic_api_key: str) -> AsyncIterator[str]:
+    """Traite un batch et produit une ligne NDJSON par élément dès qu'il est terminé"""
+    options = {"num_titles": request.num_titles, "force_refresh": request.force_refresh, "prompt_name": request.prompt,
+               "channel": request.channel}
+
+    def line(index: int, response: GenerateTitlesResponse) -> str:
+        item = request.items[index]
+        return json.dumps({"index": index, "id": item.id, **response.model_dump()}, ensure_ascii=False) + "\n"
+
+    # Étape 1: regrouper les éléments identiques (même vidéo ou même description)
+    groups: Dict[tuple, List[int]] = {}
+    for index, item in enumerate(request.items):
+        if item.youtube_url:
+            video_id = extract_video_id(item.youtube_url)
+            if not video_id:
+                yield line(index, GenerateTitlesResponse(
+                    success=False,
+                    error="URL YouTube invalide. Formats acceptés: youtube.com/watch?v=..., youtu.be/..., youtube.com/embed/..."
+                ))
+                continue
+            groups.setdefault(("url", video_id), []).append(index)
+        else:
+            groups.setdefault(("description", item.description), []).append(index)
+
+    # Étape 2: récupérer les transcriptions par paquets (requêtes groupées + cache), en tâche de fond :
+    # chaque vidéo attend seulement son paquet, les descriptions n'attendent rien
+    video_ids = [value for kind, value in groups if kind == "url"]
+    fetch_semaphore = asyncio.Semaphore(max(1, BATCH_CONCURRENCY))
+
+    async def fetch_chunk(chunk: List[str]) -> Dict[str, tuple]:
+        async with fetch_semaphore:
+            return await get_transcripts_async(chunk, languages=request.languages)
+
+    chunk_tasks: Dict[str, asyncio.Task] = {}
+    for start in range(0, len(video_ids), MAX_IDS_PER_REQUEST):
+        chunk = video_ids[start:start + MAX_IDS_PER_REQUEST]
+        task = asyncio.create_task(fetch_chunk(chunk))
+        for video_id in chunk:
+            chunk_tasks[video_id] = task
+
+    # Étape 3: générer avec une concurrence limitée
+    semaphore = asyncio.Semaphore(max(1, BATCH_CONCURRENCY))
+
+    async def process(key: tuple) -> tuple:
+        try:
+            return key, await generate(key)
+        except Exception as e:
+            logger.exception("Erreur interne sur un élément du batch", extra={"item": key[1] if key[0] == "url" else None})
+            return key, GenerateTitlesResponse(success=False, error=f"Erreur interne: {str(e)}")
+
+    async def generate(key: tuple) -> GenerateTitlesResponse:
+        kind, value = key
+        if kind == "url":
+            # Retirée du paquet une fois lue : la mémoire est libérée au fil du batch
+            transcript, error = (await chunk_tasks[value]).pop(value)
+            if not transcript:
+                return GenerateTitlesResponse(
+                    success=False,
+                    error=error or "Impossible de récupérer la transcription"
+                )
+            async with semaphore:
+                result = await generate_titles_async(transcript, anthropic_api_key, **options)
+            return _response_from_result(result, len(transcript))
+
+        async with semaphore:
+            result = await generate_titles_from_description_async(value, anthropic_api_key, **options)
+        return _response_from_result(result, len(value))
+
+    try:
+        for finished in asyncio.as_completed([process(key) for key in groups]):
+            key, response = await finished
+            for index in groups[key]:
+                yield line(index, response)
+    finally:
+        # Client déconnecté : les paquets encore en cours sont abandonnés
+        for task in set(chunk_tasks.values()):
+            task.cancel()
+
+
+async def _run_job(kind: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Exécute une tâche /jobs : même pipeline que les endpoints synchrones"""
+    anthropic_api_key = os.getenv("ANTHROPIC_API_KEY")
+    if not anthropic_api_key:
+        return {"success": False, "error": "Clé API Anthropic non configurée"}
+
+    if kind == "url":
+        response = await _titles_for_url(payload["youtube_url"], anthropic_api_key, **payload["options"])
+    else:
+        response = await _titles_for_description(payload["description"], anthropic_api_key, **payload["options"])
+    return response.model_dump()
+
+
+def _job_response(job: Dict[str, Any]) -> JobResponse:
+    return JobResponse(**{key: value for key, value in job.items() if key in JobResponse.model_fields})
+
+
+@app.post("/jobs", response_model=JobResponse, status_code=202)
+async def create_job(request: JobRequest):
+    """
+    Crée une tâche de génération exécutée en arrière-plan (pour les vidéos longues)
+
+    - **youtube_url** ou **description**: source des titres (un seul des deux)
+    - **num_titles**, **force_refresh**, **prompt**, **languages**, **channel**: comme /generate-titles
+    - **callback_url**: URL appelée en POST avec la tâche terminée (optionnel)
+
+    Retourne immédiatement l'ID de la tâche ; consultez l'état avec GET /jobs/{job_id}
+    """
+    if not os.getenv("ANTHROPIC_API_KEY"):
+        raise HTTPException(
+            status_code=500,
+            detail="Clé API Anthropic non configurée"
+        )
+    if job_manager is None:
+        raise HTTPException(status_code=503, detail="Gestionnaire de tâches non démarré")
+
+    options = {"num_titles": request.num_titles, "force_refresh": request.force_refresh, "prompt": request.prompt,
+               "channel": request.channel}
+    if request.youtube_url:
+        options["languages"] = request.languages
+        job = await job_manager.submit("url", {"youtube_url": request.youtube_url, "options": options}, request.callback_url)
+    else:
+        job = await job_manager.submit("description", {"description": request.description, "options": options}, request.callback_url)
+
+    return _job_response(job)
+
+
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """Retourne l'état d'une tâche et son résultat une fois terminée"""
+    if job_manager is None:
+        raise HTTPException(status_code=503, detail="Gestionnaire de tâches non démarré")
+
+    job = await job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Tâche introuvable")
+
+    return _job_response(job)
+
 
 # Point d'entrée pour le développement local
 if __name__ == "__main__":
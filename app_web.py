@@ -3,10 +3,16 @@ Interface Web pour le Générateur de Titres YouTube
 Lancez avec: streamlit run app_web.py
 """
 import streamlit as st
+import hashlib
 import os
-from dotenv import load_dotenv
-from youtube_api import get_transcript_from_url
-from title_generator import generate_titles, generate_titles_from_description
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Optional
+from youtube_api import extract_video_id, get_transcript
+from title_generator import stream_titles, stream_titles_from_description
+from clients import get_anthropic_client, get_http_session
+from config import env_int, load_env
+from logging_config import configure_logging, is_logging_configured
+from prompt_registry import DEFAULT_PROMPT_NAME, PromptRegistry, get_prompt_registry
 
 # Configuration de la page
 st.set_page_config(
@@ -16,7 +22,163 @@ st.set_page_config(
 )
 
 # Charger les variables d'environnement
-load_dotenv()
+load_env()
+
+# Logs des modules dans la console du serveur (une seule fois, pas à chaque rerun)
+if not is_logging_configured():
+    configure_logging()
+
+# Transcriptions gardées par Streamlit entre les reruns et les sessions (secondes)
+TRANSCRIPT_TTL = env_int("STREAMLIT_TRANSCRIPT_TTL", 3600)
+TRANSCRIPT_MAX_ENTRIES = env_int("STREAMLIT_TRANSCRIPT_MAX_ENTRIES", 100)
+# Threads des préchargements de transcriptions (partagés par toutes les sessions)
+PREFETCH_WORKERS = env_int("STREAMLIT_PREFETCH_WORKERS", 4)
+# Résultats (et préchargements) gardés par session : réaffichés sans régénérer quand les entrées reviennent.
+# Le partage entre sessions est fait par le cache de résultats de title_generator (clé _result_cache_key,
+# mémoire + SQLite) : un st.cache_data en plus le doublerait et sauterait la vérification de l'historique.
+SESSION_MAX_RESULTS = 20
+
+INVALID_URL_ERROR = "URL YouTube invalide. Formats acceptés: youtube.com/watch?v=..., youtu.be/..., youtube.com/embed/..."
+
+
+class TranscriptUnavailable(Exception):
+    """Transcription introuvable : une exception plutôt qu'un retour, pour que st.cache_data ne garde pas l'échec."""
+
+
+@st.cache_resource(show_spinner=False)
+def load_clients(anthropic_api_key: str) -> Dict[str, Any]:
+    """
+    Clients partagés par toutes les sessions : le SDK Anthropic est chargé et les pools de
+    connexions créés une fois par processus, pas au premier clic sur « Générer ».
+    """
+    return {"anthropic": get_anthropic_client(anthropic_api_key), "http": get_http_session()}
+
+
+@st.cache_resource(show_spinner=False)
+def load_prompts() -> PromptRegistry:
+    """Registre des system prompts, prompt par défaut préchargé (relu à chaud s'il change)."""
+    registry = get_prompt_registry()
+    registry.get(DEFAULT_PROMPT_NAME)
+    return registry
+
+
+@st.cache_resource(show_spinner=False)
+def prefetch_executor() -> ThreadPoolExecutor:
+    """Pool des préchargements de transcriptions."""
+    return ThreadPoolExecutor(max_workers=max(1, PREFETCH_WORKERS), thread_name_prefix="transcript-prefetch")
+
+
+@st.cache_data(ttl=TRANSCRIPT_TTL, max_entries=TRANSCRIPT_MAX_ENTRIES, show_spinner=False)
+def fetch_transcript(video_id: str, _api_token: Optional[str], _prefetch: Optional[Future] = None) -> str:
+    """
+    Transcription d'une vidéo, gardée par Streamlit (clé : l'ID de la vidéo).
+    Avec `_prefetch`, attend le préchargement en cours au lieu de refaire la requête.
+    """
+    if _prefetch is not None:
+        transcript, error = _prefetch.result()
+    else:
+        transcript, error = get_transcript(video_id, api_token=_api_token)
+    if not transcript:
+        raise TranscriptUnavailable(error or "Impossible de récupérer la transcription.")
+    return transcript
+
+
+def prefetch_transcript(video_id: str, api_token: Optional[str]) -> None:
+    """
+    Préchargement spéculatif : la transcription est demandée en arrière-plan dès qu'une URL
+    valide est saisie, pour qu'au clic il ne reste que l'appel à Claude. Une seule fois par
+    vidéo et par session ; le thread n'appelle pas Streamlit.
+    """
+    prefetches = st.session_state.setdefault("transcript_prefetch", {})
+    if video_id not in prefetches:
+        prefetches[video_id] = prefetch_executor().submit(get_transcript, video_id, api_token)
+        while len(prefetches) > SESSION_MAX_RESULTS:
+            prefetches.pop(next(iter(prefetches)))
+
+
+def load_transcript(video_id: str, api_token: Optional[str]) -> tuple:
+    """Transcription (cache Streamlit, préchargement en cours, sinon requête) : (texte, erreur)."""
+    prefetches = st.session_state.get("transcript_prefetch", {})
+    try:
+        return fetch_transcript(video_id, api_token, prefetches.get(video_id)), None
+    except TranscriptUnavailable as e:
+        # Échec : le prochain essai refait la requête au lieu de relire ce préchargement
+        prefetches.pop(video_id, None)
+        return None, str(e)
+
+
+def result_key(kind: str, text: str, num_titles: int, prompt_name: Optional[str]) -> str:
+    """Clé d'un résultat dans la session : mêmes entrées, même résultat."""
+    return f"{kind}:{num_titles}:{prompt_name}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+
+def remember_result(key: str, result: Dict[str, Any], **stats: Any) -> None:
+    """Garde un résultat réussi dans la session (les plus anciens sont oubliés)."""
+    results = st.session_state.setdefault("results", {})
+    results.pop(key, None)
+    results[key] = {"result": result, **stats}
+    while len(results) > SESSION_MAX_RESULTS:
+        results.pop(next(iter(results)))
+
+
+def render_stream(events) -> dict:
+    """
+    Affiche la réponse de Claude au fil de l'eau et retourne le résultat final.
+
+    Args:
+        events: Itérateur d'événements de title_generator.stream_*
+
+    Returns:
+        Le dict de résultat (même format que generate_titles)
+    """
+    live_output = st.empty()
+    streamed_text = ""
+    result = {}
+    for event in events:
+        if event["type"] == "token":
+            streamed_text += event["text"]
+            live_output.markdown(streamed_text + "▌")
+        elif event["type"] == "done":
+            result = event["result"]
+    live_output.empty()
+    return result
+
+
+def show_result(result: Dict[str, Any], transcript_chars: Optional[int] = None,
+                transcript_words: Optional[int] = None) -> None:
+    """Affiche les titres générés (ou l'erreur) et, pour une vidéo, les statistiques de la transcription."""
+    titles = result.get("titles", [])
+    raw_response = result.get("raw_response", "")
+    has_custom_prompt = result.get("has_custom_prompt", False)
+
+    if not titles:
+        error_detail = result.get("error", "Erreur inconnue")
+        st.error(f"❌ Impossible de générer les titres: {error_detail}")
+        return
+
+    st.success(f"✅ {len(titles)} titres générés avec succès!")
+    st.markdown("---")
+
+    if has_custom_prompt and raw_response:
+        st.subheader("🎯 Analyse complète des titres")
+        st.markdown(raw_response)
+    else:
+        st.subheader("🎯 Propositions de titres")
+        for i, title in enumerate(titles, 1):
+            st.markdown(f"**{i}.** {title}")
+
+    if transcript_chars is not None:
+        st.markdown("---")
+        with st.expander("📊 Statistiques de la transcription"):
+            col_stat1, col_stat2, col_stat3 = st.columns(3)
+            with col_stat1:
+                st.metric("Caractères", f"{transcript_chars:,}")
+            with col_stat2:
+                st.metric("Mots", f"{transcript_words:,}")
+            with col_stat3:
+                avg_title_len = sum(len(t) for t in titles) // len(titles)
+                st.metric("Longueur moy. titre", f"{avg_title_len} car.")
+
 
 # Titre de l'application
 st.title("🎬 Générateur de Titres YouTube")
@@ -37,6 +199,20 @@ if not anthropic_api_key:
     st.error("❌ Clé API Anthropic non configurée. Configurez ANTHROPIC_API_KEY dans les secrets Streamlit ou dans le fichier .env")
     st.stop()
 
+load_clients(anthropic_api_key)
+
+# System prompt : choix proposé seulement s'il en existe plusieurs (dossier prompts/)
+available_prompts = load_prompts().list_prompts()
+prompt_name = None
+if len(available_prompts) > 1:
+    with st.sidebar:
+        prompt_name = st.selectbox(
+            "🧠 System prompt",
+            available_prompts,
+            index=available_prompts.index(DEFAULT_PROMPT_NAME) if DEFAULT_PROMPT_NAME in available_prompts else 0,
+            help="Fichiers du dossier prompts/"
+        )
+
 # Onglets pour choisir le mode
 tab_url, tab_description = st.tabs(["🔗 Depuis une URL YouTube", "📝 Depuis une description"])
 
@@ -65,18 +241,26 @@ with tab_url:
                 key="num_titles_url"
             )
 
+        video_id = extract_video_id(youtube_url) if youtube_url else None
+        if video_id:
+            prefetch_transcript(video_id, youtube_api_token)
+        url_key = result_key("url", video_id, num_titles_url, prompt_name) if video_id else None
+
         if st.button("✨ Générer les titres", type="primary", use_container_width=True, key="btn_url"):
             if not youtube_url:
                 st.warning("⚠️ Veuillez entrer une URL YouTube")
-            else:
+            elif not video_id:
+                st.error(f"❌ {INVALID_URL_ERROR}")
+            elif url_key not in st.session_state.get("results", {}):
                 progress_bar = st.progress(0)
                 status_text = st.empty()
 
                 status_text.text("📝 Récupération de la transcription...")
                 progress_bar.progress(30)
 
+                # Souvent immédiat : transcription déjà préchargée ou gardée en cache
                 with st.spinner("Extraction de la transcription..."):
-                    transcript, error = get_transcript_from_url(youtube_url)
+                    transcript, error = load_transcript(video_id, youtube_api_token)
 
                 if not transcript:
                     st.error(f"❌ {error or 'Impossible de récupérer la transcription.'}")
@@ -85,41 +269,23 @@ with tab_url:
                 status_text.text("🤖 Génération des titres avec Claude...")
                 progress_bar.progress(60)
 
-                with st.spinner("Analyse par l'IA..."):
-                    result = generate_titles(transcript, anthropic_api_key, num_titles=num_titles_url)
+                # Affichage en direct : les titres apparaissent dès qu'ils sont générés
+                result = render_stream(stream_titles(transcript, anthropic_api_key, num_titles=num_titles_url,
+                                                     prompt_name=prompt_name))
 
                 progress_bar.progress(100)
                 status_text.empty()
 
-                titles = result.get("titles", [])
-                raw_response = result.get("raw_response", "")
-                has_custom_prompt = result.get("has_custom_prompt", False)
-
-                if titles:
-                    st.success(f"✅ {len(titles)} titres générés avec succès!")
-                    st.markdown("---")
-
-                    if has_custom_prompt and raw_response:
-                        st.subheader("🎯 Analyse complète des titres")
-                        st.markdown(raw_response)
-                    else:
-                        st.subheader("🎯 Propositions de titres")
-                        for i, title in enumerate(titles, 1):
-                            st.markdown(f"**{i}.** {title}")
-
-                    st.markdown("---")
-                    with st.expander("📊 Statistiques de la transcription"):
-                        col_stat1, col_stat2, col_stat3 = st.columns(3)
-                        with col_stat1:
-                            st.metric("Caractères", f"{len(transcript):,}")
-                        with col_stat2:
-                            st.metric("Mots", f"{len(transcript.split()):,}")
-                        with col_stat3:
-                            avg_title_len = sum(len(t) for t in titles) // len(titles)
-                            st.metric("Longueur moy. titre", f"{avg_title_len} car.")
+                if result.get("titles"):
+                    remember_result(url_key, result, transcript_chars=len(transcript),
+                                    transcript_words=len(transcript.split()))
                 else:
-                    error_detail = result.get("error", "Erreur inconnue")
-                    st.error(f"❌ Impossible de générer les titres: {error_detail}")
+                    show_result(result)
+
+        # Résultat déjà obtenu pour ces entrées : réaffiché à chaque rerun, sans régénérer
+        if url_key in st.session_state.get("results", {}):
+            saved = st.session_state["results"][url_key]
+            show_result(saved["result"], saved["transcript_chars"], saved["transcript_words"])
 
 # ============ ONGLET DESCRIPTION ============
 with tab_description:
@@ -139,40 +305,32 @@ with tab_description:
         key="num_titles_desc"
     )
 
+    description_text = (video_description or "").strip()
+    description_key = result_key("description", description_text, num_titles_desc, prompt_name)
+
     if st.button("✨ Générer les titres", type="primary", use_container_width=True, key="btn_desc"):
-        if not video_description or len(video_description.strip()) < 10:
+        if len(description_text) < 10:
             st.warning("⚠️ Veuillez entrer une description (minimum 10 caractères)")
-        else:
+        elif description_key not in st.session_state.get("results", {}):
             progress_bar = st.progress(0)
             status_text = st.empty()
 
             status_text.text("🤖 Génération des titres avec Claude...")
             progress_bar.progress(50)
 
-            with st.spinner("Analyse par l'IA..."):
-                result = generate_titles_from_description(video_description, anthropic_api_key, num_titles=num_titles_desc)
+            result = render_stream(stream_titles_from_description(description_text, anthropic_api_key,
+                                                                  num_titles=num_titles_desc, prompt_name=prompt_name))
 
             progress_bar.progress(100)
             status_text.empty()
 
-            titles = result.get("titles", [])
-            raw_response = result.get("raw_response", "")
-            has_custom_prompt = result.get("has_custom_prompt", False)
-
-            if titles:
-                st.success(f"✅ {len(titles)} titres générés avec succès!")
-                st.markdown("---")
-
-                if has_custom_prompt and raw_response:
-                    st.subheader("🎯 Analyse complète des titres")
-                    st.markdown(raw_response)
-                else:
-                    st.subheader("🎯 Propositions de titres")
-                    for i, title in enumerate(titles, 1):
-                        st.markdown(f"**{i}.** {title}")
+            if result.get("titles"):
+                remember_result(description_key, result)
             else:
-                error_detail = result.get("error", "Erreur inconnue")
-                st.error(f"❌ Impossible de générer les titres: {error_detail}")
+                show_result(result)
+
+    if len(description_text) >= 10 and description_key in st.session_state.get("results", {}):
+        show_result(st.session_state["results"][description_key]["result"])
 
 # Sidebar avec informations
 with st.sidebar:
@@ -195,6 +353,7 @@ with st.sidebar:
     - ✅ Génération IA avec Claude Sonnet 4.5
     - ✅ Analyse Word Balance et scores
     - ✅ Titres optimisés SEO
+    - ✅ Transcription préchargée dès que l'URL est validée (Entrée)
     """)
 
     st.markdown("---")
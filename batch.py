@@ -0,0 +1,303 @@
+"""
+Traitement par lots du CLI (python main.py --batch videos.txt)
+Chaque ligne d'entrée est une URL YouTube ou une description. Les transcriptions sont
+récupérées par paquets (une requête pour 50 vidéos) pendant que les générations tournent
+dans un pool de workers ; chaque résultat est écrit dès qu'il est prêt (JSONL ou CSV),
+ce qui permet de reprendre un traitement interrompu sans refaire les lignes terminées.
+"""
+import csv
+import json
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, TextIO
+
+from title_generator import generate_titles, generate_titles_from_description
+from youtube_api import MAX_IDS_PER_REQUEST, extract_video_id, get_transcripts
+
+FORMAT_JSONL = "jsonl"
+FORMAT_CSV = "csv"
+
+# Longueur minimale d'une description (comme l'API)
+MIN_DESCRIPTION_LENGTH = 10
+
+# Entrée qui ressemble à un lien (et non à une description) : sans ID reconnu, c'est une
+# URL invalide (shorts, vimeo, ID tronqué...), pas un texte à envoyer à Claude
+_LOOKS_LIKE_URL = re.compile(r"https?://|\bwww\.|\byoutu(?:\.be|be\.com)\b", re.IGNORECASE)
+
+
+def read_inputs(source: Iterable[str]) -> List[str]:
+    """Lit les entrées : une URL ou une description par ligne (lignes vides et # ignorées)."""
+    inputs = []
+    for line in source:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            inputs.append(line)
+    return inputs
+
+
+def output_format(path: Path, fmt: Optional[str] = None) -> str:
+    """Format de sortie : explicite, sinon d'après l'extension (.csv, sinon JSONL)."""
+    if fmt:
+        return fmt.lower()
+    return FORMAT_CSV if path.suffix.lower() == ".csv" else FORMAT_JSONL
+
+
+def load_completed(path: Path, fmt: str) -> Set[str]:
+    """
+    Entrées déjà traitées avec succès dans un fichier de sortie existant (reprise).
+    Une ligne en échec sera retentée ; une ligne incomplète (arrêt brutal) est ignorée.
+    """
+    if not path.exists():
+        return set()
+
+    status: Dict[str, bool] = {}
+    with path.open(encoding="utf-8", newline="") as handle:
+        if fmt == FORMAT_CSV:
+            for row in csv.DictReader(handle):
+                if row.get("input"):
+                    status[row["input"]] = row.get("success") == "true"
+        else:
+            for line in handle:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(record, dict) and record.get("input"):
+                    status[record["input"]] = bool(record.get("success"))
+    return {item for item, success in status.items() if success}
+
+
+def csv_fields(num_titles: int) -> List[str]:
+    """Colonnes du fichier CSV (elles dépendent du nombre de titres)."""
+    fields = ["index", "input", "video_id", "success", "error", "cached"]
+    fields += [f"title_{number}" for number in range(1, num_titles + 1)]
+    fields += [f"score_{number}" for number in range(1, num_titles + 1)]
+    return fields
+
+
+class ResultWriter:
+    """
+    Écrit les résultats au fil de l'eau (une ligne par entrée, vidée sur disque aussitôt).
+
+    Raises:
+        ValueError: reprise d'un CSV dont les colonnes ne correspondent pas (autre -n)
+    """
+
+    def __init__(self, path: Path, fmt: str, num_titles: int, append: bool = False):
+        self.fmt = fmt
+        self.num_titles = num_titles
+        path.parent.mkdir(parents=True, exist_ok=True)
+        resuming = append and path.exists() and path.stat().st_size > 0
+        fields = csv_fields(num_titles) if fmt == FORMAT_CSV else None
+        if resuming and fields is not None:
+            with path.open(encoding="utf-8", newline="") as handle:
+                header = next(csv.reader(handle), [])
+            if header != fields:
+                raise ValueError(
+                    f"les colonnes de {path} ne correspondent pas à -n {num_titles} : "
+                    "relancez avec le même nombre de titres, ou --overwrite"
+                )
+
+        self._handle = path.open("a" if append else "w", encoding="utf-8", newline="")
+        if resuming and not _ends_with_newline(path):
+            # Dernière ligne incomplète (arrêt brutal) : la suite commence sur une nouvelle ligne
+            self._handle.write("\n")
+        self._csv = None
+        if fields is not None:
+            self._csv = csv.DictWriter(self._handle, fieldnames=fields, extrasaction="ignore")
+            if not resuming:
+                self._csv.writeheader()
+
+    def write(self, record: Dict[str, Any]) -> None:
+        if self._csv is not None:
+            row = {**record, "success": "true" if record["success"] else "false",
+                   "cached": "true" if record.get("cached") else ""}
+            for number, title in enumerate(record.get("titles") or [], 1):
+                row[f"title_{number}"] = title
+            for number, score in enumerate(record.get("scores") or [], 1):
+                row[f"score_{number}"] = "" if score is None else score
+            self._csv.writerow(row)
+        else:
+            self._handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._handle.flush()
+
+    def close(self) -> None:
+        self._handle.close()
+
+
+def _ends_with_newline(path: Path) -> bool:
+    with path.open("rb") as handle:
+        handle.seek(-1, 2)
+        return handle.read(1) == b"\n"
+
+
+class ProgressBar:
+    """Barre de progression texte (stderr) : avancement, erreurs, débit et temps restant."""
+
+    def __init__(self, total: int, stream: TextIO = sys.stderr, width: int = 30):
+        self.total = total
+        self.stream = stream
+        self.width = width
+        self.done = 0
+        self.errors = 0
+        self._start = time.monotonic()
+        self._interactive = hasattr(stream, "isatty") and stream.isatty()
+        self._last_step = -1
+
+    def update(self, success: bool) -> None:
+        self.done += 1
+        if not success:
+            self.errors += 1
+        if self._interactive:
+            self.stream.write("\r" + self._line())
+            self.stream.flush()
+        else:
+            # Sortie redirigée (fichier, CI) : une ligne tous les 10 %
+            step = self.done * 10 // max(1, self.total)
+            if step != self._last_step:
+                self._last_step = step
+                self.stream.write(self._line() + "\n")
+                self.stream.flush()
+
+    def _line(self) -> str:
+        elapsed = time.monotonic() - self._start
+        ratio = self.done / self.total if self.total else 1.0
+        filled = int(self.width * ratio)
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        remaining = (self.total - self.done) / rate if rate > 0 else 0.0
+        minutes, seconds = divmod(int(remaining), 60)
+        return (f"[{'█' * filled}{'░' * (self.width - filled)}] {self.done}/{self.total} "
+                f"({self.errors} erreur(s)) {rate:.2f}/s, reste ~{minutes:02d}:{seconds:02d}")
+
+    def close(self) -> None:
+        if self._interactive:
+            self.stream.write("\n")
+            self.stream.flush()
+
+
+def _record(index: int, item: str, video_id: Optional[str], result: Dict[str, Any]) -> Dict[str, Any]:
+    """Ligne de sortie d'une entrée."""
+    error = result.get("error")
+    titles = result.get("titles") or []
+    return {
+        "index": index,
+        "input": item,
+        "video_id": video_id,
+        "success": bool(titles) and not error,
+        "titles": titles,
+        "scores": result.get("scores") or [],
+        "local_scores": result.get("local_scores") or [],
+        "similar": [bool(detail.get("similar_to")) for detail in result.get("details") or []],
+        "filtered_titles": result.get("filtered_titles") or [],
+        "error": error or (None if titles else "Aucun titre généré"),
+        "cached": bool(result.get("cached")),
+    }
+
+
+def run_batch(inputs: Sequence[str], api_key: str, on_result: Callable[[Dict[str, Any]], None],
+              workers: int = 4, num_titles: int = 5, prompt_name: Optional[str] = None,
+              languages: Optional[Sequence[str]] = None, skip: Optional[Set[str]] = None,
+              channel: Optional[str] = None) -> Dict[str, int]:
+    """
+    Traite les entrées avec un pool de `workers` threads et appelle on_result(ligne)
+    dans le thread principal dès qu'une entrée est terminée (ordre d'achèvement).
+
+    Les URLs sont regroupées par paquets de 50 vidéos (une requête youtube-transcript.io
+    par paquet) ; le paquet suivant n'est demandé que lorsque les générations en attente
+    tombent sous 2 × workers, pour ne pas surcharger la mémoire sur des milliers de vidéos.
+
+    Args:
+        inputs: URLs YouTube ou descriptions
+        api_key: Clé API Anthropic
+        on_result: Reçoit chaque ligne de résultat
+        workers: Nombre de générations simultanées
+        num_titles: Nombre de titres par entrée
+        prompt_name: System prompt à utiliser (None = défaut)
+        languages: Langues de transcription préférées
+        skip: Entrées déjà traitées (reprise), ignorées
+        channel: Chaîne YouTube (historique des titres, quasi-doublons signalés)
+
+    Returns:
+        Compteurs {"total", "skipped", "succeeded", "failed"}
+    """
+    skip = skip or set()
+    workers = max(1, workers)
+    counts = {"total": len(inputs), "skipped": 0, "succeeded": 0, "failed": 0}
+
+    urls: List[tuple] = []         # (index, entrée, video_id)
+    descriptions: List[tuple] = []  # (index, entrée)
+    for index, item in enumerate(inputs):
+        if item in skip:
+            counts["skipped"] += 1
+            continue
+        video_id = extract_video_id(item)
+        if video_id:
+            urls.append((index, item, video_id))
+        elif _LOOKS_LIKE_URL.search(item):
+            counts["failed"] += 1
+            on_result(_record(index, item, None, {"error": "URL invalide : aucun ID de vidéo YouTube reconnu"}))
+        elif len(item) >= MIN_DESCRIPTION_LENGTH:
+            descriptions.append((index, item))
+        else:
+            counts["failed"] += 1
+            on_result(_record(index, item, None, {"error": "Ni une URL YouTube valide, ni une description (10 caractères minimum)"}))
+
+    waves = [urls[i:i + MAX_IDS_PER_REQUEST] for i in range(0, len(urls), MAX_IDS_PER_REQUEST)]
+
+    def generate_from_url(index: int, item: str, video_id: str, transcript: Optional[str],
+                          error: Optional[str]) -> Dict[str, Any]:
+        if not transcript:
+            return _record(index, item, video_id, {"error": error or "Impossible de récupérer la transcription"})
+        result = generate_titles(transcript, api_key, num_titles=num_titles, prompt_name=prompt_name, channel=channel)
+        return _record(index, item, video_id, result)
+
+    def generate_from_description(index: int, item: str) -> Dict[str, Any]:
+        result = generate_titles_from_description(item, api_key, num_titles=num_titles, prompt_name=prompt_name,
+                                                  channel=channel)
+        return _record(index, item, None, result)
+
+    def fetch_wave(wave: List[tuple]) -> Dict[str, tuple]:
+        return get_transcripts([video_id for _, _, video_id in wave], max_workers=1, languages=languages)
+
+    # Un thread pour les paquets de transcriptions, `workers` threads pour les générations
+    with ThreadPoolExecutor(max_workers=1) as fetcher, ThreadPoolExecutor(max_workers=workers) as executor:
+        generations: Dict[Future, tuple] = {}  # future -> (index, entrée, video_id)
+        fetches: Dict[Future, List[tuple]] = {}
+        pending_descriptions = list(reversed(descriptions))
+        pending_waves = list(reversed(waves))
+
+        while pending_descriptions or pending_waves or generations or fetches:
+            # Remplir le pool : descriptions d'abord, puis un paquet de transcriptions à la fois
+            while pending_descriptions and len(generations) < 2 * workers:
+                index, item = pending_descriptions.pop()
+                generations[executor.submit(generate_from_description, index, item)] = (index, item, None)
+            if pending_waves and not fetches and len(generations) < 2 * workers:
+                wave = pending_waves.pop()
+                fetches[fetcher.submit(fetch_wave, wave)] = wave
+
+            done, _ = wait(set(generations) | set(fetches), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in fetches:
+                    wave = fetches.pop(future)
+                    try:
+                        transcripts = future.result()
+                    except Exception as e:
+                        transcripts = {video_id: (None, f"{type(e).__name__}: {e}") for _, _, video_id in wave}
+                    for index, item, video_id in wave:
+                        transcript, error = transcripts.get(video_id, (None, None))
+                        future_generation = executor.submit(generate_from_url, index, item, video_id, transcript, error)
+                        generations[future_generation] = (index, item, video_id)
+                    continue
+
+                index, item, video_id = generations.pop(future)
+                try:
+                    record = future.result()
+                except Exception as e:
+                    record = _record(index, item, video_id, {"error": f"{type(e).__name__}: {e}"})
+                counts["succeeded" if record["success"] else "failed"] += 1
+                on_result(record)
+
+    return counts
@@ -0,0 +1,5 @@
+"""
+Banc d'essai de performance : faux serveurs youtube-transcript.io et Anthropic,
+scénarios de charge et comparaison avec une référence.
+Lancez avec: python -m benchmarks.run --help
+"""
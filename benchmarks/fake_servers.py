@@ -0,0 +1,251 @@
+"""
+Faux serveurs locaux qui imitent youtube-transcript.io et l'API Messages d'Anthropic
+Chaque serveur a une latence, un taux d'erreur et une taille de réponse réglables,
+ce qui permet de mesurer le projet sans réseau, sans clé API et sans coût.
+
+Exemple :
+    with FakeTranscriptServer(latency=0.2, segments=400) as youtube:
+        os.environ["YOUTUBE_TRANSCRIPT_API_URL"] = youtube.url
+"""
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+# Vocabulaire des transcriptions générées (assez varié pour le condensé et le scoring)
+WORDS = (
+    "aujourd'hui je vous montre comment réussir votre projet rapidement avec une méthode simple "
+    "efficace incroyable erreur secret astuce résultat vidéo conseil débutant pourquoi jamais "
+    "toujours vraiment argent temps santé sport cuisine voyage technologie apprendre"
+).split()
+
+
+class _FakeServer:
+    """Base commune : serveur HTTP threadé sur un port libre, latence et erreurs simulées."""
+
+    path = "/"
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.2, error_rate: float = 0.0,
+                 error_status: int = 500, seed: int = 42):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{self.path}"
+
+    def start(self) -> "_FakeServer":
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # En-têtes et corps envoyés ensemble (sinon l'ACK retardé de TCP ajoute ~40 ms)
+            wbufsize = 64 * 1024
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                fake._handle(self, body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _draw(self) -> Tuple[float, bool]:
+        """Tire la latence de l'appel et s'il doit échouer."""
+        with self._lock:
+            self.requests += 1
+            delay = self.latency * (1 + self._random.uniform(-self.jitter, self.jitter))
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        return max(0.0, delay), failed
+
+    def _handle(self, handler: BaseHTTPRequestHandler, body: Dict[str, Any]) -> None:
+        delay, failed = self._draw()
+        time.sleep(delay)
+        if failed:
+            _send(handler, self.error_status, {"error": "erreur simulée"})
+        else:
+            self._respond(handler, body)
+
+    def _respond(self, handler: BaseHTTPRequestHandler, body: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, int]:
+        return {"requests": self.requests, "errors": self.errors}
+
+
+def _send(handler: BaseHTTPRequestHandler, status: int, payload: Any,
+          content_type: str = "application/json") -> None:
+    data = payload if isinstance(payload, bytes) else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    handler.send_response(status)
+    handler.send_header("Content-Type", content_type)
+    handler.send_header("Content-Length", str(len(data)))
+    if status == 429:
+        handler.send_header("Retry-After", "1")
+    handler.end_headers()
+    handler.wfile.write(data)
+
+
+def make_segments(seed: str, segments: int, words_per_segment: int) -> List[Dict[str, Any]]:
+    """Génère des segments horodatés déterministes (même seed = même transcription)."""
+    rng = random.Random(seed)
+    return [
+        {
+            "text": " ".join(rng.choice(WORDS) for _ in range(words_per_segment)),
+            "start": f"{index * 3.0:.2f}",
+            "dur": "3.00",
+        }
+        for index in range(segments)
+    ]
+
+
+class FakeTranscriptServer(_FakeServer):
+    """
+    Imite POST /api/transcripts de youtube-transcript.io : une piste française
+    (et optionnellement une piste anglaise automatique) par ID demandé.
+    """
+
+    path = "/api/transcripts"
+
+    def __init__(self, segments: int = 300, words_per_segment: int = 10, tracks: int = 1, **kwargs):
+        super().__init__(**kwargs)
+        self.segments = segments
+        self.words_per_segment = words_per_segment
+        self.tracks = tracks
+
+    def _respond(self, handler: BaseHTTPRequestHandler, body: Dict[str, Any]) -> None:
+        videos = []
+        for video_id in body.get("ids") or []:
+            tracks = [{"language": "French", "languageCode": "fr",
+                       "transcript": make_segments(video_id, self.segments, self.words_per_segment)}]
+            if self.tracks > 1:
+                tracks.append({"language": "English (auto-generated)", "languageCode": "en", "kind": "asr",
+                               "transcript": make_segments(video_id + "-en", self.segments, self.words_per_segment)})
+            videos.append({"id": video_id, "tracks": tracks})
+        _send(handler, 200, videos)
+
+
+class FakeAnthropicServer(_FakeServer):
+    """
+    Imite POST /v1/messages de l'API Anthropic, en réponse simple ou en streaming
+    (Server-Sent Events). La latence est répartie sur les morceaux en streaming.
+    """
+
+    path = ""
+
+    def __init__(self, output_words: int = 12, stream_chunks: int = 20, **kwargs):
+        super().__init__(**kwargs)
+        self.output_words = output_words
+        self.stream_chunks = max(1, stream_chunks)
+
+    def _handle(self, handler: BaseHTTPRequestHandler, body: Dict[str, Any]) -> None:
+        if not body.get("stream"):
+            super()._handle(handler, body)
+            return
+        delay, failed = self._draw()
+        if failed:
+            time.sleep(delay)
+            _send(handler, self.error_status, {"type": "error", "error": {"type": "api_error", "message": "erreur simulée"}})
+            return
+        self._stream(handler, body, delay)
+
+    def _titles(self, body: Dict[str, Any]) -> str:
+        rng = random.Random(json.dumps(body.get("messages"), sort_keys=True))
+        content = body.get("messages", [{}])[0].get("content")
+        text = content if isinstance(content, str) else json.dumps(content, ensure_ascii=False)
+        requested = re.search(r"(\d+) (?:titres|propositions)", text)
+        count = int(requested.group(1)) if requested else 5
+        return "\n".join(
+            f"{index}. " + " ".join(rng.choice(WORDS) for _ in range(self.output_words)).capitalize()
+            for index in range(1, count + 1)
+        )
+
+    def _message(self, body: Dict[str, Any], text: str) -> Dict[str, Any]:
+        return {
+            "id": "msg_bench",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model", "claude"),
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {"input_tokens": len(json.dumps(body)) // 4, "output_tokens": len(text) // 4},
+        }
+
+    def _respond(self, handler: BaseHTTPRequestHandler, body: Dict[str, Any]) -> None:
+        text = self._titles(body)
+        message = self._message(body, text)
+        tool_choice = body.get("tool_choice") or {}
+        if tool_choice.get("type") == "tool":
+            # Sortie structurée : la réponse est un appel de l'outil demandé
+            rng = random.Random(text)
+            titles = [{"title": line.split(". ", 1)[1], "score": round(rng.uniform(5, 9.5), 1),
+                       "analysis": "Analyse simulée"} for line in text.splitlines()]
+            schema = (body.get("tools") or [{}])[0].get("input_schema", {})
+            if schema.get("properties", {}).get("titles", {}).get("items", {}).get("type") == "string":
+                # Titres seuls (classement local)
+                titles = [item["title"] for item in titles]
+            message["content"] = [{"type": "tool_use", "id": "toolu_bench", "name": tool_choice["name"],
+                                   "input": {"titles": titles, "analysis": "Analyse d'ensemble simulée"}}]
+            message["stop_reason"] = "tool_use"
+        _send(handler, 200, message)
+
+    def _stream(self, handler: BaseHTTPRequestHandler, body: Dict[str, Any], delay: float) -> None:
+        text = self._titles(body)
+        message = self._message(body, text)
+        size = max(1, len(text) // self.stream_chunks + 1)
+        chunks = [text[i:i + size] for i in range(0, len(text), size)]
+
+        events = [("message_start", {"type": "message_start", "message": {**message, "content": [], "stop_reason": None,
+                                                                          "usage": {**message["usage"], "output_tokens": 1}}}),
+                  ("content_block_start", {"type": "content_block_start", "index": 0,
+                                           "content_block": {"type": "text", "text": ""}})]
+        events += [("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                             "delta": {"type": "text_delta", "text": chunk}}) for chunk in chunks]
+        events += [("content_block_stop", {"type": "content_block_stop", "index": 0}),
+                   ("message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                      "usage": {"output_tokens": message["usage"]["output_tokens"]}}),
+                   ("message_stop", {"type": "message_stop"})]
+        parts = [f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8") for name, data in events]
+
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Content-Length", str(sum(len(part) for part in parts)))
+        handler.end_headers()
+        # Premier token après la moitié de la latence, le reste réparti sur les morceaux
+        time.sleep(delay / 2)
+        pause = delay / 2 / max(1, len(chunks))
+        for name_part, part in zip(events, parts):
+            handler.wfile.write(part)
+            handler.wfile.flush()
+            if name_part[0] == "content_block_delta":
+                time.sleep(pause)
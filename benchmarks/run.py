@@ -0,0 +1,449 @@
+"""
+Banc d'essai de bout en bout (sans réseau ni clé API)
+Démarre les faux serveurs youtube-transcript.io et Anthropic, exécute chaque scénario
+à plusieurs niveaux de concurrence, affiche débit et latences (p50/p95/p99), enregistre
+les résultats en JSON et les compare à une référence.
+
+Exemples :
+    python -m benchmarks.run
+    python -m benchmarks.run --scenarios transcript,api --concurrency 1,8,32 --requests 200
+    python -m benchmarks.run --yt-latency 0.3 --llm-latency 1.5 --error-rate 0.05
+    python -m benchmarks.run --save-baseline          # enregistre la référence
+    python -m benchmarks.run --baseline benchmarks/baseline.json --tolerance 0.2
+    python -m benchmarks.run --no-compare              # mesure seule, sans référence
+
+Codes de sortie : 0 = pas de régression, 1 = régression, 2 = option invalide,
+3 = référence absente (rien n'a été comparé ; --save-baseline pour la créer).
+
+Scénarios :
+- transcript : get_transcript (threads)
+- transcripts_batch : get_transcripts, requêtes groupées (--batch-size vidéos par appel)
+- generate : generate_titles (threads)
+- api : POST /generate-titles (application FastAPI en mémoire, asyncio)
+- api_batch : POST /generate-titles/batch (--batch-size vidéos par requête)
+- score : classement local Word Balance de --score-titles titres candidats par appel
+- startup : démarrage à froid de l'API dans un processus neuf (--startup-runs fois) :
+  import de api (détail par module, comme python -X importtime) puis lifespan FastAPI
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.fake_servers import FakeAnthropicServer, FakeTranscriptServer, WORDS
+
+BENCH_DIR = Path(__file__).parent
+DEFAULT_OUTPUT = BENCH_DIR / "results" / "latest.json"
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+# Code de sortie quand la référence est absente : distinct d'un succès pour qu'une CI le voie
+EXIT_NO_BASELINE = 3
+SCENARIOS = ("transcript", "transcripts_batch", "generate", "api", "api_batch", "score", "startup")
+
+# SDK dont le chargement est différé au premier appel (clients.py)
+HEAVY_MODULES = ("anthropic", "requests", "httpx", "dotenv")
+
+API_KEY = "bench-key"
+
+# Résultat d'un appel : (latence en secondes, succès, nombre d'éléments traités)
+Sample = Tuple[float, bool, int]
+
+# IDs uniques : ni le cache ni le single-flight ne regroupent les appels mesurés
+_ids = itertools.count()
+
+
+def _video_id() -> str:
+    return f"b{next(_ids):010d}"
+
+
+def _transcript_text(words: int) -> str:
+    seed = next(_ids)
+    return f"vidéo {seed} " + " ".join(WORDS[(seed + i * 7) % len(WORDS)] for i in range(words))
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentile par la méthode du rang le plus proche (valeurs triées)."""
+    if not values:
+        return 0.0
+    rank = max(1, min(len(values), int(round(pct / 100.0 * len(values) + 0.5))))
+    return values[rank - 1]
+
+
+def summarize(scenario: str, concurrency: int, samples: List[Sample], duration: float) -> Dict[str, Any]:
+    """Débit et latences d'un scénario pour un niveau de concurrence."""
+    latencies = sorted(latency for latency, _, _ in samples)
+    items = sum(count for _, _, count in samples)
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "items": items,
+        "errors": sum(1 for _, ok, _ in samples if not ok),
+        "duration": round(duration, 4),
+        "throughput": round(items / duration, 3) if duration > 0 else 0.0,
+        "latency": {
+            "p50": round(percentile(latencies, 50), 4),
+            "p95": round(percentile(latencies, 95), 4),
+            "p99": round(percentile(latencies, 99), 4),
+            "mean": round(sum(latencies) / len(latencies), 4) if latencies else 0.0,
+            "max": round(latencies[-1], 4) if latencies else 0.0,
+        },
+    }
+
+
+# ============ EXÉCUTION ============
+
+def run_threads(call: Callable[[], Tuple[bool, int]], requests: int, concurrency: int) -> Tuple[List[Sample], float]:
+    """Exécute `requests` appels synchrones avec `concurrency` threads."""
+    def timed(_: int) -> Sample:
+        start = time.perf_counter()
+        ok, count = call()
+        return time.perf_counter() - start, ok, count
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        samples = list(executor.map(timed, range(requests)))
+    return samples, time.perf_counter() - start
+
+
+def run_async(make_call: Callable[[Any], Any], requests: int, concurrency: int) -> Tuple[List[Sample], float]:
+    """Exécute `requests` appels asynchrones, au plus `concurrency` à la fois, dans une nouvelle boucle."""
+    async def main() -> Tuple[List[Sample], float]:
+        import httpx
+        from api import app
+        from clients import aclose_clients
+
+        semaphore = asyncio.Semaphore(concurrency)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+            async def timed() -> Sample:
+                async with semaphore:
+                    start = time.perf_counter()
+                    ok, count = await make_call(client)
+                    return time.perf_counter() - start, ok, count
+
+            start = time.perf_counter()
+            samples = await asyncio.gather(*(timed() for _ in range(requests)))
+            duration = time.perf_counter() - start
+        await aclose_clients()
+        return list(samples), duration
+
+    return asyncio.run(main())
+
+
+# ============ SCÉNARIOS ============
+
+def scenario_transcript(args: argparse.Namespace, concurrency: int) -> Tuple[List[Sample], float]:
+    from youtube_api import get_transcript
+
+    def call() -> Tuple[bool, int]:
+        transcript, _ = get_transcript(_video_id())
+        return transcript is not None, 1
+
+    return run_threads(call, args.requests, concurrency)
+
+
+def scenario_transcripts_batch(args: argparse.Namespace, concurrency: int) -> Tuple[List[Sample], float]:
+    from youtube_api import get_transcripts
+
+    def call() -> Tuple[bool, int]:
+        results = get_transcripts([_video_id() for _ in range(args.batch_size)])
+        return all(transcript is not None for transcript, _ in results.values()), len(results)
+
+    return run_threads(call, max(1, args.requests // args.batch_size), concurrency)
+
+
+def scenario_generate(args: argparse.Namespace, concurrency: int) -> Tuple[List[Sample], float]:
+    from title_generator import generate_titles
+
+    def call() -> Tuple[bool, int]:
+        result = generate_titles(_transcript_text(args.words), API_KEY, num_titles=args.num_titles)
+        return bool(result.get("titles")) and not result.get("error"), 1
+
+    return run_threads(call, args.requests, concurrency)
+
+
+def scenario_api(args: argparse.Namespace, concurrency: int) -> Tuple[List[Sample], float]:
+    async def call(client) -> Tuple[bool, int]:
+        response = await client.post("/generate-titles", json={
+            "youtube_url": f"https://www.youtube.com/watch?v={_video_id()}",
+            "num_titles": args.num_titles,
+        })
+        return response.status_code == 200 and response.json().get("success", False), 1
+
+    return run_async(call, args.requests, concurrency)
+
+
+def scenario_api_batch(args: argparse.Namespace, concurrency: int) -> Tuple[List[Sample], float]:
+    async def call(client) -> Tuple[bool, int]:
+        items = [{"youtube_url": f"https://youtu.be/{_video_id()}"} for _ in range(args.batch_size)]
+        response = await client.post("/generate-titles/batch", json={"items": items, "num_titles": args.num_titles})
+        lines = [json.loads(line) for line in response.text.splitlines() if line.strip()]
+        ok = response.status_code == 200 and len(lines) == len(items) and all(line.get("success") for line in lines)
+        return ok, len(items)
+
+    return run_async(call, max(1, args.requests // args.batch_size), concurrency)
+
+
+def scenario_score(args: argparse.Namespace, concurrency: int) -> Tuple[List[Sample], float]:
+    from word_balance import rerank
+
+    def call() -> Tuple[bool, int]:
+        seed = next(_ids)
+        titles = [" ".join(WORDS[(seed + i * 7 + j * 3) % len(WORDS)] for j in range(args.output_words)).capitalize()
+                  + f" ({seed}-{i})" for i in range(args.score_titles)]
+        return len(rerank(titles, args.num_titles)) == args.num_titles, len(titles)
+
+    return run_threads(call, args.requests, concurrency)
+
+
+# Exécuté dans un processus neuf : import de l'API, puis démarrage complet (lifespan :
+# workers /jobs, préchauffage des connexions si PREWARM_CONNECTIONS=1)
+_STARTUP_SCRIPT = f"""
+import asyncio, json, sys, time
+started = time.perf_counter()
+import api
+imported = time.perf_counter()
+
+async def start():
+    async with api.lifespan(api.app):
+        return time.perf_counter()
+
+ready = asyncio.run(start())
+print(json.dumps({{"import": imported - started, "ready": ready - started,
+                  "loaded": [name for name in {HEAVY_MODULES!r} if name in sys.modules]}}))
+"""
+
+
+def parse_importtime(stderr: str, module: str) -> Dict[str, float]:
+    """
+    Durée cumulée (s) des imports directs de `module` d'après la sortie de python -X importtime
+    (une ligne par module, les dépendances avant le module qui les importe, indentées d'un niveau).
+    """
+    children: Dict[str, float] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue  # ligne d'en-tête
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0:
+            if name.strip() == module:
+                return children
+            children = {}
+        elif depth == 1:
+            children[name.strip()] = int(cumulative) / 1e6
+    return {}
+
+
+def scenario_startup(args: argparse.Namespace, concurrency: int) -> Tuple[List[Sample], float]:
+    """Démarrages à froid successifs (la concurrence est ignorée : un processus à la fois)."""
+    samples: List[Sample] = []
+    runs: List[Dict[str, Any]] = []
+    env = {**os.environ, "JOBS_DB_PATH": os.path.join(tempfile.mkdtemp(prefix="bench-jobs-"), "jobs.sqlite3")}
+    start = time.perf_counter()
+    for _ in range(max(1, args.startup_runs)):
+        process = subprocess.run([sys.executable, "-X", "importtime", "-c", _STARTUP_SCRIPT],
+                                 capture_output=True, text=True, env=env, cwd=BENCH_DIR.parent)
+        lines = process.stdout.strip().splitlines()
+        if process.returncode != 0 or not lines:
+            samples.append((0.0, False, 1))
+            continue
+        run = json.loads(lines[-1])
+        run["modules"] = parse_importtime(process.stderr, "api")
+        runs.append(run)
+        samples.append((run["ready"], True, 1))
+    duration = time.perf_counter() - start
+
+    if runs:
+        middle = sorted(runs, key=lambda run: run["ready"])[len(runs) // 2]
+        heaviest = sorted(middle["modules"].items(), key=lambda item: -item[1])[:6]
+        print(f"{'':<26}import api {middle['import']:.3f}s, prêt {middle['ready']:.3f}s — "
+              + ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in heaviest))
+        print(f"{'':<26}SDK chargés au démarrage : {', '.join(middle['loaded']) or 'aucun'}")
+    return samples, duration
+
+
+SCENARIO_FUNCTIONS = {
+    "transcript": scenario_transcript,
+    "transcripts_batch": scenario_transcripts_batch,
+    "generate": scenario_generate,
+    "api": scenario_api,
+    "api_batch": scenario_api_batch,
+    "score": scenario_score,
+    "startup": scenario_startup,
+}
+
+
+# ============ RÉFÉRENCE ============
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Compare aux résultats de référence (même scénario et même concurrence).
+    Régression : p95 plus lent ou débit plus faible de plus de `tolerance` (ex: 0.2 = 20 %).
+
+    Returns:
+        La liste des régressions détectées (vide si aucune)
+    """
+    reference = {(entry["scenario"], entry["concurrency"]): entry for entry in baseline.get("results", [])}
+    regressions = []
+    print()
+    print(f"{'scénario':<20}{'conc.':>6}{'p95 réf.':>11}{'p95':>9}{'écart':>9}{'débit réf.':>12}{'débit':>9}{'écart':>9}")
+    for entry in results:
+        ref = reference.get((entry["scenario"], entry["concurrency"]))
+        if ref is None:
+            print(f"{entry['scenario']:<20}{entry['concurrency']:>6}   ⚠️ pas de référence pour ce scénario")
+            continue
+        p95, ref_p95 = entry["latency"]["p95"], ref["latency"]["p95"]
+        throughput, ref_throughput = entry["throughput"], ref["throughput"]
+        p95_delta = (p95 - ref_p95) / ref_p95 if ref_p95 else 0.0
+        throughput_delta = (throughput - ref_throughput) / ref_throughput if ref_throughput else 0.0
+        flag = ""
+        if p95_delta > tolerance or throughput_delta < -tolerance:
+            flag = "  ❌"
+            regressions.append(
+                f"{entry['scenario']} (concurrence {entry['concurrency']}): "
+                f"p95 {ref_p95:.3f}s → {p95:.3f}s, débit {ref_throughput:.2f}/s → {throughput:.2f}/s"
+            )
+        print(f"{entry['scenario']:<20}{entry['concurrency']:>6}{ref_p95:>10.3f}s{p95:>8.3f}s{p95_delta:>+9.0%}"
+              f"{ref_throughput:>10.2f}/s{throughput:>7.2f}/s{throughput_delta:>+9.0%}{flag}")
+    return regressions
+
+
+def _write_json(path: Path, data: Dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def _configure_environment(args: argparse.Namespace, youtube: FakeTranscriptServer,
+                           anthropic: FakeAnthropicServer) -> None:
+    """
+    Pointe le projet vers les faux serveurs. À appeler avant d'importer les modules
+    du projet (les variables sont lues à l'import).
+    """
+    os.environ["YOUTUBE_TRANSCRIPT_API_URL"] = youtube.url
+    os.environ["YOUTUBE_TRANSCRIPT_API_KEY"] = API_KEY
+    os.environ["ANTHROPIC_BASE_URL"] = anthropic.url
+    os.environ["ANTHROPIC_API_KEY"] = API_KEY
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    # Historique des titres propre à chaque exécution (ne remplit pas celui du projet)
+    os.environ.setdefault("TITLE_HISTORY_PATH", os.path.join(tempfile.mkdtemp(prefix="bench-history-"),
+                                                             "title_history.sqlite3"))
+    if not args.with_cache:
+        os.environ["TRANSCRIPT_CACHE_ENABLED"] = "0"
+        os.environ["RESULT_CACHE_ENABLED"] = "0"
+    if not args.with_rate_limits:
+        # Le débit par défaut vers youtube-transcript.io (0.5/s) masquerait tout le reste
+        os.environ["YOUTUBE_TRANSCRIPT_RPS"] = "0"
+        os.environ["ANTHROPIC_RPS"] = "0"
+        os.environ["ANTHROPIC_TPM"] = "0"
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Banc d'essai du générateur de titres (faux serveurs locaux)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Scénarios, séparés par des virgules ({', '.join(SCENARIOS)})")
+    parser.add_argument("--concurrency", default="1,4,16", help="Niveaux de concurrence (ex: 1,4,16)")
+    parser.add_argument("--requests", type=int, default=64, help="Appels par scénario et par niveau (éléments pour les batchs)")
+    parser.add_argument("--batch-size", type=int, default=10, help="Vidéos par appel des scénarios batch")
+    parser.add_argument("--num-titles", type=int, default=5, help="Titres demandés par génération")
+    parser.add_argument("--score-titles", type=int, default=1000, help="Titres candidats classés par appel du scénario score")
+    parser.add_argument("--startup-runs", type=int, default=5, help="Démarrages à froid mesurés par le scénario startup")
+    parser.add_argument("--words", type=int, default=3000, help="Mots des transcriptions du scénario generate")
+    parser.add_argument("--yt-latency", type=float, default=0.05, help="Latence du faux youtube-transcript.io (s)")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Latence du faux Anthropic (s)")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Variation aléatoire de la latence (0.2 = ±20 %%)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Taux d'erreurs 500 des deux faux serveurs (0-1)")
+    parser.add_argument("--segments", type=int, default=300, help="Segments par transcription")
+    parser.add_argument("--segment-words", type=int, default=10, help="Mots par segment")
+    parser.add_argument("--output-words", type=int, default=12, help="Mots par titre généré")
+    parser.add_argument("--with-cache", action="store_true", help="Garder les caches de transcriptions et de résultats")
+    parser.add_argument("--with-rate-limits", action="store_true", help="Garder les limites de débit configurées")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT, help="Fichier JSON des résultats")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE,
+                        help=f"Référence à comparer (absente : avertissement et code de sortie {EXIT_NO_BASELINE})")
+    parser.add_argument("--no-compare", action="store_true", help="Ne pas comparer à la référence (mesure seule)")
+    parser.add_argument("--save-baseline", action="store_true", help="Enregistrer les résultats comme nouvelle référence")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Écart toléré avant régression (0.2 = 20 %%)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIO_FUNCTIONS]
+    if unknown:
+        print(f"❌ Scénario inconnu: {', '.join(unknown)} (disponibles: {', '.join(SCENARIOS)})")
+        return 2
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+
+    server_options = {"jitter": args.jitter, "error_rate": args.error_rate}
+    youtube = FakeTranscriptServer(latency=args.yt_latency, segments=args.segments,
+                                   words_per_segment=args.segment_words, **server_options)
+    anthropic = FakeAnthropicServer(latency=args.llm_latency, output_words=args.output_words, **server_options)
+
+    with youtube, anthropic:
+        _configure_environment(args, youtube, anthropic)
+        print("=" * 78)
+        print(f"⏱️  Banc d'essai — youtube {args.yt_latency}s, anthropic {args.llm_latency}s, erreurs {args.error_rate:.0%}")
+        print("=" * 78)
+        print(f"{'scénario':<20}{'conc.':>6}{'appels':>8}{'erreurs':>9}{'débit':>11}{'p50':>9}{'p95':>9}{'p99':>9}")
+
+        results = []
+        for scenario in scenarios:
+            # Un démarrage à froid se mesure processus par processus
+            for concurrency in (levels[:1] if scenario == "startup" else levels):
+                samples, duration = SCENARIO_FUNCTIONS[scenario](args, concurrency)
+                entry = summarize(scenario, concurrency, samples, duration)
+                results.append(entry)
+                latency = entry["latency"]
+                print(f"{scenario:<20}{concurrency:>6}{entry['requests']:>8}{entry['errors']:>9}"
+                      f"{entry['throughput']:>9.2f}/s{latency['p50']:>8.3f}s{latency['p95']:>8.3f}s{latency['p99']:>8.3f}s")
+
+        upstream = {"youtube": youtube.stats(), "anthropic": anthropic.stats()}
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items()},
+        "upstream": upstream,
+        "results": results,
+    }
+    _write_json(args.output, report)
+    print(f"\n💾 Résultats enregistrés dans {args.output}")
+
+    if args.save_baseline:
+        _write_json(args.baseline, report)
+        print(f"📌 Référence enregistrée dans {args.baseline}")
+        return 0
+
+    if args.no_compare:
+        return 0
+    if not args.baseline.exists():
+        print(f"\n⚠️  Référence {args.baseline} absente : aucune comparaison effectuée "
+              f"(--save-baseline pour la créer, --no-compare pour une mesure seule)")
+        return EXIT_NO_BASELINE
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n❌ {len(regressions)} régression(s) au-delà de {args.tolerance:.0%} :")
+        for regression in regressions:
+            print(f"   - {regression}")
+        return 1
+    print(f"\n✅ Aucune régression au-delà de {args.tolerance:.0%} par rapport à {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
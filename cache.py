@@ -0,0 +1,524 @@
+"""
+Module de cache à deux niveaux (mémoire + disque)
+Utilisé pour éviter de rappeler youtube-transcript.io pour une vidéo déjà traitée
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Dict, Any, Iterable, Tuple
+
+from config import env_int, env_bool
+from metrics import callback_metric
+
+
+# Valeurs par défaut (surchargées par les variables d'environnement)
+DEFAULT_TTL = 7 * 24 * 3600                     # 7 jours
+DEFAULT_MEMORY_MAX_BYTES = 64 * 1024 * 1024     # 64 Mo
+DEFAULT_DISK_MAX_BYTES = 512 * 1024 * 1024      # 512 Mo
+DEFAULT_CACHE_DIR = Path(__file__).parent / ".cache"
+
+
+class MemoryCache:
+    """
+    Cache LRU en mémoire, borné en nombre d'octets, avec expiration (TTL).
+    Thread-safe : partagé entre les workers de l'API et les sessions Streamlit.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MEMORY_MAX_BYTES, ttl: int = DEFAULT_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at and expires_at < time.time():
+                self._remove(key)
+                return None
+            # Marquer comme récemment utilisé
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[int] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        # Une entrée plus grande que tout le cache n'est jamais gardée
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            expires_at = time.time() + ttl if ttl else 0.0
+            self._data[key] = (value, expires_at)
+            self._size += len(value)
+            # Éviction des entrées les moins récemment utilisées
+            while self._size > self.max_bytes and self._data:
+                oldest_key = next(iter(self._data))
+                self._remove(oldest_key)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._size = 0
+
+    def _remove(self, key: str) -> None:
+        value, _ = self._data.pop(key)
+        self._size -= len(value)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class DiskCache:
+    """
+    Cache persistant sur disque basé sur SQLite.
+    Survit aux redémarrages et peut être partagé entre l'API, le CLI et Streamlit
+    (mode WAL pour les accès concurrents). Éviction LRU au-delà de max_bytes.
+    """
+
+    def __init__(self, path: Path, max_bytes: int = DEFAULT_DISK_MAX_BYTES, ttl: int = DEFAULT_TTL):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=10)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS cache (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache(accessed_at)")
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at and expires_at < now:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return bytes(value)
+
+    def set(self, key: str, value: bytes, ttl: Optional[int] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        if len(value) > self.max_bytes:
+            return
+        now = time.time()
+        expires_at = now + ttl if ttl else 0.0
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, sqlite3.Binary(value), len(value), expires_at, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        """Supprime les entrées expirées puis les moins récemment utilisées au-delà de max_bytes."""
+        self._conn.execute("DELETE FROM cache WHERE expires_at > 0 AND expires_at < ?", (now,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        to_delete = []
+        for key, size in self._conn.execute("SELECT key, size FROM cache ORDER BY accessed_at ASC"):
+            to_delete.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self._conn.executemany("DELETE FROM cache WHERE key = ?", to_delete)
+
+    @property
+    def size_bytes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class TieredCache:
+    """
+    Cache à deux niveaux : mémoire (LRU) devant un cache disque optionnel.
+    Une entrée trouvée sur disque est remontée en mémoire.
+    Compte les hits (mémoire / disque) et les misses.
+    """
+
+    def __init__(self, memory: Optional[MemoryCache] = None, disk: Optional[DiskCache] = None):
+        self.memory = memory or MemoryCache()
+        self.disk = disk
+        self._stats_lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "sets": 0}
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def get(self, key: str, count: bool = True) -> Optional[bytes]:
+        """Lit une entrée (count=False : lecture annexe, non comptée dans les stats)."""
+        value = self.memory.get(key)
+        if value is not None:
+            if count:
+                self._count("memory_hits")
+            return value
+
+        return self._get_from_disk(key, count)
+
+    def record_miss(self) -> None:
+        """Compte une absence constatée sans lecture (ex: index des pistes absent)."""
+        self._count("misses")
+
+    def set(self, key: str, value: bytes, ttl: Optional[int] = None) -> None:
+        self._count("sets")
+        self.memory.set(key, value, ttl)
+        self._set_on_disk([(key, value)], ttl)
+
+    async def aget(self, key: str, count: bool = True) -> Optional[bytes]:
+        """
+        Version asynchrone de get : un hit mémoire est servi sans quitter la boucle
+        d'événements, seule la lecture SQLite (UPDATE + commit) passe par un thread.
+        """
+        value = self.memory.get(key)
+        if value is not None:
+            if count:
+                self._count("memory_hits")
+            return value
+        if self.disk is None:
+            if count:
+                self._count("misses")
+            return None
+        return await asyncio.to_thread(self._get_from_disk, key, count)
+
+    async def aset_many(self, items: Iterable[Tuple[str, bytes]], ttl: Optional[int] = None) -> None:
+        """
+        Écrit plusieurs entrées : la mémoire tout de suite, le disque en un seul
+        passage dans un thread pour ne pas bloquer la boucle d'événements.
+        """
+        items = list(items)
+        for key, value in items:
+            self._count("sets")
+            self.memory.set(key, value, ttl)
+        if self.disk is not None and items:
+            await asyncio.to_thread(self._set_on_disk, items, ttl)
+
+    def _get_from_disk(self, key: str, count: bool = True) -> Optional[bytes]:
+        if self.disk is not None:
+            try:
+                value = self.disk.get(key)
+            except sqlite3.Error:
+                value = None
+            if value is not None:
+                if count:
+                    self._count("disk_hits")
+                self.memory.set(key, value)
+                return value
+
+        if count:
+            self._count("misses")
+        return None
+
+    def _set_on_disk(self, items: Iterable[Tuple[str, bytes]], ttl: Optional[int]) -> None:
+        if self.disk is None:
+            return
+        try:
+            for key, value in items:
+                self.disk.set(key, value, ttl)
+        except sqlite3.Error:
+            # Le cache disque est une optimisation : une erreur ne doit pas casser l'appel
+            pass
+
+    def delete(self, key: str) -> None:
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Retourne les compteurs du cache.
+
+        Returns:
+            Dict avec 'memory_hits', 'disk_hits', 'misses', 'sets', 'hit_ratio',
+            'memory_bytes', 'memory_entries'
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_ratio"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        stats["memory_bytes"] = self.memory.size_bytes
+        stats["memory_entries"] = len(self.memory)
+        return stats
+
+
+# ============ CACHES PARTAGÉS ============
+
+# Caches nommés créés à la demande : None = désactivé
+_shared_caches: Dict[str, Optional[Any]] = {}
+_shared_caches_lock = threading.Lock()
+
+
+def create_tiered_cache(env_prefix: str, default_ttl: int, default_memory_max_bytes: int,
+                        default_disk_max_bytes: int, default_filename: str) -> Optional[TieredCache]:
+    """
+    Crée un cache à deux niveaux configuré par les variables d'environnement <PREFIX>_* :
+    - <PREFIX>_ENABLED (1/0, défaut 1)
+    - <PREFIX>_TTL (secondes)
+    - <PREFIX>_MEMORY_MAX_BYTES (taille max en mémoire)
+    - <PREFIX>_MAX_BYTES (taille max du cache disque, 0 = pas de disque)
+    - <PREFIX>_PATH (fichier SQLite, défaut .cache/<default_filename>)
+
+    Returns:
+        Le cache ou None si désactivé
+    """
+    if not env_bool(f"{env_prefix}_ENABLED", True):
+        return None
+
+    ttl = env_int(f"{env_prefix}_TTL", default_ttl)
+    memory = MemoryCache(
+        max_bytes=env_int(f"{env_prefix}_MEMORY_MAX_BYTES", default_memory_max_bytes),
+        ttl=ttl
+    )
+
+    disk = None
+    disk_max_bytes = env_int(f"{env_prefix}_MAX_BYTES", default_disk_max_bytes)
+    if disk_max_bytes > 0:
+        path = os.getenv(f"{env_prefix}_PATH") or str(DEFAULT_CACHE_DIR / default_filename)
+        try:
+            disk = DiskCache(Path(path), max_bytes=disk_max_bytes, ttl=ttl)
+        except (sqlite3.Error, OSError):
+            # Système de fichiers en lecture seule (certains hébergeurs) : mémoire uniquement
+            disk = None
+
+    return TieredCache(memory=memory, disk=disk)
+
+
+def _get_shared_cache(name: str, factory) -> Optional[Any]:
+    """Retourne le cache partagé `name`, créé au premier appel avec `factory`."""
+    if name not in _shared_caches:
+        with _shared_caches_lock:
+            if name not in _shared_caches:
+                _shared_caches[name] = factory()
+    return _shared_caches[name]
+
+
+def _set_shared_cache(name: str, cache: Optional[Any]) -> None:
+    with _shared_caches_lock:
+        _shared_caches[name] = cache
+
+
+def cache_get(cache: Any, key: str, count: bool = True) -> Optional[bytes]:
+    """
+    Lit une entrée de n'importe quel cache. count=False : lecture annexe (ex: index des
+    pistes) non comptée dans les stats d'un TieredCache, pour qu'une recherche en plusieurs
+    lectures compte pour un seul hit ou miss.
+    """
+    if isinstance(cache, TieredCache):
+        return cache.get(key, count=count)
+    return cache.get(key)
+
+
+def record_cache_miss(cache: Any) -> None:
+    """Compte une absence constatée sans lecture comptée (voir cache_get)."""
+    if isinstance(cache, TieredCache):
+        cache.record_miss()
+
+
+async def cache_get_async(cache: Any, key: str, count: bool = True) -> Optional[bytes]:
+    """
+    Lit une entrée depuis un chemin asynchrone sans bloquer la boucle d'événements :
+    TieredCache.aget si disponible, sinon get() dans un thread (cache Redis, de test...).
+    """
+    if isinstance(cache, TieredCache):
+        return await cache.aget(key, count=count)
+    if hasattr(cache, "aget"):
+        return await cache.aget(key)
+    return await asyncio.to_thread(cache.get, key)
+
+
+async def cache_set_many_async(cache: Any, items: Iterable[Tuple[str, bytes]], ttl: Optional[int] = None) -> None:
+    """Écrit plusieurs entrées depuis un chemin asynchrone (voir cache_get_async)."""
+    items = list(items)
+    if hasattr(cache, "aset_many"):
+        await cache.aset_many(items, ttl)
+        return
+
+    def write() -> None:
+        for key, value in items:
+            cache.set(key, value, ttl)
+
+    await asyncio.to_thread(write)
+
+
+# ============ CACHE DES TRANSCRIPTIONS ============
+
+def transcript_cache_key(video_id: str, language: Optional[str] = None) -> str:
+    """
+    Construit la clé de cache d'une transcription.
+
+    Args:
+        video_id: L'ID de la vidéo YouTube
+        language: Code langue de la piste (None = piste par défaut renvoyée par l'API)
+
+    Returns:
+        La clé "transcript:<video_id>:<langue>"
+    """
+    return f"transcript:{video_id}:{(language or 'default').lower()}"
+
+
+def transcript_tracks_key(video_id: str) -> str:
+    """
+    Clé de cache de l'index des pistes d'une vidéo (langues disponibles, piste par défaut
+    en premier) : permet de servir une autre langue depuis le cache sans rappeler l'API.
+    """
+    return f"transcript-tracks:{video_id}"
+
+
+def create_transcript_cache() -> Optional[TieredCache]:
+    """
+    Crée le cache des transcriptions à partir des variables d'environnement :
+    - TRANSCRIPT_CACHE_ENABLED (1/0, défaut 1)
+    - TRANSCRIPT_CACHE_TTL (secondes, défaut 7 jours)
+    - TRANSCRIPT_CACHE_MEMORY_MAX_BYTES (défaut 64 Mo)
+    - TRANSCRIPT_CACHE_MAX_BYTES (taille max du cache disque, défaut 512 Mo, 0 = pas de disque)
+    - TRANSCRIPT_CACHE_PATH (fichier SQLite, défaut .cache/transcripts.sqlite3)
+
+    Returns:
+        Le cache ou None si désactivé
+    """
+    return create_tiered_cache(
+        "TRANSCRIPT_CACHE",
+        default_ttl=DEFAULT_TTL,
+        default_memory_max_bytes=DEFAULT_MEMORY_MAX_BYTES,
+        default_disk_max_bytes=DEFAULT_DISK_MAX_BYTES,
+        default_filename="transcripts.sqlite3"
+    )
+
+
+def get_transcript_cache() -> Optional[TieredCache]:
+    """Retourne le cache des transcriptions partagé (créé au premier appel)."""
+    return _get_shared_cache("transcripts", create_transcript_cache)
+
+
+def set_transcript_cache(cache: Optional[Any]) -> None:
+    """
+    Remplace le cache des transcriptions (ex: cache Redis, cache de test).
+    Tout objet exposant get(key) -> bytes|None et set(key, value, ttl=None) convient.
+    Passer None désactive le cache.
+    """
+    _set_shared_cache("transcripts", cache)
+
+
+# ============ CACHE DES RÉSULTATS DE GÉNÉRATION ============
+
+def create_result_cache() -> Optional[TieredCache]:
+    """
+    Crée le cache des résultats de génération (titres) à partir des variables d'environnement :
+    - RESULT_CACHE_ENABLED (1/0, défaut 1)
+    - RESULT_CACHE_TTL (secondes, défaut 24 heures)
+    - RESULT_CACHE_MEMORY_MAX_BYTES (défaut 16 Mo)
+    - RESULT_CACHE_MAX_BYTES (taille max du cache disque, défaut 64 Mo, 0 = pas de disque)
+    - RESULT_CACHE_PATH (fichier SQLite, défaut .cache/results.sqlite3)
+
+    Returns:
+        Le cache ou None si désactivé
+    """
+    return create_tiered_cache(
+        "RESULT_CACHE",
+        default_ttl=24 * 3600,
+        default_memory_max_bytes=16 * 1024 * 1024,
+        default_disk_max_bytes=64 * 1024 * 1024,
+        default_filename="results.sqlite3"
+    )
+
+
+def get_result_cache() -> Optional[TieredCache]:
+    """Retourne le cache des résultats de génération partagé (créé au premier appel)."""
+    return _get_shared_cache("results", create_result_cache)
+
+
+def set_result_cache(cache: Optional[Any]) -> None:
+    """Remplace (ou désactive avec None) le cache des résultats de génération."""
+    _set_shared_cache("results", cache)
+
+
+# ============ MÉTRIQUES ============
+
+def _shared_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Compteurs des caches partagés actifs, par nom."""
+    return {
+        name: cache.stats()
+        for name, cache in list(_shared_caches.items())
+        if cache is not None and hasattr(cache, "stats")
+    }
+
+
+def _cache_lookups() -> Dict[tuple, float]:
+    values = {}
+    for name, stats in _shared_cache_stats().items():
+        values[(name, "memory_hit")] = stats["memory_hits"]
+        values[(name, "disk_hit")] = stats["disk_hits"]
+        values[(name, "miss")] = stats["misses"]
+    return values
+
+
+callback_metric(
+    "ytg_cache_lookups_total",
+    "Lectures des caches partagés par résultat (memory_hit, disk_hit, miss)",
+    ["cache", "result"],
+    _cache_lookups,
+    kind="counter"
+)
+callback_metric(
+    "ytg_cache_hit_ratio",
+    "Part des lectures servies par le cache (mémoire ou disque)",
+    ["cache"],
+    lambda: {(name, ): stats["hit_ratio"] for name, stats in _shared_cache_stats().items()}
+)
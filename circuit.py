@@ -0,0 +1,160 @@
+"""
+Disjoncteur (circuit breaker) par service amont
+Quand youtube-transcript.io ou Anthropic est en panne, chaque appel attendait ses
+tentatives et ses timeouts (jusqu'à ~36 s) et les workers de l'API s'empilaient.
+Après plusieurs échecs consécutifs le circuit s'ouvre : les appels échouent aussitôt,
+puis un appel d'essai est laissé passer après un délai pour tester le rétablissement.
+
+États :
+- closed : fonctionnement normal, les échecs consécutifs sont comptés
+- open : appels refusés immédiatement pendant reset_timeout secondes
+- half_open : quelques appels d'essai ; un succès referme le circuit, un échec le rouvre
+"""
+import threading
+import time
+from typing import Any, Dict
+
+from config import env_float, env_int
+from metrics import callback_metric
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Disjoncteur thread-safe, partagé par les chemins synchrone et asynchrone."""
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 half_open_max_calls: int = 1):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = max(1, half_open_max_calls)
+        self.rejected = 0     # appels refusés circuit ouvert
+        self.opened = 0       # nombre d'ouvertures
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now: float) -> str:
+        if self._state == STATE_OPEN and now - self._opened_at >= self.reset_timeout:
+            self._state = STATE_HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    def retry_in(self) -> float:
+        """Secondes restantes avant le prochain appel d'essai (0 si le circuit n'est pas ouvert)."""
+        with self._lock:
+            if self._current_state(time.monotonic()) != STATE_OPEN:
+                return 0.0
+            return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        """
+        Indique si un appel peut partir. Circuit ouvert : False (échec immédiat) ;
+        semi-ouvert : seuls half_open_max_calls appels d'essai passent.
+        """
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == STATE_CLOSED:
+                return True
+            if state == STATE_HALF_OPEN and (
+                self._probes < self.half_open_max_calls
+                # Essai resté sans réponse (ni succès ni panne signalés) : on en autorise un autre
+                or now - self._probe_at >= self.reset_timeout
+            ):
+                self._probes += 1
+                self._probe_at = now
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        """Un appel a abouti : le circuit se referme et le compteur d'échecs repart à zéro."""
+        with self._lock:
+            self._state = STATE_CLOSED
+            self._failures = 0
+            self._probes = 0
+
+    def release(self) -> None:
+        """
+        Un appel autorisé s'est terminé sans verdict (client parti en cours de route) :
+        ni succès ni panne, mais sa place d'essai en semi-ouvert est libérée.
+        """
+        with self._lock:
+            if self._current_state(time.monotonic()) == STATE_HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def record_failure(self) -> None:
+        """Un appel a échoué (panne, timeout, 5xx) : ouvre le circuit au-delà du seuil."""
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            self._failures += 1
+            if state == STATE_HALF_OPEN or (state == STATE_CLOSED and self._failures >= self.failure_threshold):
+                self._state = STATE_OPEN
+                self._opened_at = now
+                self.opened += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """État courant et compteurs."""
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            retry_in = self._opened_at + self.reset_timeout - now if state == STATE_OPEN else 0.0
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "failure_threshold": self.failure_threshold,
+                "retry_in": round(max(0.0, retry_in), 3),
+                "opened": self.opened,
+                "rejected": self.rejected,
+            }
+
+
+_registry_lock = threading.Lock()
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def create_circuit_breaker(name: str, env_prefix: str, default_failures: int = 5,
+                           default_reset_timeout: float = 30.0) -> CircuitBreaker:
+    """
+    Crée (ou retourne) le disjoncteur nommé `name`, configuré par les variables
+    d'environnement <PREFIX>_CIRCUIT_FAILURES (échecs consécutifs avant ouverture)
+    et <PREFIX>_CIRCUIT_RESET (secondes avant un appel d'essai).
+    """
+    with _registry_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                name,
+                failure_threshold=env_int(f"{env_prefix}_CIRCUIT_FAILURES", default_failures),
+                reset_timeout=env_float(f"{env_prefix}_CIRCUIT_RESET", default_reset_timeout)
+            )
+            _breakers[name] = breaker
+        return breaker
+
+
+def circuit_breaker_stats() -> Dict[str, Dict[str, Any]]:
+    """État de tous les disjoncteurs, par nom (ex: {"youtube": {"state": "closed", ...}})."""
+    return {name: breaker.stats() for name, breaker in list(_breakers.items())}
+
+
+_STATE_VALUES = {STATE_CLOSED: 0, STATE_HALF_OPEN: 1, STATE_OPEN: 2}
+
+callback_metric(
+    "ytg_circuit_state",
+    "État du disjoncteur (0 = closed, 1 = half_open, 2 = open)",
+    ["upstream"],
+    lambda: {(name, ): _STATE_VALUES[breaker.state] for name, breaker in list(_breakers.items())}
+)
@@ -0,0 +1,245 @@
+"""
+Registre des clients HTTP et Anthropic partagés
+Les clients sont créés une seule fois puis réutilisés (connexions keep-alive),
+au lieu de refaire une poignée de main TLS à chaque appel.
+Utilisé par le CLI (main.py), l'interface Streamlit (app_web.py) et l'API (api.py).
+
+Les SDK (anthropic, requests, httpx) ne sont importés qu'à la création du premier client :
+à lui seul, anthropic prend plus d'une seconde à importer, ce qui allongeait le démarrage
+à froid (hébergeurs gratuits, CLI) même pour /health.
+"""
+import asyncio
+import threading
+import time
+import weakref
+from typing import TYPE_CHECKING, Dict, Any, Optional
+
+from config import env_int, env_float
+from metrics import UPSTREAM_RETRIES
+
+if TYPE_CHECKING:
+    import httpx
+    import requests
+    from anthropic import Anthropic, AsyncAnthropic
+
+
+# Configuration (surchargeable par variables d'environnement)
+HTTP_POOL_SIZE = env_int("HTTP_POOL_SIZE", 20)                  # connexions gardées par hôte
+HTTP_TIMEOUT = env_float("HTTP_TIMEOUT", 30.0)                  # secondes
+HTTP_KEEPALIVE_EXPIRY = env_float("HTTP_KEEPALIVE_EXPIRY", 60.0)  # secondes
+ANTHROPIC_TIMEOUT = env_float("ANTHROPIC_TIMEOUT", 120.0)       # secondes
+ANTHROPIC_MAX_RETRIES = env_int("ANTHROPIC_MAX_RETRIES", 2)
+
+_lock = threading.Lock()
+_http_session: Any = None
+_anthropic_clients: Dict[str, "Anthropic"] = {}
+
+# Les clients asynchrones sont liés à une boucle d'événements : un jeu par boucle
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+
+
+def get_http_session() -> "requests.Session":
+    """
+    Retourne la session requests partagée (pool de connexions keep-alive).
+
+    Returns:
+        Une requests.Session thread-safe pour des POST simples
+    """
+    global _http_session
+    if _http_session is None:
+        with _lock:
+            if _http_session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _http_session = session
+    return _http_session
+
+
+def get_anthropic_client(api_key: str) -> "Anthropic":
+    """
+    Retourne le client Anthropic partagé pour cette clé API.
+
+    Args:
+        api_key: Votre clé API Anthropic
+
+    Returns:
+        Un client Anthropic réutilisable (son pool de connexions reste ouvert)
+    """
+    client = _anthropic_clients.get(api_key)
+    if client is None:
+        with _lock:
+            client = _anthropic_clients.get(api_key)
+            if client is None:
+                from anthropic import Anthropic, DefaultHttpxClient
+
+                client = Anthropic(
+                    api_key=api_key,
+                    timeout=ANTHROPIC_TIMEOUT,
+                    max_retries=ANTHROPIC_MAX_RETRIES,
+                    http_client=DefaultHttpxClient(event_hooks={"request": [_count_anthropic_retry]})
+                )
+                _anthropic_clients[api_key] = client
+    return client
+
+
+def _count_anthropic_retry(request: "httpx.Request") -> None:
+    """
+    Hook httpx des clients Anthropic : les nouvelles tentatives sont faites par le SDK
+    (max_retries), qui numérote chaque envoi dans l'en-tête x-stainless-retry-count.
+    """
+    if request.headers.get("x-stainless-retry-count", "0") not in ("", "0"):
+        UPSTREAM_RETRIES.inc(upstream="anthropic")
+
+
+async def _count_anthropic_retry_async(request: "httpx.Request") -> None:
+    _count_anthropic_retry(request)
+
+
+def _loop_clients() -> Dict[str, Any]:
+    """Retourne le dictionnaire des clients asynchrones de la boucle courante."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = _async_clients.get(loop)
+        if clients is None:
+            clients = {}
+            _async_clients[loop] = clients
+    return clients
+
+
+def get_async_http_client() -> "httpx.AsyncClient":
+    """
+    Retourne le client httpx asynchrone partagé de la boucle d'événements courante.
+
+    Returns:
+        Un httpx.AsyncClient avec pool de connexions keep-alive
+    """
+    clients = _loop_clients()
+    client = clients.get("http")
+    if client is None or client.is_closed:
+        import httpx
+
+        client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=HTTP_POOL_SIZE,
+                max_keepalive_connections=HTTP_POOL_SIZE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+            )
+        )
+        clients["http"] = client
+    return client
+
+
+def get_async_anthropic_client(api_key: str) -> "AsyncAnthropic":
+    """
+    Retourne le client AsyncAnthropic partagé (boucle d'événements courante) pour cette clé API.
+
+    Args:
+        api_key: Votre clé API Anthropic
+
+    Returns:
+        Un client AsyncAnthropic réutilisable
+    """
+    clients = _loop_clients()
+    key = f"anthropic:{api_key}"
+    client = clients.get(key)
+    if client is None:
+        from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
+
+        client = AsyncAnthropic(
+            api_key=api_key,
+            timeout=ANTHROPIC_TIMEOUT,
+            max_retries=ANTHROPIC_MAX_RETRIES,
+            http_client=DefaultAsyncHttpxClient(event_hooks={"request": [_count_anthropic_retry_async]})
+        )
+        clients[key] = client
+    return client
+
+
+def close_clients() -> None:
+    """Ferme les clients synchrones (session HTTP et clients Anthropic)."""
+    global _http_session
+    with _lock:
+        if _http_session is not None:
+            _http_session.close()
+            _http_session = None
+        for client in _anthropic_clients.values():
+            client.close()
+        _anthropic_clients.clear()
+
+
+async def aclose_clients(timeout: float = 5.0) -> None:
+    """
+    Ferme tous les clients, asynchrones puis synchrones. À appeler à l'arrêt de l'API
+    (lifespan FastAPI).
+
+    Un client asynchrone ne peut être fermé que sur sa propre boucle : ceux de la boucle
+    courante sont fermés directement, ceux d'une autre boucle encore active (thread)
+    y sont fermés via run_coroutine_threadsafe (au plus `timeout` secondes). Ceux d'une
+    boucle arrêtée ou fermée sont seulement oubliés : leurs connexions ne peuvent plus
+    être fermées proprement et sont libérées avec la boucle.
+    """
+    current = asyncio.get_running_loop()
+    with _lock:
+        entries = list(_async_clients.items())
+        _async_clients.clear()
+
+    for loop, clients in entries:
+        if loop is current:
+            await _aclose_loop_clients(clients)
+        elif loop.is_running() and not loop.is_closed():
+            future = asyncio.run_coroutine_threadsafe(_aclose_loop_clients(clients), loop)
+            try:
+                await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+            except Exception:
+                pass
+    close_clients()
+
+
+async def _aclose_loop_clients(clients: Dict[str, Any]) -> None:
+    """Ferme les clients asynchrones d'une boucle (à exécuter sur cette boucle)."""
+    for key, client in clients.items():
+        if key == "http":
+            await client.aclose()
+        else:
+            await client.close()
+
+
+async def prewarm_clients(anthropic_api_key: Optional[str], urls: Dict[str, str],
+                          timeout: float = 5.0) -> Dict[str, Any]:
+    """
+    Prépare les clients asynchrones avant le premier appel : importe les SDK et ouvre
+    une connexion (DNS, TCP, TLS) vers chaque service amont, gardée dans le pool.
+    Une réponse d'erreur HTTP suffit (la connexion est ouverte) ; les échecs sont ignorés.
+
+    Args:
+        anthropic_api_key: Clé API Anthropic (None = pas de client Anthropic)
+        urls: Service -> URL à contacter (ex: {"youtube": TRANSCRIPT_API_URL})
+        timeout: Durée maximale de chaque connexion, en secondes
+
+    Returns:
+        Dict service -> durée en secondes (ou message d'erreur)
+    """
+    async def warm(name: str, connect) -> tuple:
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(connect(), timeout)
+        except Exception as e:
+            if getattr(e, "status_code", None) is None:
+                return name, f"{type(e).__name__}: {e}"
+            # Erreur HTTP (clé refusée...) : le service a répondu, la connexion est ouverte
+        return name, round(time.perf_counter() - started, 3)
+
+    http_client = get_async_http_client()
+    connections = [warm(name, lambda url=url: http_client.head(url)) for name, url in urls.items()]
+    if anthropic_api_key:
+        # Liste des modèles : requête légère et non facturée, sans nouvelle tentative ;
+        # la copie du client partage son pool de connexions
+        anthropic_client = get_async_anthropic_client(anthropic_api_key).with_options(max_retries=0)
+        connections.append(warm("anthropic", lambda: anthropic_client.models.list(limit=1)))
+    return dict(await asyncio.gather(*connections))
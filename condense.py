@@ -0,0 +1,145 @@
+"""
+Condensation des transcriptions avant l'envoi à Claude
+Au lieu de garder seulement les 3000 premiers caractères, on sélectionne les phrases
+les plus représentatives de toute la vidéo (score TF-IDF calculé en une seule passe),
+dans la limite d'un budget de tokens, en gardant l'introduction (l'accroche).
+"""
+import math
+import re
+from collections import Counter
+from typing import List, Tuple
+
+from config import env_int
+
+# Budget par défaut (≈ 3000 caractères, comme l'ancienne troncature)
+TRANSCRIPT_TOKEN_BUDGET = env_int("TRANSCRIPT_TOKEN_BUDGET", 750)
+
+# Estimation grossière pour le français : ~4 caractères par token
+CHARS_PER_TOKEN = 4
+
+# Part du budget réservée au début de la vidéo (l'accroche)
+INTRO_SHARE = 0.2
+
+# Taille max d'un segment : les sous-titres automatiques n'ont souvent pas de ponctuation,
+# on découpe alors le texte en fenêtres de mots
+MAX_UNIT_CHARS = 400
+WINDOW_WORDS = 50
+
+# Séparateur entre deux extraits non contigus
+GAP_MARKER = " [...] "
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?…])\s+")
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+# Mots vides (français + anglais courant) ignorés dans le score
+STOPWORDS = frozenset("""
+a à ai au aux avec avez avons c ça ce ces cet cette ci comme d dans de des du donc elle elles en
+encore est et été être eu fait faire il ils j je l la le les leur leurs lui m ma mais me même mes
+moi mon n ne nos notre nous on ont ou où par pas pour qu que quel quelle qui s sa sans se ses si
+son sont sur ta te tes toi ton tu un une vos votre vous y voilà alors bon bah ben euh hein oui non
+très tout tous toute toutes plus moins bien aussi peu parce quand puis être avoir va vais vont
+the and of to a in is it that this you for on with are be was as at so we they i
+""".split())
+
+
+def _split_units(text: str) -> List[str]:
+    """Découpe le texte en phrases, ou en fenêtres de mots si une phrase est trop longue."""
+    units = []
+    for sentence in _SENTENCE_SPLIT.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if len(sentence) <= MAX_UNIT_CHARS:
+            units.append(sentence)
+            continue
+        words = sentence.split()
+        for start in range(0, len(words), WINDOW_WORDS):
+            units.append(" ".join(words[start:start + WINDOW_WORDS]))
+    return units
+
+
+def _score_units(units: List[str]) -> List[float]:
+    """
+    Score TF-IDF de chaque segment : somme, sur ses mots distincts, de la fréquence du mot
+    dans toute la transcription pondérée par sa rareté entre segments, normalisée par la
+    longueur du segment. Les mots sont extraits une seule fois.
+    """
+    unit_words = [
+        [w for w in _WORD.findall(unit.lower()) if len(w) > 2 and w not in STOPWORDS]
+        for unit in units
+    ]
+    term_freq = Counter()
+    doc_freq = Counter()
+    for words in unit_words:
+        term_freq.update(words)
+        doc_freq.update(set(words))
+
+    num_units = len(units)
+    weights = {
+        word: math.log1p(count) * math.log((1 + num_units) / (1 + doc_freq[word]))
+        for word, count in term_freq.items()
+    }
+
+    return [
+        sum(weights[w] for w in set(words)) / math.sqrt(len(words)) if words else 0.0
+        for words in unit_words
+    ]
+
+
+def condense_transcript(transcript: str, max_tokens: int = TRANSCRIPT_TOKEN_BUDGET) -> str:
+    """
+    Produit un condensé représentatif de la transcription dans un budget de tokens.
+
+    L'introduction est toujours conservée (INTRO_SHARE du budget), puis les segments
+    les mieux notés sont ajoutés jusqu'à épuisement du budget. Les segments retenus
+    sont remis dans l'ordre chronologique, séparés par " [...] " quand ils ne se suivent pas.
+
+    Args:
+        transcript: La transcription complète
+        max_tokens: Budget approximatif en tokens (≈ 4 caractères par token)
+
+    Returns:
+        La transcription telle quelle si elle tient dans le budget, sinon le condensé
+    """
+    budget = max(1, max_tokens) * CHARS_PER_TOKEN
+    transcript = transcript.strip()
+    if len(transcript) <= budget:
+        return transcript
+
+    units = _split_units(transcript)
+    if not units:
+        return transcript[:budget]
+
+    selected: List[int] = []
+    used = 0
+
+    # 1. L'accroche : les premiers segments, dans la limite de INTRO_SHARE du budget
+    intro_budget = int(budget * INTRO_SHARE)
+    index = 0
+    while index < len(units) and used + len(units[index]) <= intro_budget:
+        selected.append(index)
+        used += len(units[index]) + 1
+        index += 1
+
+    # 2. Les segments les plus représentatifs du reste de la vidéo
+    scores = _score_units(units)
+    ranked: List[Tuple[float, int]] = sorted(
+        ((scores[i], i) for i in range(index, len(units))), reverse=True
+    )
+    for _, i in ranked:
+        cost = len(units[i]) + len(GAP_MARKER)
+        if used + cost > budget:
+            continue
+        selected.append(i)
+        used += cost
+
+    if not selected:
+        return units[0][:budget]
+
+    # 3. Remise dans l'ordre chronologique
+    selected.sort()
+    parts = [units[selected[0]]]
+    for previous, current in zip(selected, selected[1:]):
+        parts.append(" " if current == previous + 1 else GAP_MARKER)
+        parts.append(units[current])
+    return "".join(parts)
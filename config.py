@@ -0,0 +1,59 @@
+"""
+Lecture de la configuration depuis les variables d'environnement
+Fonctions utilitaires partagées par les modules (cache, clients, génération...)
+"""
+import os
+from pathlib import Path
+
+_env_loaded = False
+
+
+def env_int(name: str, default: int) -> int:
+    """Lit une variable d'environnement entière, avec valeur par défaut si absente ou invalide."""
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+def env_float(name: str, default: float) -> float:
+    """Lit une variable d'environnement décimale, avec valeur par défaut si absente ou invalide."""
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return default
+
+
+def env_bool(name: str, default: bool = True) -> bool:
+    """Lit une variable d'environnement booléenne (1/0, true/false, on/off)."""
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    return value.strip().lower() not in ("0", "false", "no", "off")
+
+
+def load_env() -> None:
+    """
+    Charge le fichier .env le plus proche (dossier du projet, puis ses parents), une seule fois.
+    python-dotenv n'est importé que si un .env existe : en production, les variables
+    viennent de l'hébergeur et le démarrage à froid n'en paie pas le coût.
+    Les variables déjà définies ne sont pas remplacées (comme load_dotenv()).
+    """
+    global _env_loaded
+    if _env_loaded:
+        return
+    _env_loaded = True
+    here = Path(__file__).resolve().parent
+    for directory in (here, *here.parents):
+        path = directory / ".env"
+        if path.is_file():
+            from dotenv import load_dotenv
+
+            load_dotenv(path)
+            return
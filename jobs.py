@@ -0,0 +1,307 @@
+"""
+Gestion des tâches asynchrones (jobs) de l'API
+Une tâche est enregistrée dans SQLite puis exécutée par un pool borné de workers :
+le client reçoit immédiatement un ID, consulte l'état avec GET /jobs/{id} et peut
+recevoir le résultat sur une URL de callback (webhook).
+Les tâches non terminées sont reprises au redémarrage de l'API.
+"""
+import asyncio
+import ipaddress
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from clients import get_async_http_client
+from config import env_bool, env_int
+from logging_config import current_context, get_logger, log_context
+
+logger = get_logger("jobs")
+
+# États possibles d'une tâche
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+
+DEFAULT_JOBS_PATH = Path(__file__).parent / ".cache" / "jobs.sqlite3"
+# Base SQLite en mémoire : repli quand le fichier ne peut pas être ouvert (pas de reprise au redémarrage)
+IN_MEMORY = ":memory:"
+
+# Callbacks vers localhost / adresses privées (n8n sur le même réseau Docker...) : refusés par défaut
+CALLBACK_ALLOW_PRIVATE = env_bool("JOBS_CALLBACK_ALLOW_PRIVATE", False)
+
+# Exécute une tâche : reçoit (kind, payload) et retourne le résultat (dict JSON)
+JobRunner = Callable[[str, Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+def validate_callback_url(url: str) -> str:
+    """
+    Vérifie une URL de callback avant d'enregistrer la tâche : http(s) avec un hôte, et
+    (sauf JOBS_CALLBACK_ALLOW_PRIVATE=1) ni localhost ni adresse IP privée, de bouclage ou
+    link-local (métadonnées cloud), que le serveur appellerait sinon pour le compte du client.
+
+    Raises:
+        ValueError: URL refusée (message renvoyé au client)
+    """
+    parts = urlsplit(url.strip())
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError("callback_url doit être une URL http(s) complète")
+    if CALLBACK_ALLOW_PRIVATE:
+        return url.strip()
+
+    host = parts.hostname.rstrip(".").lower()
+    if host == "localhost" or host.endswith(".localhost"):
+        raise ValueError("callback_url ne peut pas viser localhost")
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return url.strip()
+    if not address.is_global:
+        raise ValueError("callback_url ne peut pas viser une adresse IP privée ou réservée")
+    return url.strip()
+
+
+class JobStore:
+    """Stockage persistant des tâches dans une base SQLite locale (ou en mémoire avec IN_MEMORY)."""
+
+    def __init__(self, path: Path = DEFAULT_JOBS_PATH):
+        self.path = Path(path)
+        if str(path) != IN_MEMORY:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=10)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    callback_url TEXT,
+                    callback_status TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)")
+            self._conn.commit()
+
+    def create(self, kind: str, payload: Dict[str, Any], callback_url: Optional[str] = None) -> Dict[str, Any]:
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, payload, status, callback_url, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload, ensure_ascii=False), STATUS_QUEUED, callback_url, now, now)
+            )
+            self._conn.commit()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        if "result" in fields and fields["result"] is not None:
+            fields["result"] = json.dumps(fields["result"], ensure_ascii=False)
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+            self._conn.commit()
+
+    def unfinished(self) -> List[Dict[str, Any]]:
+        """Tâches en attente ou interrompues en cours d'exécution, par ordre d'arrivée."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+                (STATUS_QUEUED, STATUS_RUNNING)
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def pending_callbacks(self) -> List[Dict[str, Any]]:
+        """Tâches terminées dont le callback n'a pas été envoyé (API arrêtée entre les deux)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) AND callback_url IS NOT NULL "
+                "AND callback_status IS NULL ORDER BY created_at",
+                (STATUS_SUCCEEDED, STATUS_FAILED)
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "job_id": row["id"],
+            "kind": row["kind"],
+            "payload": json.loads(row["payload"]),
+            "status": row["status"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "callback_url": row["callback_url"],
+            "callback_status": row["callback_status"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+
+
+class JobManager:
+    """
+    File de tâches exécutées par un pool borné de workers asyncio.
+    Le résultat d'une tâche est enregistré puis, si une URL de callback est fournie,
+    envoyé en POST (JSON) avec quelques tentatives.
+    Les accès au JobStore (SQLite, commit à chaque changement d'état) passent par un
+    thread pour ne pas bloquer la boucle d'événements.
+    """
+
+    def __init__(self, store: JobStore, runner: JobRunner, max_workers: int = 4, callback_retries: int = 3):
+        self.store = store
+        self.runner = runner
+        self.max_workers = max(1, max_workers)
+        self.callback_retries = callback_retries
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue()
+        self._workers: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        """
+        Démarre les workers et reprend les tâches non terminées (redémarrage), ainsi que
+        les callbacks des tâches terminées qui n'ont pas pu être envoyés.
+        """
+        for job in await asyncio.to_thread(self.store.unfinished):
+            if job["status"] == STATUS_RUNNING:
+                await asyncio.to_thread(self.store.update, job["job_id"], status=STATUS_QUEUED)
+            self._queue.put_nowait(job["job_id"])
+        for job in await asyncio.to_thread(self.store.pending_callbacks):
+            self._queue.put_nowait(job["job_id"])
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.max_workers)]
+
+    async def stop(self) -> None:
+        """Arrête les workers. Les tâches en cours restent 'running' et seront reprises au démarrage."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(self, kind: str, payload: Dict[str, Any], callback_url: Optional[str] = None) -> Dict[str, Any]:
+        """Enregistre une tâche et la place dans la file. Retourne la tâche (état 'queued')."""
+        # La tâche garde le correlation_id de la requête qui l'a créée (logs reliés)
+        correlation_id = current_context()["correlation_id"]
+        if correlation_id:
+            payload = {**payload, "correlation_id": correlation_id}
+        job = await asyncio.to_thread(self.store.create, kind, payload, callback_url)
+        await self._queue.put(job["job_id"])
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    @property
+    def queue_size(self) -> int:
+        return self._queue.qsize()
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception:
+                logger.exception("❌ Erreur inattendue sur la tâche %s", job_id, extra={"job_id": job_id})
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is None:
+            return
+        if job["status"] not in (STATUS_QUEUED, STATUS_RUNNING):
+            # Tâche terminée avant un redémarrage : seul le callback reste à envoyer
+            if job["callback_url"] and job["callback_status"] is None:
+                with log_context(request_id=job_id, correlation_id=job["payload"].get("correlation_id")):
+                    await self._send_callback(job)
+            return
+
+        # Logs de la tâche : request_id = ID de la tâche, correlation_id = celui de la requête d'origine
+        with log_context(request_id=job_id, correlation_id=job["payload"].get("correlation_id")):
+            await asyncio.to_thread(self.store.update, job_id, status=STATUS_RUNNING)
+            logger.info("Tâche %s démarrée", job_id, extra={"job_id": job_id, "kind": job["kind"]})
+            try:
+                result = await self.runner(job["kind"], job["payload"])
+                if result.get("success", True):
+                    await asyncio.to_thread(self.store.update, job_id, status=STATUS_SUCCEEDED, result=result)
+                else:
+                    await asyncio.to_thread(self.store.update, job_id, status=STATUS_FAILED, result=result,
+                                            error=result.get("error"))
+            except asyncio.CancelledError:
+                # Arrêt de l'API : la tâche sera reprise au prochain démarrage
+                raise
+            except Exception as e:
+                logger.exception("❌ Échec de la tâche %s", job_id, extra={"job_id": job_id})
+                await asyncio.to_thread(self.store.update, job_id, status=STATUS_FAILED,
+                                        error=f"{type(e).__name__}: {str(e)}")
+
+            job = await asyncio.to_thread(self.store.get, job_id)
+            if job and job["callback_url"]:
+                await self._send_callback(job)
+
+    async def _send_callback(self, job: Dict[str, Any]) -> None:
+        """Envoie la tâche terminée à son URL de callback (POST JSON)."""
+        body = {key: value for key, value in job.items() if key not in ("payload", "callback_status")}
+        client = get_async_http_client()
+        last_error = None
+
+        for attempt in range(self.callback_retries):
+            try:
+                response = await client.post(job["callback_url"], json=body)
+                if response.status_code < 400:
+                    await asyncio.to_thread(self.store.update, job["job_id"], callback_status=f"sent ({response.status_code})")
+                    return
+                last_error = f"HTTP {response.status_code}"
+            except Exception as e:
+                last_error = f"{type(e).__name__}: {str(e)}"
+
+            if attempt < self.callback_retries - 1:
+                await asyncio.sleep(2 ** attempt)
+
+        logger.warning("Callback de la tâche %s non envoyé: %s", job["job_id"], last_error,
+                       extra={"job_id": job["job_id"]})
+        await asyncio.to_thread(self.store.update, job["job_id"], callback_status=f"failed ({last_error})")
+
+
+def create_job_manager(runner: JobRunner) -> JobManager:
+    """
+    Crée le gestionnaire de tâches à partir des variables d'environnement :
+    - JOBS_MAX_WORKERS (nombre de tâches exécutées en parallèle, défaut 4)
+    - JOBS_DB_PATH (fichier SQLite, défaut .cache/jobs.sqlite3)
+    - JOBS_CALLBACK_RETRIES (tentatives d'envoi du callback, défaut 3)
+
+    Si la base ne peut pas être ouverte (système de fichiers en lecture seule...), les
+    tâches sont gardées en mémoire : l'API fonctionne mais ne les reprend pas au redémarrage.
+    """
+    path = os.getenv("JOBS_DB_PATH") or str(DEFAULT_JOBS_PATH)
+    try:
+        store = JobStore(Path(path))
+    except (OSError, sqlite3.Error) as e:
+        logger.warning("⚠️ Base des tâches %s inaccessible (%s), tâches gardées en mémoire", path, e)
+        store = JobStore(IN_MEMORY)
+    return JobManager(
+        store,
+        runner,
+        max_workers=env_int("JOBS_MAX_WORKERS", 4),
+        callback_retries=env_int("JOBS_CALLBACK_RETRIES", 3)
+    )
@@ -0,0 +1,219 @@
+"""
+Journalisation structurée (remplace les print() du chemin critique)
+- Niveau réglable : LOG_LEVEL (DEBUG, INFO, WARNING...), ex: WARNING en production
+- Format : LOG_FORMAT=text (messages lisibles avec emojis, pour le CLI et Streamlit)
+  ou json (une ligne JSON par événement, pour l'API en production)
+- Les messages passent par une file (QueueHandler) : l'écriture sur la sortie est faite
+  par un thread dédié, les workers ne sont jamais bloqués par stdout
+- Chaque ligne porte le request_id et le correlation_id du contexte courant (contextvars),
+  ce qui relie la récupération de la transcription et la génération d'une même demande
+"""
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Optional, TextIO
+
+# Logger parent de tous les modules du projet
+ROOT_LOGGER = "ytg"
+
+_request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+_correlation_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("correlation_id", default=None)
+
+# Attributs standard d'un LogRecord : tout le reste vient de extra={...}
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_lock = threading.Lock()
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Retourne le logger d'un module du projet (ex: get_logger("youtube_api"))."""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def new_request_id() -> str:
+    """Génère un identifiant de requête."""
+    return uuid.uuid4().hex
+
+
+@contextmanager
+def log_context(request_id: Optional[str] = None, correlation_id: Optional[str] = None) -> Iterator[Dict[str, Optional[str]]]:
+    """
+    Associe un request_id et un correlation_id à tous les messages émis dans le bloc
+    (y compris dans les tâches asyncio créées depuis ce bloc).
+
+    Args:
+        request_id: ID de la requête (généré si absent)
+        correlation_id: ID reliant plusieurs requêtes d'un même traitement (= request_id si absent)
+
+    Returns:
+        Le contexte appliqué {"request_id": ..., "correlation_id": ...}
+    """
+    request_id = request_id or new_request_id()
+    correlation_id = correlation_id or _correlation_id.get() or request_id
+    request_token = _request_id.set(request_id)
+    correlation_token = _correlation_id.set(correlation_id)
+    try:
+        yield {"request_id": request_id, "correlation_id": correlation_id}
+    finally:
+        _request_id.reset(request_token)
+        _correlation_id.reset(correlation_token)
+
+
+def current_context() -> Dict[str, Optional[str]]:
+    """Retourne le request_id et le correlation_id courants (None hors contexte)."""
+    return {"request_id": _request_id.get(), "correlation_id": _correlation_id.get()}
+
+
+class ContextFilter(logging.Filter):
+    """Ajoute request_id et correlation_id au message, dans le thread qui l'émet."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        record.correlation_id = _correlation_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Une ligne JSON par message : horodatage, niveau, logger, message, IDs et champs extra."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and value is not None:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class ConsoleFormatter(logging.Formatter):
+    """Format lisible du CLI : le message seul, la trace d'erreur uniquement en DEBUG."""
+
+    def __init__(self, show_traceback: bool = False):
+        super().__init__("%(message)s")
+        self.show_traceback = show_traceback
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        if self.show_traceback:
+            if record.exc_info and not record.exc_text:
+                record.exc_text = self.formatException(record.exc_info)
+            if record.exc_text:
+                message = f"{message}\n{record.exc_text}"
+        return message
+
+
+class _ContextQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler qui garde les champs structurés : le message est figé et la trace
+    d'erreur convertie en texte dans le thread émetteur, le formatage final (texte ou
+    JSON) est fait par le thread d'écriture.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _utf8_stream(stream: TextIO) -> TextIO:
+    """Console Windows (cp1252) : passe la sortie en UTF-8 pour les emojis."""
+    encoding = (getattr(stream, "encoding", None) or "").lower()
+    if encoding not in ("utf-8", "utf8") and hasattr(stream, "reconfigure"):
+        try:
+            stream.reconfigure(encoding="utf-8", errors="replace")
+        except (ValueError, OSError):
+            pass
+    return stream
+
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None,
+                      stream: Optional[TextIO] = None, default_format: str = "text",
+                      use_queue: bool = True) -> logging.Logger:
+    """
+    Configure la journalisation du projet (idempotent : un nouvel appel remplace la configuration).
+
+    Args:
+        level: Niveau minimum (défaut : LOG_LEVEL ou INFO)
+        fmt: "text" ou "json" (défaut : LOG_FORMAT ou default_format)
+        stream: Sortie (défaut : sys.stdout)
+        default_format: Format utilisé si ni fmt ni LOG_FORMAT ne sont fournis
+        use_queue: Écriture par un thread dédié (False pour le CLI : les messages restent
+            dans l'ordre des print() du script)
+
+    Returns:
+        Le logger parent du projet
+    """
+    global _listener
+    level_name = (level or os.getenv("LOG_LEVEL") or "INFO").upper()
+    numeric_level = logging.getLevelName(level_name)
+    if not isinstance(numeric_level, int):
+        numeric_level = logging.INFO
+    fmt = (fmt or os.getenv("LOG_FORMAT") or default_format).lower()
+
+    output = logging.StreamHandler(_utf8_stream(stream or sys.stdout))
+    if fmt == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(ConsoleFormatter(show_traceback=numeric_level <= logging.DEBUG))
+
+    if use_queue:
+        log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+        handler: logging.Handler = _ContextQueueHandler(log_queue)
+    else:
+        handler = output
+    handler.addFilter(ContextFilter())
+
+    root = logging.getLogger(ROOT_LOGGER)
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        root.setLevel(numeric_level)
+        root.propagate = False
+        if use_queue:
+            _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+            _listener.start()
+    return root
+
+
+def is_logging_configured() -> bool:
+    """Indique si configure_logging a déjà été appelé dans ce processus."""
+    return bool(logging.getLogger(ROOT_LOGGER).handlers)
+
+
+def shutdown_logging() -> None:
+    """Vide la file et arrête le thread d'écriture (appelé automatiquement à la sortie)."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+atexit.register(shutdown_logging)
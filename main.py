@@ -1,12 +1,20 @@
 """
 Employé Virtuel - Générateur de Titres YouTube
 Script principal
+
+    python main.py                                   # une vidéo, mode interactif
+    python main.py --batch videos.txt -o titres.csv  # par lots (une URL ou description par ligne)
+    cat videos.txt | python main.py --batch - --workers 8 --resume -o titres.jsonl
 """
+import argparse
 import os
 import sys
-from dotenv import load_dotenv
+from pathlib import Path
 from youtube_api import get_transcript_from_url
 from title_generator import generate_titles
+from clients import close_clients
+from config import env_int, load_env
+from logging_config import configure_logging
 
 # Configuration de l'encodage UTF-8 pour Windows
 if sys.platform == 'win32' and hasattr(sys.stdout, 'buffer'):
@@ -20,15 +28,104 @@ if sys.platform == 'win32' and hasattr(sys.stdout, 'buffer'):
         pass
 
 
-def main():
+def parse_args(argv=None) -> argparse.Namespace:
+    """Options de la ligne de commande (sans option : mode interactif)"""
+    parser = argparse.ArgumentParser(description="Générateur de titres YouTube (interactif, ou par lots avec --batch)")
+    parser.add_argument("--batch", metavar="FICHIER",
+                        help="Traiter un fichier d'entrées (une URL YouTube ou une description par ligne), - pour l'entrée standard")
+    parser.add_argument("-o", "--output", type=Path, default=Path("titres.jsonl"),
+                        help="Fichier de résultats, écrit au fil de l'eau (défaut: titres.jsonl)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="Format de sortie (défaut: d'après l'extension)")
+    parser.add_argument("-j", "--workers", type=int, default=env_int("BATCH_CONCURRENCY", 4),
+                        help="Générations simultanées (défaut: BATCH_CONCURRENCY ou 4)")
+    parser.add_argument("-n", "--num-titles", type=int, default=5, help="Titres par vidéo (défaut: 5)")
+    parser.add_argument("--prompt", help="System prompt à utiliser (fichier prompts/<nom>.txt)")
+    parser.add_argument("--languages", help="Langues de transcription préférées, par ordre (ex: fr,en)")
+    parser.add_argument("--channel", default=os.getenv("YOUTUBE_CHANNEL"),
+                        help="Chaîne YouTube dont l'historique sert à repérer les titres déjà utilisés (défaut: YOUTUBE_CHANNEL)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Reprendre : ignorer les entrées déjà réussies dans le fichier de sortie")
+    parser.add_argument("--overwrite", action="store_true", help="Écraser le fichier de sortie s'il existe")
+    return parser.parse_args(argv)
+
+
+def batch_mode(args: argparse.Namespace, anthropic_api_key: str) -> int:
+    """Mode par lots : retourne le code de sortie (1 si au moins une entrée a échoué)"""
+    import batch
+
+    output = args.output
+    fmt = batch.output_format(output, args.format)
+    if output.exists() and output.stat().st_size > 0 and not (args.resume or args.overwrite):
+        print(f"❌ {output} existe déjà : ajoutez --resume pour reprendre ou --overwrite pour l'écraser")
+        return 2
+
+    if args.batch == "-":
+        inputs = batch.read_inputs(sys.stdin)
+    else:
+        try:
+            with open(args.batch, encoding="utf-8") as source:
+                inputs = batch.read_inputs(source)
+        except OSError as e:
+            print(f"❌ Impossible de lire {args.batch}: {e}")
+            return 2
+
+    completed = batch.load_completed(output, fmt) if args.resume else set()
+    remaining = sum(1 for item in inputs if item not in completed)
+    print(f"📥 {len(inputs)} entrée(s), {len(inputs) - remaining} déjà traitée(s), {remaining} à traiter "
+          f"({args.workers} en parallèle) → {output}")
+    if not remaining:
+        print("✅ Rien à faire.")
+        return 0
+
+    languages = [language.strip() for language in args.languages.split(",")] if args.languages else None
+    try:
+        writer = batch.ResultWriter(output, fmt, args.num_titles, append=args.resume)
+    except ValueError as e:
+        print(f"❌ Reprise impossible : {e}")
+        return 2
+    progress = batch.ProgressBar(remaining)
+
+    def on_result(record):
+        writer.write(record)
+        progress.update(record["success"])
+
+    try:
+        counts = batch.run_batch(
+            inputs, anthropic_api_key, on_result,
+            workers=args.workers, num_titles=args.num_titles, prompt_name=args.prompt,
+            languages=languages, skip=completed, channel=args.channel
+        )
+    except KeyboardInterrupt:
+        progress.close()
+        print(f"⏸️  Interrompu : relancez avec --resume pour continuer ({output})")
+        return 130
+    finally:
+        writer.close()
+    progress.close()
+
+    print(f"✅ Terminé : {counts['succeeded']} réussie(s), {counts['failed']} en échec, "
+          f"{counts['skipped']} déjà traitée(s) → {output}")
+    if counts["failed"]:
+        print("   → Relancez avec --resume pour retenter les entrées en échec")
+    return 1 if counts["failed"] else 0
+
+
+def main(argv=None):
     """Fonction principale du programme"""
+    args = parse_args(argv)
+
+    # Messages des modules au format lisible, écrits directement (dans l'ordre des print) ;
+    # en mode par lots, seuls les avertissements (la barre de progression reste lisible)
+    configure_logging(level=None if not args.batch else (os.getenv("LOG_LEVEL") or "WARNING"),
+                      default_format="text", use_queue=False)
+
     print("=" * 60)
     print("🎬 EMPLOYÉ VIRTUEL - GÉNÉRATEUR DE TITRES YOUTUBE")
     print("=" * 60)
     print()
 
     # Charger les variables d'environnement depuis .env
-    load_dotenv()
+    load_env()
 
     # Récupérer la clé API Anthropic
     anthropic_api_key = os.getenv("ANTHROPIC_API_KEY")
@@ -38,12 +135,15 @@ def main():
         print("❌ Erreur : Clé API Anthropic non configurée !")
         print("   → Ajoutez votre clé dans le fichier .env")
         print("   → Obtenez votre clé sur : https://console.anthropic.com/")
-        return
+        return 1
 
     print("✅ Clé API Anthropic configurée")
     print("ℹ️  La récupération des transcriptions YouTube est gratuite (pas de clé nécessaire)")
     print()
 
+    if args.batch:
+        return batch_mode(args, anthropic_api_key)
+
     # Demander l'URL de la vidéo YouTube
     youtube_url = input("🔗 Entrez le lien de votre vidéo YouTube : ").strip()
     print()
@@ -66,10 +166,11 @@ def main():
     # Étape 2 : Générer les titres
     print("✨ ÉTAPE 2/2 : Génération des titres")
     print("-" * 60)
-    titles = generate_titles(transcript, anthropic_api_key, num_titles=5)
+    result = generate_titles(transcript, anthropic_api_key, num_titles=5, channel=args.channel)
+    titles = result.get("titles") or []
 
     if not titles:
-        print("❌ Impossible de générer les titres.")
+        print(f"❌ {result.get('error') or 'Impossible de générer les titres.'}")
         return
 
     print()
@@ -78,8 +179,16 @@ def main():
     print("=" * 60)
     print()
 
+    scores = result.get("scores") or []
+    details = result.get("details") or []
     for i, title in enumerate(titles, 1):
-        print(f"{i}. {title}")
+        score = scores[i - 1] if i <= len(scores) else None
+        print(f"{i}. {title}" + (f"  ({score:g}/10)" if score is not None else ""))
+        similar = details[i - 1].get("similar_to") if i <= len(details) else None
+        if similar:
+            print(f"   ⚠️ Proche d'un titre déjà utilisé : « {similar[0]['title']} »")
+    if result.get("filtered_titles"):
+        print(f"\n🔁 {len(result['filtered_titles'])} titre(s) trop proche(s) de l'historique retiré(s)")
 
     print()
     print("=" * 60)
@@ -88,4 +197,9 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    try:
+        exit_code = main()
+    finally:
+        # Fermer proprement les connexions HTTP/Anthropic partagées
+        close_clients()
+    sys.exit(exit_code)
@@ -0,0 +1,237 @@
+"""
+Métriques de performance au format Prometheus (sans dépendance externe)
+Les modules instrumentés (youtube_api, title_generator, cache...) enregistrent leurs
+compteurs et histogrammes ici ; le CLI et Streamlit en profitent aussi, et l'API les
+expose sur GET /metrics.
+
+Exemple :
+    STAGE_SECONDS = histogram("ytg_stage_duration_seconds", "Durée des étapes", ["stage"])
+    with STAGE_SECONDS.time(stage="transcript_fetch"):
+        ...
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Bornes par défaut des histogrammes (secondes) : de 5 ms à 2 minutes
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base commune : nom, aide, noms des labels et verrou."""
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Compteur croissant, par combinaison de labels."""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    """Histogramme (bornes cumulées, somme et nombre d'observations), par combinaison de labels."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelValues, List[float]] = {}  # [compte par borne..., +Inf, somme]
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = [0.0] * (len(self.buckets) + 2)
+                self._series[key] = series
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Mesure la durée du bloc `with` (y compris en cas d'exception)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return int(series[-2]) if series else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        lines = []
+        for key, series in items:
+            for index, bound in enumerate(self.buckets):
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {_format_value(series[index])}")
+            labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {_format_value(series[-2])}")
+            plain = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{plain} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{plain} {_format_value(series[-2])}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """
+    Métrique calculée au moment de l'export (ex: ratio de hits d'un cache) :
+    `callback` retourne {(valeurs des labels): valeur}.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str],
+                 callback: Callable[[], Dict[LabelValues, float]], kind: str = "gauge"):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self.callback = callback
+
+    def _samples(self) -> List[str]:
+        try:
+            values = self.callback()
+        except Exception:
+            # Une métrique calculée ne doit jamais faire échouer l'export
+            return []
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+
+class Registry:
+    """Ensemble des métriques du processus, dans l'ordre d'enregistrement."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Enregistre une métrique ; si le nom existe déjà, retourne l'existante."""
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Export au format texte Prometheus (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    """Crée (ou retourne) un compteur du registre partagé."""
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def histogram(name: str, documentation: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    """Crée (ou retourne) un histogramme du registre partagé."""
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+def callback_metric(name: str, documentation: str, labelnames: Sequence[str],
+                    callback: Callable[[], Dict[LabelValues, float]], kind: str = "gauge") -> CallbackMetric:
+    """Crée (ou retourne) une métrique calculée à l'export."""
+    return REGISTRY.register(CallbackMetric(name, documentation, labelnames, callback, kind))
+
+
+def render_metrics() -> str:
+    """Retourne toutes les métriques au format texte Prometheus."""
+    return REGISTRY.render()
+
+
+# ============ MÉTRIQUES COMMUNES ============
+# Partagées par youtube_api et title_generator
+
+# Étapes : url_parse, transcript_fetch, prompt_build, claude_call, title_parse
+STAGE_SECONDS = histogram(
+    "ytg_stage_duration_seconds",
+    "Durée de chaque étape du pipeline, en secondes",
+    ["stage"]
+)
+
+UPSTREAM_RESPONSES = counter(
+    "ytg_upstream_responses_total",
+    "Réponses des services amont par code HTTP (error = pas de réponse : timeout, connexion)",
+    ["upstream", "status"]
+)
+
+UPSTREAM_RETRIES = counter(
+    "ytg_upstream_retries_total",
+    "Nouvelles tentatives d'appel vers un service amont (boucle YouTube, SDK Anthropic)",
+    ["upstream"]
+)
@@ -0,0 +1,138 @@
+"""
+Registre des system prompts (fichiers prompts/<nom>.txt)
+Les prompts sont gardés en mémoire et relus uniquement si le fichier change
+(date de modification ou taille), ce qui permet de les modifier sans redémarrer.
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from config import env_float
+
+
+# Prompt utilisé quand aucun nom n'est précisé
+DEFAULT_PROMPT_NAME = "system_prompt"
+PROMPTS_DIR = Path(__file__).parent / "prompts"
+
+# Délai minimum entre deux vérifications du fichier sur disque (secondes)
+PROMPT_RELOAD_INTERVAL = env_float("PROMPT_RELOAD_INTERVAL", 1.0)
+
+# Noms autorisés : évite de lire un fichier en dehors de prompts/
+_VALID_NAME = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class LoadedPrompt(NamedTuple):
+    """Un system prompt chargé en mémoire."""
+    name: str
+    content: str
+    hash: str  # empreinte SHA-256 du contenu, stable tant que le fichier ne change pas
+
+
+class _Entry:
+    """Entrée du registre : prompt chargé + signature du fichier au moment de la lecture."""
+    __slots__ = ("prompt", "signature", "checked_at")
+
+    def __init__(self, prompt: Optional[LoadedPrompt], signature: Optional[Tuple[int, int]], checked_at: float):
+        self.prompt = prompt
+        self.signature = signature
+        self.checked_at = checked_at
+
+
+class PromptRegistry:
+    """
+    Registre mémoïsé des system prompts d'un dossier.
+    Le fichier n'est relu que si sa date de modification ou sa taille change, et
+    sa signature n'est vérifiée qu'une fois par intervalle (reload_interval).
+    """
+
+    def __init__(self, directory: Path = PROMPTS_DIR, reload_interval: float = PROMPT_RELOAD_INTERVAL):
+        self.directory = Path(directory)
+        self.reload_interval = reload_interval
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: Optional[str] = None) -> Optional[LoadedPrompt]:
+        """
+        Retourne le prompt demandé.
+
+        Args:
+            name: Nom du prompt (fichier prompts/<nom>.txt), None = prompt par défaut
+
+        Returns:
+            Le prompt chargé, ou None si le fichier est absent, vide ou le nom invalide
+        """
+        name = name or DEFAULT_PROMPT_NAME
+        if not _VALID_NAME.match(name):
+            return None
+
+        now = time.monotonic()
+        entry = self._entries.get(name)
+        if entry is not None and now - entry.checked_at < self.reload_interval:
+            return entry.prompt
+
+        with self._lock:
+            entry = self._entries.get(name)
+            signature = self._signature(name)
+            if entry is None or entry.signature != signature:
+                entry = _Entry(self._read(name) if signature else None, signature, now)
+                self._entries[name] = entry
+            else:
+                entry.checked_at = now
+            return entry.prompt
+
+    def list_prompts(self) -> List[str]:
+        """Retourne les noms des prompts disponibles dans le dossier."""
+        if not self.directory.is_dir():
+            return []
+        return sorted(path.stem for path in self.directory.glob("*.txt") if _VALID_NAME.match(path.stem))
+
+    def clear(self) -> None:
+        """Vide le registre (force la relecture au prochain appel)."""
+        with self._lock:
+            self._entries.clear()
+
+    def _path(self, name: str) -> Path:
+        return self.directory / f"{name}.txt"
+
+    def _signature(self, name: str) -> Optional[Tuple[int, int]]:
+        """Signature (mtime en ns, taille) du fichier, None s'il n'existe pas."""
+        try:
+            stat = os.stat(self._path(name))
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read(self, name: str) -> Optional[LoadedPrompt]:
+        try:
+            content = self._path(name).read_text(encoding="utf-8").strip()
+        except OSError:
+            return None
+        if not content:
+            return None
+        content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        return LoadedPrompt(name=name, content=content, hash=content_hash)
+
+
+_registry = PromptRegistry()
+
+
+def get_prompt_registry() -> PromptRegistry:
+    """Retourne le registre de prompts partagé."""
+    return _registry
+
+
+def get_system_prompt(name: Optional[str] = None) -> Optional[LoadedPrompt]:
+    """
+    Raccourci : retourne le system prompt `name` depuis le registre partagé.
+
+    Args:
+        name: Nom du prompt (fichier prompts/<nom>.txt), None = prompt par défaut
+
+    Returns:
+        Le prompt chargé ou None s'il n'existe pas
+    """
+    return _registry.get(name)
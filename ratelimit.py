@@ -0,0 +1,253 @@
+"""
+Limitation de débit côté client (token bucket) pour youtube-transcript.io et Anthropic
+Chaque appel réserve sa place dans un seau partagé par amont : les appels sont servis
+dans l'ordre d'arrivée au rythme autorisé, au lieu de partir tous ensemble, de recevoir
+des 429 et de dormir chacun de leur côté. Un 429 (et son en-tête Retry-After) met le
+seau en pause et réduit le débit, qui remonte progressivement après les succès.
+"""
+import asyncio
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+from config import env_float
+from metrics import callback_metric
+
+
+# Facteurs d'adaptation : débit divisé par 2 après un 429, +10 % du débit nominal par succès
+BACKOFF_FACTOR = 0.5
+RECOVERY_STEP = 0.1
+MIN_RATE_SHARE = 0.1
+
+
+def parse_retry_after(value: Optional[str], default: float = 10.0) -> float:
+    """
+    Convertit un en-tête Retry-After (secondes ou date HTTP) en secondes d'attente.
+
+    Args:
+        value: Valeur de l'en-tête (ou None)
+        default: Attente retenue si l'en-tête est absent ou illisible
+
+    Returns:
+        Le nombre de secondes à attendre (>= 0)
+    """
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+class TokenBucket:
+    """
+    Seau à jetons avec réservation : chaque appel retire ses jetons tout de suite
+    (le solde peut devenir négatif) et attend le temps nécessaire pour rembourser
+    sa dette. Les appels sont donc servis dans l'ordre d'arrivée (équitable).
+
+    rate <= 0 signifie illimité.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.nominal_rate = rate
+        self.rate = rate
+        self.capacity = capacity if capacity and capacity > 0 else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    @property
+    def limited(self) -> bool:
+        return self.nominal_rate > 0
+
+    def _refill(self, now: float) -> None:
+        # Pas de remplissage avant la fin d'une pause (_updated dans le futur)
+        if now > self._updated:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Retire `amount` jetons et retourne l'attente nécessaire (secondes)."""
+        if not self.limited or amount <= 0:
+            return 0.0
+        self._refill(now)
+        self._tokens -= amount
+        return max(0.0, self._updated - now) + max(0.0, -self._tokens / self.rate)
+
+    def adjust(self, amount: float, now: float) -> None:
+        """Retire (ou rend, si négatif) des jetons sans attendre : correction a posteriori."""
+        if self.limited:
+            self._refill(now)
+            self._tokens = min(self.capacity, self._tokens - amount)
+
+    def slow_down(self, now: float, resume_at: float) -> None:
+        """Après un 429 : pause jusqu'à resume_at, débit réduit et pas de rafale à la reprise."""
+        if self.limited:
+            self._refill(now)
+            self.rate = max(self.nominal_rate * MIN_RATE_SHARE, self.rate * BACKOFF_FACTOR)
+            # Les appels déjà planifiés reprennent une place après la pause (voir _requeue)
+            self._tokens = 0.0
+            self._updated = max(self._updated, resume_at)
+
+    def speed_up(self, now: float) -> None:
+        """Après un succès : le débit remonte vers sa valeur nominale."""
+        if self.limited and self.rate < self.nominal_rate:
+            self._refill(now)
+            self.rate = min(self.nominal_rate, self.rate + self.nominal_rate * RECOVERY_STEP)
+
+
+class RateLimiter:
+    """
+    Limiteur d'un service amont : un seau de requêtes (par seconde) et, en option,
+    un seau de tokens (par minute, pour Anthropic). Partagé par tous les threads et
+    toutes les boucles d'événements du processus.
+    """
+
+    def __init__(self, name: str, requests_per_second: float = 0.0, burst: Optional[float] = None,
+                 tokens_per_minute: float = 0.0):
+        self.name = name
+        self.requests = TokenBucket(requests_per_second, burst)
+        self.tokens = TokenBucket(tokens_per_minute / 60.0, tokens_per_minute)
+        self.throttled = 0        # appels qui ont dû attendre
+        self.rate_limited = 0     # 429 reçus
+        self.waited_seconds = 0.0
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: float) -> float:
+        with self._lock:
+            now = time.monotonic()
+            wait = max(
+                self._paused_until - now,
+                self.requests.reserve(1, now),
+                self.tokens.reserve(tokens, now)
+            )
+            if wait > 0:
+                self.throttled += 1
+                self.waited_seconds += wait
+            return wait
+
+    def _requeue(self) -> float:
+        """
+        Après une attente : si un 429 est arrivé entre-temps, l'appel reprend une
+        place dans la file (derrière la pause) au lieu de partir avec tous les autres.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._paused_until <= now:
+                return 0.0
+            wait = max(self._paused_until - now, self.requests.reserve(1, now))
+            self.waited_seconds += wait
+            return wait
+
+    def acquire(self, tokens: float = 0) -> float:
+        """
+        Attend son tour avant un appel (version synchrone).
+
+        Args:
+            tokens: Estimation des tokens consommés par l'appel (seau par minute)
+
+        Returns:
+            Le temps d'attente en secondes
+        """
+        waited = 0.0
+        wait = self._reserve(tokens)
+        while wait > 0:
+            time.sleep(wait)
+            waited += wait
+            wait = self._requeue()
+        return waited
+
+    async def acquire_async(self, tokens: float = 0) -> float:
+        """Version asynchrone de acquire (ne bloque pas la boucle d'événements)."""
+        waited = 0.0
+        wait = self._reserve(tokens)
+        while wait > 0:
+            await asyncio.sleep(wait)
+            waited += wait
+            wait = self._requeue()
+        return waited
+
+    def record_success(self, tokens_reserved: float = 0, tokens_used: Optional[float] = None) -> None:
+        """
+        Signale un appel réussi : le débit remonte et la réservation de tokens est
+        corrigée avec la consommation réelle (si connue).
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.requests.speed_up(now)
+            self.tokens.speed_up(now)
+            if tokens_used is not None:
+                self.tokens.adjust(tokens_used - tokens_reserved, now)
+
+    def record_rate_limited(self, retry_after: Optional[float] = None) -> None:
+        """
+        Signale un 429 : tous les appels sont suspendus `retry_after` secondes
+        (1 s par défaut), puis le débit repart réduit.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.rate_limited += 1
+            self._paused_until = max(self._paused_until, now + (retry_after if retry_after is not None else 1.0))
+            self.requests.slow_down(now, self._paused_until)
+            self.tokens.slow_down(now, self._paused_until)
+
+    def stats(self) -> Dict[str, Any]:
+        """Débit courant et compteurs (attentes, 429 reçus)."""
+        with self._lock:
+            return {
+                "requests_per_second": self.requests.rate if self.requests.limited else None,
+                "tokens_per_minute": self.tokens.rate * 60 if self.tokens.limited else None,
+                "throttled": self.throttled,
+                "rate_limited": self.rate_limited,
+                "waited_seconds": round(self.waited_seconds, 3),
+                "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 3),
+            }
+
+
+_registry_lock = threading.Lock()
+_limiters: Dict[str, RateLimiter] = {}
+
+
+def create_rate_limiter(name: str, env_prefix: str, default_rps: float = 0.0,
+                        default_burst: float = 0.0, default_tpm: float = 0.0) -> RateLimiter:
+    """
+    Crée (ou retourne) le limiteur nommé `name`, configuré par les variables
+    d'environnement <PREFIX>_RPS, <PREFIX>_BURST et <PREFIX>_TPM (0 = illimité).
+    """
+    with _registry_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            limiter = RateLimiter(
+                name,
+                requests_per_second=env_float(f"{env_prefix}_RPS", default_rps),
+                burst=env_float(f"{env_prefix}_BURST", default_burst),
+                tokens_per_minute=env_float(f"{env_prefix}_TPM", default_tpm)
+            )
+            _limiters[name] = limiter
+        return limiter
+
+
+def rate_limiter_stats() -> Dict[str, Dict[str, Any]]:
+    """Statistiques de tous les limiteurs, par nom (ex: {"youtube": {...}})."""
+    return {name: limiter.stats() for name, limiter in list(_limiters.items())}
+
+
+callback_metric(
+    "ytg_rate_limit_throttled_total",
+    "Appels retardés par le limiteur de débit",
+    ["upstream"],
+    lambda: {(name, ): limiter.throttled for name, limiter in list(_limiters.items())},
+    kind="counter"
+)
+callback_metric(
+    "ytg_rate_limit_wait_seconds_total",
+    "Temps total passé à attendre le limiteur de débit",
+    ["upstream"],
+    lambda: {(name, ): limiter.waited_seconds for name, limiter in list(_limiters.items())},
+    kind="counter"
+)
@@ -0,0 +1,130 @@
+"""
+Regroupement des appels identiques simultanés (single-flight)
+Quand plusieurs utilisateurs (n8n, Streamlit, API) demandent la même vidéo au même
+moment, un seul appel part vers youtube-transcript.io / Claude : les autres attendent
+son résultat au lieu de refaire le même appel.
+"""
+import asyncio
+import threading
+import weakref
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from metrics import callback_metric
+
+
+class SingleFlight:
+    """
+    Exécute une seule fois les appels simultanés ayant la même clé.
+
+    - do(key, fn) : version synchrone (threads)
+    - do_async(key, fn) : version asynchrone (une table par boucle d'événements)
+
+    Le premier appel exécute fn ; ceux qui arrivent pendant son exécution reçoivent
+    le même résultat (ou la même exception). Les appels suivants repartent de zéro.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0       # appels reçus
+        self.coalesced = 0   # appels servis par un appel déjà en cours
+        self._lock = threading.Lock()
+        self._futures: Dict[Hashable, Future] = {}
+        self._tasks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, asyncio.Task]]" = weakref.WeakKeyDictionary()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Exécute fn() ou attend l'appel en cours pour la même clé.
+
+        Args:
+            key: Clé identifiant l'appel (ex: ID de la vidéo)
+            fn: Fonction sans argument qui fait l'appel
+
+        Returns:
+            Le résultat de fn (partagé entre les appels regroupés)
+        """
+        with self._lock:
+            self.calls += 1
+            future = self._futures.get(key)
+            if future is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                future = Future()
+                self._futures[key] = future
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._futures.pop(key, None)
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Version asynchrone de do : fn() est lancée dans une tâche partagée.
+        L'annulation d'un appelant n'annule pas la tâche des autres.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self.calls += 1
+            tasks = self._tasks.get(loop)
+            if tasks is None:
+                tasks = {}
+                self._tasks[loop] = tasks
+            task = tasks.get(key)
+            if task is not None:
+                self.coalesced += 1
+            else:
+                task = loop.create_task(fn())
+                tasks[key] = task
+                task.add_done_callback(lambda _: tasks.pop(key, None))
+
+        return await asyncio.shield(task)
+
+    @property
+    def in_flight(self) -> int:
+        """Nombre d'appels actuellement en cours."""
+        with self._lock:
+            return len(self._futures) + sum(len(tasks) for tasks in self._tasks.values())
+
+    def stats(self) -> Dict[str, int]:
+        """Compteurs : appels reçus, appels regroupés et appels en cours."""
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": self.in_flight}
+
+
+_registry_lock = threading.Lock()
+_flights: Dict[str, SingleFlight] = {}
+
+
+def get_single_flight(name: str) -> SingleFlight:
+    """Retourne le regroupement nommé `name` (créé au premier appel)."""
+    with _registry_lock:
+        flight = _flights.get(name)
+        if flight is None:
+            flight = SingleFlight(name)
+            _flights[name] = flight
+        return flight
+
+
+def single_flight_stats() -> Dict[str, Dict[str, int]]:
+    """Compteurs de tous les regroupements, par nom (ex: {"transcript": {...}})."""
+    return {name: flight.stats() for name, flight in list(_flights.items())}
+
+
+callback_metric(
+    "ytg_single_flight_coalesced_total",
+    "Appels servis par un appel identique déjà en cours (single-flight)",
+    ["flight"],
+    lambda: {(name, ): flight.coalesced for name, flight in list(_flights.items())},
+    kind="counter"
+)
@@ -1,118 +1,740 @@
 """
 Module pour générer des titres YouTube avec l'IA Claude (Anthropic)
 """
-from anthropic import Anthropic
-from typing import List, Optional, Dict, Any, Union
-from pathlib import Path
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from typing import List, Optional, Dict, Any, Union, Iterator, AsyncIterator, Tuple
+
+from clients import get_anthropic_client, get_async_anthropic_client
+from config import env_bool, env_int
+from cache import cache_get_async, cache_set_many_async, get_result_cache
+from condense import condense_transcript, TRANSCRIPT_TOKEN_BUDGET, CHARS_PER_TOKEN
+from prompt_registry import LoadedPrompt, get_system_prompt
+from circuit import create_circuit_breaker
+from logging_config import get_logger
+from metrics import STAGE_SECONDS, UPSTREAM_RESPONSES, counter
+from ratelimit import create_rate_limiter, parse_retry_after
+from singleflight import get_single_flight
+from title_history import get_title_history
+from word_balance import rerank, score_titles
+
+
+logger = get_logger("title_generator")
+
+# Modèle Claude utilisé pour la génération (Sonnet 4.5, février 2026)
+MODEL = "claude-sonnet-4-5-20250929"
+MAX_TOKENS = 4096
+
+# Prompt caching Anthropic : le system prompt (et optionnellement la transcription)
+# est marqué comme segment cacheable pour réduire le coût et le temps de réponse
+PROMPT_CACHE_ENABLED = env_bool("ANTHROPIC_PROMPT_CACHE", True)
+PROMPT_CACHE_TRANSCRIPT = env_bool("ANTHROPIC_PROMPT_CACHE_TRANSCRIPT", False)
+CACHE_CONTROL = {"type": "ephemeral"}
+
+# Sortie structurée : Claude renvoie titres, scores et analyse dans un appel d'outil (tool use)
+# au lieu d'un texte libre ; le parseur de lignes numérotées ne sert plus qu'en secours et
+# pour le streaming (titres affichés au fil du texte)
+STRUCTURED_OUTPUT = env_bool("ANTHROPIC_STRUCTURED_OUTPUT", True)
+TITLES_TOOL_NAME = "submit_titles"
+TITLES_TOOL = {
+    "name": TITLES_TOOL_NAME,
+    "description": "Enregistre les titres proposés pour la vidéo, avec leur score et leur analyse.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "titles": {
+                "type": "array",
+                "description": "Les titres proposés, du meilleur au moins bon",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "title": {"type": "string", "description": "Le titre seul, sans numéro ni guillemets"},
+                        "score": {"type": "number", "minimum": 0, "maximum": 10,
+                                  "description": "Score de performance estimé sur 10"},
+                        "analysis": {"type": "string",
+                                     "description": "Analyse du titre (Word Balance, justification de la structure)"}
+                    },
+                    "required": ["title", "score"]
+                }
+            },
+            "analysis": {"type": "string", "description": "Analyse d'ensemble du contenu et des titres proposés"}
+        },
+        "required": ["titles"]
+    }
+}
+
+# Classement local (word_balance.py) : chaque titre reçoit sa note Word Balance calculée
+# localement (local_score). Avec LOCAL_TITLE_RANKING=1, Claude propose LOCAL_RANKING_CANDIDATES
+# fois plus de titres, sans score ni analyse (bien moins de tokens de sortie par titre),
+# et seuls les mieux notés localement sont gardés
+LOCAL_RANKING = env_bool("LOCAL_TITLE_RANKING", False)
+LOCAL_RANKING_CANDIDATES = env_int("LOCAL_RANKING_CANDIDATES", 10)
+MAX_CANDIDATES = 100
+CANDIDATES_TOOL = {
+    "name": TITLES_TOOL_NAME,
+    "description": "Enregistre les titres candidats proposés pour la vidéo.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "titles": {
+                "type": "array",
+                "description": "Les titres candidats, sans numéro ni guillemets",
+                "items": {"type": "string"}
+            }
+        },
+        "required": ["titles"]
+    }
+}
 
+# Historique des titres (title_history.py) : chaque résultat est comparé aux titres déjà
+# générés ou publiés pour la même chaîne, puis enregistré. TITLE_HISTORY_MODE=flag (défaut)
+# signale les quasi-doublons (details[].similar_to), filter les retire du résultat
+TITLE_HISTORY_MODE = (os.getenv("TITLE_HISTORY_MODE") or "flag").strip().lower()
 
-def load_system_prompt() -> Optional[str]:
+# Regroupe les générations identiques simultanées (même clé que le cache de résultats)
+_generation_flight = get_single_flight("generation")
+
+# Débit vers Anthropic : ANTHROPIC_RPS, ANTHROPIC_BURST et ANTHROPIC_TPM (tokens par minute),
+# illimité par défaut ; un 429 suspend et ralentit les appels dans tous les cas
+_rate_limiter = create_rate_limiter("anthropic", "ANTHROPIC")
+
+# Disjoncteur : après 5 pannes consécutives (connexion, timeout, 5xx), les générations
+# échouent immédiatement pendant 30 s (ANTHROPIC_CIRCUIT_FAILURES / _CIRCUIT_RESET)
+_circuit = create_circuit_breaker("anthropic", "ANTHROPIC")
+
+# Tokens consommés par modèle (input, output, cache_creation_input, cache_read_input)
+LLM_TOKENS = counter("ytg_llm_tokens_total", "Tokens consommés par modèle et par type", ["model", "type"])
+
+# Consignes utilisées quand aucun system prompt personnalisé n'existe
+DEFAULT_TITLE_RULES = """Les titres doivent être :
+- Accrocheurs et engageants
+- Clairs sur le contenu de la vidéo
+- Optimisés pour le référencement YouTube
+- Entre 40 et 70 caractères idéalement
+- En français"""
+
+
+def load_system_prompt(name: Optional[str] = None) -> Optional[str]:
     """
-    Charge le system prompt depuis le fichier de configuration.
+    Charge le system prompt depuis le registre de prompts (mis en cache en mémoire,
+    relu uniquement si le fichier change).
+
+    Args:
+        name: Nom du prompt (fichier prompts/<nom>.txt), None = prompts/system_prompt.txt
 
     Returns:
-        Le contenu du fichier prompts/system_prompt.txt ou None si absent
+        Le contenu du prompt ou None si absent
     """
-    prompt_path = Path(__file__).parent / "prompts" / "system_prompt.txt"
-    if prompt_path.exists():
-        content = prompt_path.read_text(encoding="utf-8").strip()
-        if content:
-            return content
-    return None
+    prompt = get_system_prompt(name)
+    return prompt.content if prompt else None
 
 
-def generate_titles(transcript: str, api_key: str, num_titles: int = 5) -> Dict[str, Any]:
+def _transcript_excerpt(transcript: str) -> str:
     """
-    Génère des propositions de titres YouTube à partir d'une transcription.
+    Extrait de la transcription envoyé à Claude : la transcription entière si elle
+    tient dans TRANSCRIPT_TOKEN_BUDGET, sinon un condensé représentatif de toute la vidéo.
+    """
+    return condense_transcript(transcript, TRANSCRIPT_TOKEN_BUDGET)
 
-    Args:
-        transcript: La transcription complète de la vidéo
-        api_key: Votre clé API Anthropic
-        num_titles: Nombre de titres à générer (par défaut 5)
 
-    Returns:
-        Dict avec 'titles' (liste), 'raw_response' (texte complet), 'has_custom_prompt' (bool)
+def _candidate_count(num_titles: int) -> int:
+    """Nombre de titres candidats demandés à Claude pour un classement local."""
+    return min(MAX_CANDIDATES, max(num_titles, num_titles * LOCAL_RANKING_CANDIDATES))
+
+
+def _answer_instructions(num_titles: int, structured: bool, titles_only: bool = False) -> str:
+    """
+    Consigne de format de la réponse : appel de l'outil (sortie structurée) ou liste numérotée.
+    Avec `titles_only` (classement local), les titres seuls, sans score ni analyse.
     """
-    print(f"🤖 Analyse de la transcription avec Claude...")
+    if titles_only:
+        if structured:
+            return (f"Renvoie {num_titles} titres variés avec l'outil {TITLES_TOOL_NAME}, "
+                    "sans score ni analyse : ils seront notés ensuite.")
+        return (f"Réponds UNIQUEMENT avec {num_titles} titres variés, un par ligne, numérotés de 1 à {num_titles}, "
+                "sans score ni analyse.")
+    if structured:
+        return (f"Renvoie les {num_titles} titres avec l'outil {TITLES_TOOL_NAME} : "
+                "chaque titre avec son score de performance sur 10 et son analyse.")
+    return f"Réponds UNIQUEMENT avec les {num_titles} titres, un par ligne, numérotés de 1 à {num_titles}."
 
-    # Initialiser le client Anthropic
-    client = Anthropic(api_key=api_key)
 
-    # Construire le prompt pour Claude
+def _build_transcript_prompt(transcript: str, num_titles: int, system_prompt: Optional[str],
+                             structured: bool = False, titles_only: bool = False) -> str:
+    """Construit le message utilisateur pour une génération depuis une transcription."""
     # Si un system prompt personnalisé existe, on lui laisse contrôler le format
-    system_prompt = load_system_prompt()
-
     if system_prompt:
         # Prompt simplifié - le system prompt gère les instructions
         prompt = f"""Génère {num_titles} titres optimisés pour cette vidéo YouTube.
 
 Transcription :
-{transcript[:3000]}..."""
-    else:
-        # Prompt complet par défaut (sans system prompt)
-        prompt = f"""Analyse cette transcription de vidéo YouTube et génère {num_titles} propositions de titres optimisés.
+{_transcript_excerpt(transcript)}"""
+        if structured or titles_only:
+            return f"{prompt}\n\n{_answer_instructions(num_titles, structured, titles_only)}"
+        return prompt
 
-Les titres doivent être :
-- Accrocheurs et engageants
-- Clairs sur le contenu de la vidéo
-- Optimisés pour le référencement YouTube
-- Entre 40 et 70 caractères idéalement
-- En français
+    # Prompt complet par défaut (sans system prompt)
+    return f"""Analyse cette transcription de vidéo YouTube et génère {num_titles} propositions de titres optimisés.
+
+{DEFAULT_TITLE_RULES}
 
 Transcription :
-{transcript[:3000]}...
+{_transcript_excerpt(transcript)}
 
-Réponds UNIQUEMENT avec les {num_titles} titres, un par ligne, numérotés de 1 à {num_titles}."""
+{_answer_instructions(num_titles, structured, titles_only)}"""
 
-    try:
-        # Appeler l'API Claude avec le modèle Sonnet 4.5 (février 2026)
-        api_params = {
-            "model": "claude-sonnet-4-5-20250929",
-            "max_tokens": 4096,
-            "messages": [{"role": "user", "content": prompt}]
-        }
-
-        # Ajouter le system prompt s'il existe
-        if system_prompt:
+
+def _build_transcript_content(transcript: str, num_titles: int, system_prompt: Optional[str],
+                              structured: bool = False, titles_only: bool = False) -> Union[str, List[Dict[str, Any]]]:
+    """
+    Construit le contenu du message utilisateur pour une transcription.
+
+    Si le cache de la transcription est activé, la transcription est placée dans un
+    premier bloc cacheable (stable d'un appel à l'autre) suivi des consignes, qui elles
+    varient avec num_titles. Sinon, retourne le prompt texte habituel.
+    """
+    if not (PROMPT_CACHE_ENABLED and PROMPT_CACHE_TRANSCRIPT):
+        return _build_transcript_prompt(transcript, num_titles, system_prompt, structured, titles_only)
+
+    if system_prompt:
+        instructions = f"Génère {num_titles} titres optimisés pour cette vidéo YouTube (transcription ci-dessus)."
+        if structured or titles_only:
+            instructions += f" {_answer_instructions(num_titles, structured, titles_only)}"
+    else:
+        instructions = f"""Analyse la transcription de vidéo YouTube ci-dessus et génère {num_titles} propositions de titres optimisés.
+
+{DEFAULT_TITLE_RULES}
+
+{_answer_instructions(num_titles, structured, titles_only)}"""
+
+    return [
+        {"type": "text", "text": f"Transcription :\n{_transcript_excerpt(transcript)}", "cache_control": CACHE_CONTROL},
+        {"type": "text", "text": instructions}
+    ]
+
+
+def _build_description_prompt(description: str, num_titles: int, system_prompt: Optional[str],
+                              structured: bool = False, titles_only: bool = False) -> str:
+    """Construit le message utilisateur pour une génération depuis une description."""
+    if system_prompt:
+        # Prompt simplifié - le system prompt gère les instructions
+        prompt = f"""Génère {num_titles} titres optimisés pour une vidéo YouTube.
+
+Description de la vidéo :
+{description}"""
+        if structured or titles_only:
+            return f"{prompt}\n\n{_answer_instructions(num_titles, structured, titles_only)}"
+        return prompt
+
+    # Prompt complet par défaut (sans system prompt)
+    return f"""Génère {num_titles} propositions de titres optimisés pour une vidéo YouTube.
+
+Description de la vidéo :
+{description}
+
+{DEFAULT_TITLE_RULES}
+
+{_answer_instructions(num_titles, structured, titles_only)}"""
+
+
+def _build_api_params(content: Union[str, List[Dict[str, Any]]], system_prompt: Optional[str],
+                      structured: bool = False, titles_only: bool = False) -> Dict[str, Any]:
+    """Construit les paramètres de l'appel à l'API Messages."""
+    api_params = {
+        "model": MODEL,
+        "max_tokens": MAX_TOKENS,
+        "messages": [{"role": "user", "content": content}]
+    }
+
+    # Sortie structurée : Claude doit répondre en appelant l'outil (titres, scores, analyse,
+    # ou titres seuls pour un classement local)
+    if structured:
+        api_params["tools"] = [CANDIDATES_TOOL if titles_only else TITLES_TOOL]
+        api_params["tool_choice"] = {"type": "tool", "name": TITLES_TOOL_NAME}
+
+    # Ajouter le system prompt s'il existe (en segment cacheable si le cache est activé)
+    if system_prompt:
+        if PROMPT_CACHE_ENABLED:
+            api_params["system"] = [{"type": "text", "text": system_prompt, "cache_control": CACHE_CONTROL}]
+        else:
             api_params["system"] = system_prompt
-            print(f"📋 System prompt chargé ({len(system_prompt)} caractères)")
-
-        message = client.messages.create(**api_params)
-
-        # Extraire la réponse
-        response_text = message.content[0].text
-
-        # Parser les titres (lignes commençant par un numéro ou contenant "Titre")
-        titles = []
-        for line in response_text.strip().split('\n'):
-            line = line.strip()
-            # Chercher les lignes de titre (numérotées ou avec "Titre :")
-            if re.match(r'^\d+[\.\)]\s*', line) or line.startswith('Titre'):
-                # Retirer les préfixes
-                cleaned = re.sub(r'^(Titre\s*:?\s*|\d+[\.\)]\s*)', '', line)
-                # Retirer les guillemets
-                cleaned = cleaned.strip('"\'""')
-                if cleaned and len(cleaned) > 10:  # Titre minimum 10 chars
-                    titles.append(cleaned)
-
-        return {
-            "titles": titles[:num_titles],
-            "raw_response": response_text,
-            "has_custom_prompt": system_prompt is not None
-        }
+        logger.debug("📋 System prompt chargé (%d caractères)", len(system_prompt))
+
+    return api_params
+
+
+def _parse_title_line(line: str) -> Optional[str]:
+    """Retourne le titre contenu dans une ligne de réponse, ou None si ce n'est pas une ligne de titre."""
+    line = line.strip()
+    # Chercher les lignes de titre (numérotées ou avec "Titre :")
+    if re.match(r'^\d+[\.\)]\s*', line) or line.startswith('Titre'):
+        # Retirer les préfixes
+        cleaned = re.sub(r'^(Titre\s*:?\s*|\d+[\.\)]\s*)', '', line)
+        # Retirer les guillemets
+        cleaned = cleaned.strip('"\'""')
+        if cleaned and len(cleaned) > 10:  # Titre minimum 10 chars
+            return cleaned
+    return None
+
+
+def _parse_titles(response_text: str, num_titles: int) -> List[str]:
+    """Extrait les titres de la réponse (lignes commençant par un numéro ou contenant "Titre")."""
+    titles = []
+    for line in response_text.strip().split('\n'):
+        title = _parse_title_line(line)
+        if title:
+            titles.append(title)
+    return titles[:num_titles]
+
+
+class TitleStreamParser:
+    """
+    Parseur incrémental : reçoit le texte au fil du streaming et retourne chaque
+    titre dès que sa ligne est complète (même règle que _parse_titles).
+    """
+
+    def __init__(self, num_titles: int):
+        self.num_titles = num_titles
+        self.titles: List[str] = []
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        """Ajoute un morceau de texte et retourne les nouveaux titres complets."""
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split('\n')
+        return self._collect(lines)
+
+    def close(self) -> List[str]:
+        """Fin du flux : analyse la dernière ligne (sans retour à la ligne final)."""
+        lines, self._buffer = [self._buffer], ""
+        return self._collect(lines)
+
+    def _collect(self, lines: List[str]) -> List[str]:
+        new_titles = []
+        for line in lines:
+            if len(self.titles) >= self.num_titles:
+                break
+            title = _parse_title_line(line)
+            if title:
+                self.titles.append(title)
+                new_titles.append(title)
+        return new_titles
+
+
+def _structured_details(message: Any, num_titles: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Lit l'appel de l'outil submit_titles dans la réponse.
+
+    Returns:
+        Un tuple (détails, analyse) - détails est la liste des {"title", "score", "analysis"}
+        valides (vide si l'outil n'a pas été appelé ou si sa réponse est inexploitable)
+    """
+    for block in getattr(message, "content", None) or []:
+        if getattr(block, "type", None) != "tool_use" or getattr(block, "name", None) != TITLES_TOOL_NAME:
+            continue
+        data = block.input if isinstance(block.input, dict) else {}
+        details = []
+        for item in data.get("titles") or []:
+            if isinstance(item, str):
+                item = {"title": item}
+            if not isinstance(item, dict):
+                continue
+            title = str(item.get("title") or "").strip().strip('"\'""')
+            if not title:
+                continue
+            score = item.get("score")
+            details.append({
+                "title": title,
+                "score": float(score) if isinstance(score, (int, float)) else None,
+                "analysis": item.get("analysis") or None,
+            })
+        analysis = data.get("analysis")
+        return details[:num_titles], analysis if isinstance(analysis, str) and analysis else None
+    return [], None
+
+
+def _format_details(details: List[Dict[str, Any]], analysis: Optional[str]) -> str:
+    """Version texte (Markdown) d'une réponse structurée, pour l'affichage."""
+    lines = []
+    for index, detail in enumerate(details, 1):
+        score = f" — **{detail['score']:g}/10**" if detail["score"] is not None else ""
+        if detail.get("local_score") is not None:
+            score += f" (Word Balance {detail['local_score']:g}/10)"
+        lines.append(f"{index}. {detail['title']}{score}")
+        if detail["analysis"]:
+            lines.append(f"   {detail['analysis']}")
+        if detail.get("similar_to"):
+            similar = detail["similar_to"][0]
+            lines.append(f"   ⚠️ Proche d'un titre existant : « {similar['title']} » "
+                         f"({similar['similarity']:.0%} de similarité)")
+    if analysis:
+        lines.extend(["", analysis])
+    return "\n".join(lines)
+
+
+def _add_local_scores(details: List[Dict[str, Any]], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Ajoute à chaque titre sa note Word Balance locale ('local_score', 'word_balance').
+    Avec `limit` (classement local), classe les candidats par note et garde les `limit` meilleurs.
+    """
+    with STAGE_SECONDS.time(stage="local_scoring"):
+        titles = [detail["title"] for detail in details]
+        if limit is None:
+            scored = score_titles(titles)
+        else:
+            scored = rerank(titles, limit)
+            by_title = {detail["title"]: detail for detail in reversed(details)}
+            details = [by_title[item["title"]] for item in scored]
+        return [{**detail, "local_score": item["score"], "word_balance": item["word_balance"]}
+                for detail, item in zip(details, scored)]
+
+
+def _build_result(message: Any, num_titles: int, prompt: Optional[LoadedPrompt],
+                  candidates: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Construit le dict de résultat à partir de la réponse de Claude : réponse structurée
+    (outil submit_titles) si présente, sinon lignes numérotées du texte (parseur de secours).
+    Avec `candidates` (classement local), lit jusqu'à `candidates` titres et garde les
+    num_titles mieux notés localement.
+    """
+    with STAGE_SECONDS.time(stage="title_parse"):
+        details, analysis = _structured_details(message, candidates or num_titles)
+        structured = bool(details)
+        if not structured:
+            # Secours : texte libre (streaming, sortie structurée désactivée ou outil non appelé)
+            response_text = "".join(
+                getattr(block, "text", "") for block in getattr(message, "content", None) or []
+                if getattr(block, "type", "text") == "text"
+            )
+            details = [{"title": title, "score": None, "analysis": None}
+                       for title in _parse_titles(response_text, candidates or num_titles)]
+
+    details = _add_local_scores(details, num_titles if candidates else None)
+    if structured or candidates:
+        response_text = _format_details(details, analysis)
+
+    return {
+        "titles": [detail["title"] for detail in details],
+        # Score affiché : celui de Claude, ou la note locale quand le classement est local
+        "scores": [detail["local_score" if candidates else "score"] for detail in details],
+        "local_scores": [detail["local_score"] for detail in details],
+        "details": details,
+        "analysis": analysis,
+        "structured": structured,
+        "ranking": "local" if candidates else "claude",
+        "raw_response": response_text,
+        "has_custom_prompt": prompt is not None,
+        "prompt_name": prompt.name if prompt else None,
+        "usage": _extract_usage(message)
+    }
+
+
+def _extract_usage(message: Any) -> Dict[str, int]:
+    """
+    Extrait la consommation de tokens de la réponse, y compris les tokens
+    écrits dans le cache (cache_creation) et lus depuis le cache (cache_read).
+    """
+    usage = getattr(message, "usage", None)
+    return {
+        field: getattr(usage, field, None) or 0
+        for field in ("input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")
+    }
+
+
+def _estimate_tokens(api_params: Dict[str, Any]) -> int:
+    """Estimation des tokens d'entrée d'un appel (réservés auprès du limiteur de débit)."""
+    payload = json.dumps([api_params.get("system"), api_params.get("messages")], ensure_ascii=False)
+    return len(payload) // CHARS_PER_TOKEN
+
+
+def _usage_tokens(usage: Dict[str, int]) -> int:
+    """Tokens réellement décomptés par Anthropic (les lectures du cache de prompt ne comptent pas)."""
+    return usage["input_tokens"] + usage["cache_creation_input_tokens"] + usage["output_tokens"]
+
+
+def _record_success(tokens_reserved: int, result: Dict[str, Any]) -> None:
+    """Signale un appel réussi au limiteur de débit, au disjoncteur et aux métriques."""
+    _rate_limiter.record_success(tokens_reserved, _usage_tokens(result["usage"]))
+    _circuit.record_success()
+    UPSTREAM_RESPONSES.inc(upstream="anthropic", status="200")
+    for field, value in result["usage"].items():
+        LLM_TOKENS.inc(value, model=MODEL, type=field.replace("_tokens", ""))
+
+
+def _record_failure(e: Exception) -> None:
+    """
+    Signale un échec : un 429 au limiteur (pause Retry-After, débit réduit), une panne
+    (connexion, timeout, 5xx) au disjoncteur. Les autres erreurs HTTP montrent que le
+    service répond.
+    """
+    # Le SDK est déjà chargé : l'exception vient d'un appel de son client
+    from anthropic import APIConnectionError, APIStatusError, RateLimitError
+
+    if isinstance(e, APIStatusError):
+        UPSTREAM_RESPONSES.inc(upstream="anthropic", status=str(e.status_code))
+    elif isinstance(e, APIConnectionError):
+        UPSTREAM_RESPONSES.inc(upstream="anthropic", status="error")
+    if isinstance(e, RateLimitError):
+        headers = getattr(getattr(e, "response", None), "headers", None) or {}
+        _rate_limiter.record_rate_limited(parse_retry_after(headers.get("retry-after"), 10.0))
+    if isinstance(e, APIConnectionError) or (isinstance(e, APIStatusError) and e.status_code >= 500):
+        _circuit.record_failure()
+    elif isinstance(e, APIStatusError):
+        _circuit.record_success()
+
+
+def _circuit_open_result() -> Dict[str, Any]:
+    """Construit le dict de résultat quand le disjoncteur refuse l'appel."""
+    error_msg = (
+        "L'API Anthropic est temporairement indisponible (plusieurs échecs consécutifs). "
+        f"Réessayez dans {_circuit.retry_in():.0f} secondes."
+    )
+    logger.warning("❌ %s", error_msg)
+    return {"titles": [], "raw_response": "", "has_custom_prompt": False, "error": error_msg}
+
+
+def _result_cache_key(kind: str, text: str, prompt: Optional[LoadedPrompt], num_titles: int,
+                      structured: bool = False, candidates: Optional[int] = None) -> str:
+    """
+    Clé du cache de résultats : empreinte du texte d'entrée, du system prompt, du modèle,
+    du nombre de titres et du mode de sortie. Toute modification de l'un d'eux invalide l'entrée.
+    """
+    text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    prompt_hash = prompt.hash if prompt else "none"
+    if kind == "transcript":
+        # Le condensé envoyé à Claude dépend du budget
+        kind = f"transcript{TRANSCRIPT_TOKEN_BUDGET}"
+    if structured:
+        kind = f"{kind}:tool"
+    if candidates:
+        kind = f"{kind}:local{candidates}"
+    return f"result:{kind}:{MODEL}:{num_titles}:{prompt_hash[:16]}:{text_hash}"
+
 
+def _get_cached_result(cache_key: str, force_refresh: bool) -> Optional[Dict[str, Any]]:
+    """Retourne le résultat en cache (marqué 'cached': True) ou None."""
+    cache = get_result_cache()
+    if cache is None or force_refresh:
+        return None
+    return _decode_cached_result(cache.get(cache_key))
+
+
+async def _get_cached_result_async(cache_key: str, force_refresh: bool) -> Optional[Dict[str, Any]]:
+    """Version asynchrone de _get_cached_result (lecture disque hors de la boucle d'événements)."""
+    cache = get_result_cache()
+    if cache is None or force_refresh:
+        return None
+    return _decode_cached_result(await cache_get_async(cache, cache_key))
+
+
+def _decode_cached_result(cached: Optional[bytes]) -> Optional[Dict[str, Any]]:
+    """Décode une entrée du cache de résultats (None si absente)."""
+    if cached is None:
+        return None
+    logger.info("♻️ Résultat déjà généré, servi depuis le cache")
+    result = json.loads(cached.decode("utf-8"))
+    result["cached"] = True
+    if "local_scores" not in result:
+        # Résultat mis en cache avant l'ajout des notes locales
+        result["details"] = _add_local_scores(result.get("details") or [
+            {"title": title, "score": None, "analysis": None} for title in result.get("titles", [])
+        ])
+        result["local_scores"] = [detail["local_score"] for detail in result["details"]]
+    return result
+
+
+def _store_result(cache_key: str, result: Dict[str, Any]) -> None:
+    """
+    Met en cache un résultat réussi (au moins un titre, pas d'erreur).
+    Le cache est une optimisation : un échec d'écriture est journalisé, le résultat reste valable.
+    """
+    cache = get_result_cache()
+    if cache is None or not result.get("titles") or result.get("error"):
+        return
+    try:
+        cache.set(cache_key, json.dumps(result, ensure_ascii=False).encode("utf-8"))
     except Exception as e:
-        import traceback
-        error_msg = f"{type(e).__name__}: {str(e)}"
-        print(f"❌ Erreur: {error_msg}")
-        print(traceback.format_exc())
-        return {"titles": [], "raw_response": "", "has_custom_prompt": False, "error": error_msg}
+        logger.warning("⚠️ Résultat non mis en cache: %s: %s", type(e).__name__, e)
 
 
-import re
+async def _store_result_async(cache_key: str, result: Dict[str, Any]) -> None:
+    """Version asynchrone de _store_result (écriture disque hors de la boucle d'événements)."""
+    cache = get_result_cache()
+    if cache is None or not result.get("titles") or result.get("error"):
+        return
+    try:
+        await cache_set_many_async(cache, [(cache_key, json.dumps(result, ensure_ascii=False).encode("utf-8"))])
+    except Exception as e:
+        logger.warning("⚠️ Résultat non mis en cache: %s: %s", type(e).__name__, e)
 
 
-def generate_titles_from_description(description: str, api_key: str, num_titles: int = 5) -> Dict[str, Any]:
+def _check_history(result: Dict[str, Any], kind: str, text: str, channel: Optional[str]) -> Dict[str, Any]:
+    """
+    Compare les titres d'un résultat à l'historique de la chaîne, puis les y enregistre.
+
+    Chaque titre reçoit 'similar_to' (titres déjà connus proches, vide sinon) ; en mode
+    filter, les quasi-doublons sont retirés et listés dans 'filtered_titles' (sauf s'ils
+    le sont tous : mieux vaut des titres signalés qu'aucun titre). Les titres déjà générés
+    pour la même entrée sont ignorés, pour qu'une régénération ne se signale pas elle-même.
+    """
+    history = get_title_history()
+    if history is None or result.get("error") or not result.get("titles"):
+        return result
+
+    source = hashlib.sha256(f"{kind}:{text}".encode("utf-8")).hexdigest()[:16]
+    try:
+        with STAGE_SECONDS.time(stage="history_check"):
+            details = result.get("details") or [
+                {"title": title, "score": None, "analysis": None} for title in result["titles"]
+            ]
+            matches = history.check(channel, [detail["title"] for detail in details], exclude_source=source)
+            details = [{**detail, "similar_to": similar} for detail, similar in zip(details, matches)]
+
+            filtered = []
+            if TITLE_HISTORY_MODE == "filter":
+                kept = [detail for detail in details if not detail["similar_to"]]
+                if kept:
+                    filtered = [detail["title"] for detail in details if detail["similar_to"]]
+                    details = kept
+            history.add(channel, [detail["title"] for detail in details], source=source)
+    except sqlite3.Error as e:
+        # L'historique n'est qu'un avis (base verrouillée, disque plein...) : résultat rendu tel quel
+        logger.warning("⚠️ Historique des titres indisponible: %s: %s", type(e).__name__, e)
+        return result
+
+    duplicates = sum(1 for detail in details if detail["similar_to"])
+    if duplicates or filtered:
+        logger.info("🔁 %d titre(s) proche(s) de l'historique, %d retiré(s)", duplicates, len(filtered))
+
+    result = dict(result)
+    result["details"] = details
+    result["filtered_titles"] = filtered
+    if filtered:
+        score_field = "local_score" if result.get("ranking") == "local" else "score"
+        result["titles"] = [detail["title"] for detail in details]
+        result["scores"] = [detail.get(score_field) for detail in details]
+        result["local_scores"] = [detail.get("local_score") for detail in details]
+    if result.get("structured") or result.get("ranking") == "local":
+        result["raw_response"] = _format_details(details, result.get("analysis"))
+    return result
+
+
+async def _check_history_async(result: Dict[str, Any], kind: str, text: str,
+                               channel: Optional[str]) -> Dict[str, Any]:
+    """Version asynchrone de _check_history : les lectures/écritures SQLite passent par un thread."""
+    if get_title_history() is None or result.get("error") or not result.get("titles"):
+        return result
+    return await asyncio.to_thread(_check_history, result, kind, text, channel)
+
+
+def _prepare_generation(kind: str, text: str, num_titles: int, prompt_name: Optional[str],
+                        force_refresh: bool, structured: bool = False, candidates: Optional[int] = None
+                        ) -> Tuple[Optional[Dict[str, Any]], Optional[LoadedPrompt], str, Dict[str, Any]]:
+    """
+    Étapes communes à toutes les générations : chargement du prompt, lecture du
+    cache de résultats et construction des paramètres de l'appel (avec l'outil
+    submit_titles si `structured`, et `candidates` titres sans analyse demandés pour
+    un classement local).
+
+    Returns:
+        Un tuple (résultat immédiat, prompt, clé de cache, paramètres de l'API) -
+        résultat immédiat est le résultat en cache ou l'erreur de prompt (sinon None)
+    """
+    prompt = get_system_prompt(prompt_name)
+    if prompt_name and prompt is None:
+        return _missing_prompt_result(prompt_name), None, "", {}
+
+    cache_key = _result_cache_key(kind, text, prompt, num_titles, structured, candidates)
+    cached = _get_cached_result(cache_key, force_refresh)
+    if cached is not None:
+        return cached, prompt, cache_key, {}
+    return None, prompt, cache_key, _generation_params(kind, text, num_titles, prompt, structured, candidates)
+
+
+async def _prepare_generation_async(kind: str, text: str, num_titles: int, prompt_name: Optional[str],
+                                    force_refresh: bool, structured: bool = False, candidates: Optional[int] = None
+                                    ) -> Tuple[Optional[Dict[str, Any]], Optional[LoadedPrompt], str, Dict[str, Any]]:
+    """Version asynchrone de _prepare_generation (lecture du cache hors de la boucle d'événements)."""
+    prompt = get_system_prompt(prompt_name)
+    if prompt_name and prompt is None:
+        return _missing_prompt_result(prompt_name), None, "", {}
+
+    cache_key = _result_cache_key(kind, text, prompt, num_titles, structured, candidates)
+    cached = await _get_cached_result_async(cache_key, force_refresh)
+    if cached is not None:
+        return cached, prompt, cache_key, {}
+    return None, prompt, cache_key, _generation_params(kind, text, num_titles, prompt, structured, candidates)
+
+
+def _generation_params(kind: str, text: str, num_titles: int, prompt: Optional[LoadedPrompt],
+                       structured: bool, candidates: Optional[int]) -> Dict[str, Any]:
+    """Construit les paramètres de l'appel à Claude (voir _prepare_generation)."""
+    system_prompt = prompt.content if prompt else None
+    with STAGE_SECONDS.time(stage="prompt_build"):
+        requested, titles_only = (candidates, True) if candidates else (num_titles, False)
+        if kind == "transcript":
+            content = _build_transcript_content(text, requested, system_prompt, structured, titles_only)
+        else:
+            content = _build_description_prompt(text, requested, system_prompt, structured, titles_only)
+        return _build_api_params(content, system_prompt, structured, titles_only)
+
+
+def _missing_prompt_result(prompt_name: str) -> Dict[str, Any]:
+    """Construit le dict de résultat quand le prompt demandé n'existe pas."""
+    error_msg = f"System prompt '{prompt_name}' introuvable (fichier prompts/{prompt_name}.txt)"
+    logger.error("❌ %s", error_msg)
+    return {"titles": [], "raw_response": "", "has_custom_prompt": False, "error": error_msg}
+
+
+def _error_result(e: Exception) -> Dict[str, Any]:
+    """Construit le dict de résultat en cas d'erreur."""
+    error_msg = f"{type(e).__name__}: {str(e)}"
+    # Trace complète dans les logs (affichée en console seulement avec LOG_LEVEL=DEBUG)
+    logger.error("❌ Erreur: %s", error_msg, exc_info=e)
+    return {"titles": [], "raw_response": "", "has_custom_prompt": False, "error": error_msg}
+
+
+def generate_titles(transcript: str, api_key: str, num_titles: int = 5,
+                    force_refresh: bool = False, prompt_name: Optional[str] = None,
+                    channel: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Génère des propositions de titres YouTube à partir d'une transcription.
+
+    Un résultat identique (même transcription, system prompt, modèle et num_titles)
+    déjà généré est servi depuis le cache, sans rappeler Claude.
+
+    Args:
+        transcript: La transcription complète de la vidéo
+        api_key: Votre clé API Anthropic
+        num_titles: Nombre de titres à générer (par défaut 5)
+        force_refresh: Ignorer le cache de résultats et régénérer (par défaut False)
+        prompt_name: Nom du system prompt à utiliser (prompts/<nom>.txt, par défaut system_prompt)
+        channel: Chaîne YouTube dont l'historique sert à repérer les titres déjà utilisés
+            (None = historique commun)
+
+    Returns:
+        Dict avec 'titles' (liste), 'scores' (score sur 10 de chaque titre, None si inconnu ;
+        note locale si LOCAL_TITLE_RANKING), 'local_scores' (note Word Balance calculée
+        localement), 'details' (titre, score, analyse, note locale et répartition Word Balance
+        de chaque titre), 'analysis' (analyse d'ensemble), 'structured' (True si la réponse
+        vient de l'outil submit_titles), 'ranking' ("claude" ou "local"), 'raw_response'
+        (texte complet), 'has_custom_prompt' (bool), 'usage' (tokens consommés, dont
+        cache_creation_input_tokens / cache_read_input_tokens), 'cached' (True si servi depuis le cache)
+        et 'filtered_titles' (quasi-doublons retirés, TITLE_HISTORY_MODE=filter) ; chaque détail
+        porte 'similar_to', les titres proches déjà présents dans l'historique de la chaîne
+    """
+    logger.info("🤖 Analyse de la transcription avec Claude...")
+    return _generate("transcript", transcript, api_key, num_titles, force_refresh, prompt_name, channel)
+
+
+def generate_titles_from_description(description: str, api_key: str, num_titles: int = 5,
+                                     force_refresh: bool = False, prompt_name: Optional[str] = None,
+                                     channel: Optional[str] = None) -> Dict[str, Any]:
     """
     Génère des propositions de titres YouTube à partir d'une description.
 
@@ -120,77 +742,286 @@ def generate_titles_from_description(description: str, api_key: str, num_titles:
         description: Courte description du contenu de la vidéo
         api_key: Votre clé API Anthropic
         num_titles: Nombre de titres à générer (par défaut 5)
+        force_refresh: Ignorer le cache de résultats et régénérer (par défaut False)
+        prompt_name: Nom du system prompt à utiliser (prompts/<nom>.txt, par défaut system_prompt)
+        channel: Chaîne YouTube (historique des titres, voir generate_titles)
 
     Returns:
-        Dict avec 'titles' (liste), 'raw_response' (texte complet), 'has_custom_prompt' (bool)
+        Même format que generate_titles
     """
-    print(f"🤖 Génération de titres à partir de la description...")
+    logger.info("🤖 Génération de titres à partir de la description...")
+    return _generate("description", description, api_key, num_titles, force_refresh, prompt_name, channel)
 
-    # Initialiser le client Anthropic
-    client = Anthropic(api_key=api_key)
 
-    # Charger le system prompt personnalisé
-    system_prompt = load_system_prompt()
+async def generate_titles_async(transcript: str, api_key: str, num_titles: int = 5,
+                                force_refresh: bool = False, prompt_name: Optional[str] = None,
+                                channel: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Version asynchrone de generate_titles (client AsyncAnthropic).
+    À utiliser depuis l'API FastAPI pour ne pas bloquer la boucle d'événements.
+    Les tentatives sur erreurs 429/5xx sont gérées par le SDK sans bloquer.
+    """
+    logger.info("🤖 Analyse de la transcription avec Claude...")
+    return await _generate_async("transcript", transcript, api_key, num_titles, force_refresh, prompt_name, channel)
 
-    if system_prompt:
-        # Prompt simplifié - le system prompt gère les instructions
-        prompt = f"""Génère {num_titles} titres optimisés pour une vidéo YouTube.
 
-Description de la vidéo :
-{description}"""
-    else:
-        # Prompt complet par défaut (sans system prompt)
-        prompt = f"""Génère {num_titles} propositions de titres optimisés pour une vidéo YouTube.
+async def generate_titles_from_description_async(description: str, api_key: str, num_titles: int = 5,
+                                                 force_refresh: bool = False,
+                                                 prompt_name: Optional[str] = None,
+                                                 channel: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Version asynchrone de generate_titles_from_description (client AsyncAnthropic).
+    """
+    logger.info("🤖 Génération de titres à partir de la description...")
+    return await _generate_async("description", description, api_key, num_titles, force_refresh, prompt_name, channel)
 
-Description de la vidéo :
-{description}
 
-Les titres doivent être :
-- Accrocheurs et engageants
-- Clairs sur le contenu de la vidéo
-- Optimisés pour le référencement YouTube
-- Entre 40 et 70 caractères idéalement
-- En français
+def _generate(kind: str, text: str, api_key: str, num_titles: int,
+              force_refresh: bool, prompt_name: Optional[str],
+              channel: Optional[str] = None) -> Dict[str, Any]:
+    """Génération complète (non streamée), synchrone."""
+    candidates = _candidate_count(num_titles) if LOCAL_RANKING else None
+    early_result, prompt, cache_key, api_params = _prepare_generation(
+        kind, text, num_titles, prompt_name, force_refresh, structured=STRUCTURED_OUTPUT, candidates=candidates
+    )
+    if early_result is not None:
+        return _check_history(early_result, kind, text, channel)
+
+    def call() -> Dict[str, Any]:
+        # Client Anthropic partagé (connexions réutilisées entre les appels)
+        if not _circuit.allow():
+            return _circuit_open_result()
+
+        client = get_anthropic_client(api_key)
+        tokens = _estimate_tokens(api_params)
+
+        try:
+            _rate_limiter.acquire(tokens)
+            with STAGE_SECONDS.time(stage="claude_call"):
+                message = client.messages.create(**api_params)
+            result = _build_result(message, num_titles, prompt, candidates)
+            _record_success(tokens, result)
+            _store_result(cache_key, result)
+            return result
+
+        except Exception as e:
+            _record_failure(e)
+            return _error_result(e)
+
+    # Les demandes identiques simultanées partagent un seul appel à Claude
+    return _check_history(dict(_generation_flight.do(cache_key, call)), kind, text, channel)
+
+
+async def _generate_async(kind: str, text: str, api_key: str, num_titles: int,
+                          force_refresh: bool, prompt_name: Optional[str],
+                          channel: Optional[str] = None) -> Dict[str, Any]:
+    """Génération complète (non streamée), asynchrone."""
+    candidates = _candidate_count(num_titles) if LOCAL_RANKING else None
+    early_result, prompt, cache_key, api_params = await _prepare_generation_async(
+        kind, text, num_titles, prompt_name, force_refresh, structured=STRUCTURED_OUTPUT, candidates=candidates
+    )
+    if early_result is not None:
+        return await _check_history_async(early_result, kind, text, channel)
+
+    async def call() -> Dict[str, Any]:
+        if not _circuit.allow():
+            return _circuit_open_result()
+
+        client = get_async_anthropic_client(api_key)
+        tokens = _estimate_tokens(api_params)
+
+        try:
+            await _rate_limiter.acquire_async(tokens)
+            with STAGE_SECONDS.time(stage="claude_call"):
+                message = await client.messages.create(**api_params)
+            result = _build_result(message, num_titles, prompt, candidates)
+            _record_success(tokens, result)
+            await _store_result_async(cache_key, result)
+            return result
+
+        except Exception as e:
+            _record_failure(e)
+            return _error_result(e)
+
+    return await _check_history_async(dict(await _generation_flight.do_async(cache_key, call)), kind, text, channel)
+
+
+# ============ STREAMING ============
+# Les fonctions stream_* produisent des événements (dicts) au fil de la génération :
+# - {"type": "token", "text": "..."}                 morceau de texte reçu de Claude
+# - {"type": "title", "index": 1, "title": "..."}    titre complet dès que sa ligne est terminée
+# - {"type": "done", "result": {...}}                résultat final (même format que generate_titles)
+# Le streaming reste en texte libre (lignes numérotées) : les titres s'affichent au fil du
+# texte, ce que l'outil submit_titles (JSON complet en fin de bloc) ne permet pas. Pour la
+# même raison, il n'y a pas de classement local (les titres sont notés, pas reclassés), et
+# l'historique n'est consulté qu'à la fin : seul le résultat 'done' porte similar_to et le filtrage.
+
+def stream_titles(transcript: str, api_key: str, num_titles: int = 5,
+                  force_refresh: bool = False, prompt_name: Optional[str] = None,
+                  channel: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Variante streamée de generate_titles : les titres sont émis dès qu'ils sont complets.
+
+    Args:
+        transcript: La transcription complète de la vidéo
+        api_key: Votre clé API Anthropic
+        num_titles: Nombre de titres à générer (par défaut 5)
+        force_refresh: Ignorer le cache de résultats et régénérer (par défaut False)
+        prompt_name: Nom du system prompt à utiliser (prompts/<nom>.txt, par défaut system_prompt)
+        channel: Chaîne YouTube (historique des titres, voir generate_titles)
+
+    Returns:
+        Un itérateur d'événements 'token', 'title' puis 'done'
+    """
+    logger.info("🤖 Analyse de la transcription avec Claude (streaming)...")
+    return _stream("transcript", transcript, api_key, num_titles, force_refresh, prompt_name, channel)
+
+
+def stream_titles_from_description(description: str, api_key: str, num_titles: int = 5,
+                                   force_refresh: bool = False,
+                                   prompt_name: Optional[str] = None,
+                                   channel: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Variante streamée de generate_titles_from_description.
+
+    Returns:
+        Un itérateur d'événements 'token', 'title' puis 'done'
+    """
+    logger.info("🤖 Génération de titres à partir de la description (streaming)...")
+    return _stream("description", description, api_key, num_titles, force_refresh, prompt_name, channel)
+
+
+def stream_titles_async(transcript: str, api_key: str, num_titles: int = 5,
+                        force_refresh: bool = False,
+                        prompt_name: Optional[str] = None,
+                        channel: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+    """Version asynchrone de stream_titles (client AsyncAnthropic)."""
+    logger.info("🤖 Analyse de la transcription avec Claude (streaming)...")
+    return _stream_async("transcript", transcript, api_key, num_titles, force_refresh, prompt_name, channel)
+
+
+def stream_titles_from_description_async(description: str, api_key: str, num_titles: int = 5,
+                                         force_refresh: bool = False,
+                                         prompt_name: Optional[str] = None,
+                                         channel: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+    """Version asynchrone de stream_titles_from_description (client AsyncAnthropic)."""
+    logger.info("🤖 Génération de titres à partir de la description (streaming)...")
+    return _stream_async("description", description, api_key, num_titles, force_refresh, prompt_name, channel)
+
+
+def _title_events(parser: TitleStreamParser, new_titles: List[str]) -> Iterator[Dict[str, Any]]:
+    """Événements 'title' pour les titres venant d'être complétés."""
+    first_index = len(parser.titles) - len(new_titles) + 1
+    for offset, title in enumerate(new_titles):
+        yield {"type": "title", "index": first_index + offset, "title": title}
+
 
-Réponds UNIQUEMENT avec les {num_titles} titres, un par ligne, numérotés de 1 à {num_titles}."""
+def _replay_result(result: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Rejoue un résultat déjà disponible (cache, erreur) sous forme d'événements."""
+    for index, title in enumerate(result.get("titles", []), 1):
+        yield {"type": "title", "index": index, "title": title}
+    yield {"type": "done", "result": result}
 
+
+def _stream(kind: str, text: str, api_key: str, num_titles: int,
+            force_refresh: bool, prompt_name: Optional[str],
+            channel: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Génération streamée, synchrone."""
+    early_result, prompt, cache_key, api_params = _prepare_generation(kind, text, num_titles, prompt_name, force_refresh)
+    if early_result is not None:
+        yield from _replay_result(_check_history(early_result, kind, text, channel))
+        return
+    if not _circuit.allow():
+        yield from _replay_result(_circuit_open_result())
+        return
+
+    client = get_anthropic_client(api_key)
+    parser = TitleStreamParser(num_titles)
+    tokens = _estimate_tokens(api_params)
+
+    settled = False
     try:
-        # Appeler l'API Claude
-        api_params = {
-            "model": "claude-sonnet-4-5-20250929",
-            "max_tokens": 4096,
-            "messages": [{"role": "user", "content": prompt}]
-        }
-
-        # Ajouter le system prompt s'il existe
-        if system_prompt:
-            api_params["system"] = system_prompt
-            print(f"📋 System prompt chargé ({len(system_prompt)} caractères)")
+        _rate_limiter.acquire(tokens)
+        started = time.perf_counter()
+        with client.messages.stream(**api_params) as stream:
+            for chunk in stream.text_stream:
+                yield {"type": "token", "text": chunk}
+                yield from _title_events(parser, parser.feed(chunk))
+            message = stream.get_final_message()
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage="claude_call")
+        yield from _title_events(parser, parser.close())
+
+        result = _build_result(message, num_titles, prompt)
+        _record_success(tokens, result)
+        settled = True
+
+    except Exception as e:
+        _record_failure(e)
+        settled = True
+        result = _error_result(e)
+
+    finally:
+        # Client déconnecté (GeneratorExit) : ni succès ni panne d'Anthropic,
+        # mais l'appel d'essai du disjoncteur ne doit pas rester en suspens
+        if not settled:
+            _circuit.release()
 
-        message = client.messages.create(**api_params)
+    # Après coup, hors du try : la génération est déjà diffusée, un souci de cache ou
+    # d'historique ne doit pas la remplacer par une erreur
+    _store_result(cache_key, result)
+    result = _check_history(result, kind, text, channel)
 
-        # Extraire la réponse
-        response_text = message.content[0].text
+    yield {"type": "done", "result": result}
 
-        # Parser les titres
-        titles = []
-        for line in response_text.strip().split('\n'):
-            line = line.strip()
-            if re.match(r'^\d+[\.\)]\s*', line) or line.startswith('Titre'):
-                cleaned = re.sub(r'^(Titre\s*:?\s*|\d+[\.\)]\s*)', '', line)
-                cleaned = cleaned.strip('"\'""')
-                if cleaned and len(cleaned) > 10:
-                    titles.append(cleaned)
 
-        return {
-            "titles": titles[:num_titles],
-            "raw_response": response_text,
-            "has_custom_prompt": system_prompt is not None
-        }
+async def _stream_async(kind: str, text: str, api_key: str, num_titles: int,
+                        force_refresh: bool, prompt_name: Optional[str],
+                        channel: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+    """Génération streamée, asynchrone."""
+    early_result, prompt, cache_key, api_params = await _prepare_generation_async(kind, text, num_titles, prompt_name, force_refresh)
+    if early_result is not None:
+        for event in _replay_result(await _check_history_async(early_result, kind, text, channel)):
+            yield event
+        return
+    if not _circuit.allow():
+        for event in _replay_result(_circuit_open_result()):
+            yield event
+        return
+
+    client = get_async_anthropic_client(api_key)
+    parser = TitleStreamParser(num_titles)
+    tokens = _estimate_tokens(api_params)
+
+    settled = False
+    try:
+        await _rate_limiter.acquire_async(tokens)
+        started = time.perf_counter()
+        async with client.messages.stream(**api_params) as stream:
+            async for chunk in stream.text_stream:
+                yield {"type": "token", "text": chunk}
+                for event in _title_events(parser, parser.feed(chunk)):
+                    yield event
+            message = await stream.get_final_message()
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage="claude_call")
+        for event in _title_events(parser, parser.close()):
+            yield event
+
+        result = _build_result(message, num_titles, prompt)
+        _record_success(tokens, result)
+        settled = True
 
     except Exception as e:
-        import traceback
-        error_msg = f"{type(e).__name__}: {str(e)}"
-        print(f"❌ Erreur: {error_msg}")
-        print(traceback.format_exc())
-        return {"titles": [], "raw_response": "", "has_custom_prompt": False, "error": error_msg}
+        _record_failure(e)
+        settled = True
+        result = _error_result(e)
+
+    finally:
+        # Client déconnecté (GeneratorExit, annulation) : voir _stream
+        if not settled:
+            _circuit.release()
+
+    # Voir _stream : cache et historique hors du try
+    await _store_result_async(cache_key, result)
+    result = await _check_history_async(result, kind, text, channel)
+
+    yield {"type": "done", "result": result}
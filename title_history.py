@@ -0,0 +1,294 @@
+"""
+Historique des titres par chaîne, avec détection des quasi-doublons
+Chaque titre généré (ou publié, via l'API) est enregistré dans une base SQLite avec sa
+signature MinHash sur les 4-grammes de caractères, découpée en bandes (LSH) indexées :
+un nouveau titre n'est comparé qu'aux quelques titres qui partagent une bande avec lui,
+ce qui garde la recherche sous la milliseconde avec des centaines de milliers de titres.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set
+
+from config import env_bool, env_float
+from word_balance import COMMON_WORDS, normalize
+
+DEFAULT_HISTORY_PATH = Path(__file__).parent / ".cache" / "title_history.sqlite3"
+DEFAULT_CHANNEL = "default"
+
+# Similarité de Jaccard (4-grammes de caractères) à partir de laquelle un titre est un quasi-doublon
+DEFAULT_THRESHOLD = 0.6
+
+# Signature MinHash : BANDS bandes de ROWS valeurs ; deux titres sont comparés s'ils
+# partagent au moins une bande, avec une probabilité 1 - (1 - J^ROWS)^BANDS :
+# 99 % à J = 0,8, 94 % à J = 0,7, 75 % à J = 0,6, et 2 % à J = 0,2 (un mot en commun)
+BANDS = 10
+ROWS = 4
+NUM_HASHES = BANDS * ROWS
+
+# MinHash à une seule permutation (one permutation hashing) : chaque 4-gramme n'est haché
+# qu'une fois et range sa valeur dans l'un des NUM_HASHES compartiments (minimum gardé) ;
+# un compartiment vide emprunte la valeur du premier compartiment rempli dans son propre
+# ordre de visite (densification). Constantes fixes : les signatures enregistrées restent
+# valables d'un démarrage à l'autre
+_GOLDEN = 0x9E3779B1
+_MASK32 = (1 << 32) - 1
+_KEY_MASK = (1 << 63) - 1
+_BORROW_OFFSET = 1 << 32
+# Ordre de visite des autres compartiments, propre à chaque compartiment vide
+_PROBES = [sorted((source for source in range(NUM_HASHES) if source != index),
+                  key=lambda source, index=index: ((index + 1) * (source + 1) * _GOLDEN) & _MASK32)
+           for index in range(NUM_HASHES)]
+_NON_WORD = re.compile(r"[^\w]+|_", re.UNICODE)
+
+# Mots outils ignorés dans la comparaison : ils sont dans presque tous les titres et
+# rapprocheraient des titres sans rapport
+_STOPWORDS = frozenset(normalize(word) for word in COMMON_WORDS)
+
+
+def normalize_title(title: str) -> str:
+    """Forme comparée : minuscules sans accents, sans ponctuation, emojis ni mots outils."""
+    words = _NON_WORD.sub(" ", normalize(title)).split()
+    return " ".join(word for word in words if word not in _STOPWORDS) or " ".join(words)
+
+
+def _shingles(normalized: str) -> Set[int]:
+    """4-grammes (octets UTF-8, espaces de bord compris), codés en entiers de 32 bits."""
+    data = f" {normalized} ".encode("utf-8")
+    return {(a << 24) | (b << 16) | (c << 8) | d for a, b, c, d in zip(data, data[1:], data[2:], data[3:])}
+
+
+def _jaccard(a: Set[int], b: Set[int]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _channel_seed(channel: str) -> int:
+    """Empreinte stable d'une chaîne (hash() de Python change à chaque démarrage)."""
+    seed = 1469598103934665603
+    for char in channel:
+        seed = ((seed ^ ord(char)) * 1099511628211) & _KEY_MASK
+    return seed
+
+
+def band_keys(channel: str, shingles: Set[int]) -> List[int]:
+    """Clés LSH d'un titre : une par bande de sa signature MinHash, propres à la chaîne."""
+    if not shingles:
+        return []
+    bins: List[Optional[int]] = [None] * NUM_HASHES
+    for shingle in shingles:
+        # Hachage multiplicatif de Knuth : les bits de poids fort choisissent le compartiment
+        hashed = (shingle * _GOLDEN) & _MASK32
+        index, value = (hashed * NUM_HASHES) >> 32, hashed
+        current = bins[index]
+        if current is None or value < current:
+            bins[index] = value
+    signature = []
+    for index, value in enumerate(bins):
+        if value is None:
+            for attempt, source in enumerate(_PROBES[index], 1):
+                if bins[source] is not None:
+                    value = bins[source] + attempt * _BORROW_OFFSET
+                    break
+        signature.append(value)
+    seed = _channel_seed(channel)
+    keys = []
+    for band in range(BANDS):
+        key = seed ^ band
+        for value in signature[band * ROWS:(band + 1) * ROWS]:
+            key = ((key * 1099511628211) ^ value) & _KEY_MASK
+        keys.append(key)
+    return keys
+
+
+class TitleHistory:
+    """
+    Historique persistant des titres (SQLite, mode WAL, partageable entre l'API,
+    le CLI et Streamlit). Thread-safe.
+    """
+
+    def __init__(self, path: Optional[Path] = None, threshold: float = DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "matches": 0, "added": 0, "lookup_seconds": 0.0}
+        if path is None:
+            self.path = None
+            self._conn = sqlite3.connect(":memory:", check_same_thread=False)
+        else:
+            self.path = Path(path)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=10)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS titles (
+                    id INTEGER PRIMARY KEY,
+                    channel TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    normalized TEXT NOT NULL,
+                    source TEXT,
+                    created_at REAL NOT NULL,
+                    UNIQUE (channel, normalized)
+                )"""
+            )
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS title_bands (
+                    key INTEGER NOT NULL,
+                    title_id INTEGER NOT NULL,
+                    PRIMARY KEY (key, title_id)
+                ) WITHOUT ROWID"""
+            )
+            self._conn.commit()
+
+    def add(self, channel: Optional[str], titles: Iterable[str], source: Optional[str] = None) -> int:
+        """
+        Enregistre des titres pour une chaîne (les titres déjà connus sont ignorés).
+
+        Args:
+            channel: Chaîne YouTube (None = historique commun)
+            titles: Titres à enregistrer
+            source: Origine des titres (empreinte de la vidéo) : une recherche avec la même
+                source ignore ces titres, pour qu'une régénération ne se signale pas elle-même
+
+        Returns:
+            Le nombre de titres ajoutés
+        """
+        channel = channel or DEFAULT_CHANNEL
+        now = time.time()
+        added = 0
+        with self._lock:
+            for title in titles:
+                normalized = normalize_title(title)
+                if not normalized:
+                    continue
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO titles (channel, title, normalized, source, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (channel, title, normalized, source, now)
+                )
+                if not cursor.rowcount:
+                    continue
+                added += 1
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO title_bands (key, title_id) VALUES (?, ?)",
+                    [(key, cursor.lastrowid) for key in band_keys(channel, _shingles(normalized))]
+                )
+            self._conn.commit()
+            self._stats["added"] += added
+        return added
+
+    def find_similar(self, channel: Optional[str], title: str, limit: int = 3,
+                     exclude_source: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Titres déjà enregistrés pour la chaîne qui ressemblent à `title`.
+
+        Returns:
+            Jusqu'à `limit` dicts {"title", "similarity" (0-1), "created_at"}, du plus proche
+            au moins proche (liste vide si aucun ne dépasse le seuil)
+        """
+        started = time.perf_counter()
+        channel = channel or DEFAULT_CHANNEL
+        shingles = _shingles(normalize_title(title))
+        keys = band_keys(channel, shingles)
+        matches = []
+        if keys:
+            placeholders = ",".join("?" * len(keys))
+            with self._lock:
+                rows = self._conn.execute(
+                    f"""SELECT title, normalized, source, created_at FROM titles WHERE id IN
+                        (SELECT title_id FROM title_bands WHERE key IN ({placeholders}))""",
+                    keys
+                ).fetchall()
+            for stored_title, normalized, source, created_at in rows:
+                if exclude_source is not None and source == exclude_source:
+                    continue
+                similarity = _jaccard(shingles, _shingles(normalized))
+                if similarity >= self.threshold:
+                    matches.append({"title": stored_title, "similarity": round(similarity, 3),
+                                    "created_at": created_at})
+            matches.sort(key=lambda match: -match["similarity"])
+
+        with self._lock:
+            self._stats["lookups"] += 1
+            self._stats["matches"] += bool(matches)
+            self._stats["lookup_seconds"] += time.perf_counter() - started
+        return matches[:limit]
+
+    def check(self, channel: Optional[str], titles: Sequence[str],
+              exclude_source: Optional[str] = None) -> List[List[Dict[str, Any]]]:
+        """Recherche des quasi-doublons de chaque titre (même ordre que `titles`)."""
+        return [self.find_similar(channel, title, exclude_source=exclude_source) for title in titles]
+
+    def count(self, channel: Optional[str] = None) -> int:
+        """Nombre de titres enregistrés (pour une chaîne, ou au total)."""
+        with self._lock:
+            if channel is None:
+                return self._conn.execute("SELECT COUNT(*) FROM titles").fetchone()[0]
+            return self._conn.execute("SELECT COUNT(*) FROM titles WHERE channel = ?", (channel,)).fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Retourne les compteurs de l'historique.
+
+        Returns:
+            Dict avec 'titles', 'added', 'lookups', 'matches' (recherches ayant trouvé
+            un quasi-doublon) et 'avg_lookup_ms'
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        lookup_seconds = stats.pop("lookup_seconds")
+        stats["avg_lookup_ms"] = round(1000 * lookup_seconds / stats["lookups"], 3) if stats["lookups"] else 0.0
+        stats["titles"] = self.count()
+        return stats
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def create_title_history() -> Optional[TitleHistory]:
+    """
+    Crée l'historique des titres à partir des variables d'environnement :
+    - TITLE_HISTORY_ENABLED (1/0, défaut 1)
+    - TITLE_HISTORY_PATH (fichier SQLite, défaut .cache/title_history.sqlite3)
+    - TITLE_HISTORY_THRESHOLD (similarité 0-1 d'un quasi-doublon, défaut 0.6)
+
+    Returns:
+        L'historique ou None si désactivé
+    """
+    if not env_bool("TITLE_HISTORY_ENABLED", True):
+        return None
+    threshold = env_float("TITLE_HISTORY_THRESHOLD", DEFAULT_THRESHOLD)
+    path = os.getenv("TITLE_HISTORY_PATH") or str(DEFAULT_HISTORY_PATH)
+    try:
+        return TitleHistory(Path(path), threshold=threshold)
+    except (sqlite3.Error, OSError):
+        # Système de fichiers en lecture seule (certains hébergeurs) : historique en mémoire
+        return TitleHistory(None, threshold=threshold)
+
+
+_history: Optional[TitleHistory] = None
+_history_created = False
+_history_lock = threading.Lock()
+
+
+def get_title_history() -> Optional[TitleHistory]:
+    """Retourne l'historique des titres partagé (créé au premier appel, None si désactivé)."""
+    global _history, _history_created
+    if not _history_created:
+        with _history_lock:
+            if not _history_created:
+                _history = create_title_history()
+                _history_created = True
+    return _history
+
+
+def set_title_history(history: Optional[TitleHistory]) -> None:
+    """Remplace (ou désactive avec None) l'historique des titres partagé."""
+    global _history, _history_created
+    with _history_lock:
+        _history, _history_created = history, True
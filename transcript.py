@@ -0,0 +1,226 @@
+"""
+Transcription avec horodatage compact
+Les segments (début, durée, position dans le texte) sont stockés dans des tableaux typés
+(module array) au-dessus d'un seul texte partagé, au lieu d'une liste de dicts :
+beaucoup moins de mémoire quand de nombreuses transcriptions sont en cache, et des
+fenêtres temporelles (ex: les 3 premières minutes) qui ne copient pas le texte.
+"""
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+# Format binaire (cache) : en-tête, langue, débuts, durées, positions, texte UTF-8
+_MAGIC = b"YTT1"
+_HEADER = struct.Struct("<4sII")
+
+
+def _to_float(value: Any) -> float:
+    """Convertit un horodatage de l'API ("12.5", 12.5, None) en secondes."""
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class TranscriptWindow:
+    """
+    Vue sur une plage de segments d'une transcription (sans copie du texte).
+    Le texte n'est extrait qu'à l'accès à .text.
+    """
+    __slots__ = ("transcript", "first", "last")
+
+    def __init__(self, transcript: "Transcript", first: int, last: int):
+        self.transcript = transcript
+        self.first = first
+        self.last = last  # exclu
+
+    def __len__(self) -> int:
+        return max(0, self.last - self.first)
+
+    @property
+    def start(self) -> float:
+        """Début de la fenêtre (secondes)."""
+        return self.transcript.starts[self.first] if len(self) else 0.0
+
+    @property
+    def end(self) -> float:
+        """Fin de la fenêtre (secondes)."""
+        if not len(self):
+            return 0.0
+        last = self.last - 1
+        return self.transcript.starts[last] + self.transcript.durations[last]
+
+    @property
+    def char_span(self) -> Tuple[int, int]:
+        """Positions (début, fin) de la fenêtre dans le texte partagé."""
+        offsets = self.transcript.offsets
+        if not len(self):
+            return 0, 0
+        return offsets[self.first], offsets[self.last] - 1
+
+    @property
+    def text(self) -> str:
+        start, end = self.char_span
+        return self.transcript.text[start:end]
+
+    def __str__(self) -> str:
+        return self.text
+
+
+class Transcript:
+    """
+    Transcription d'une vidéo : texte complet + segments horodatés optionnels.
+
+    - text : texte complet (segments séparés par une espace)
+    - starts / durations : début et durée de chaque segment, en secondes (array 'd')
+    - offsets : position de chaque segment dans text (array 'I', n + 1 valeurs) ;
+      le segment i est text[offsets[i]:offsets[i + 1] - 1]
+    """
+    __slots__ = ("text", "starts", "durations", "offsets", "language")
+
+    def __init__(self, text: str, starts: Optional[array] = None, durations: Optional[array] = None,
+                 offsets: Optional[array] = None, language: Optional[str] = None):
+        self.text = text
+        self.starts = starts if starts is not None else array("d")
+        self.durations = durations if durations is not None else array("d")
+        self.offsets = offsets if offsets is not None else array("I", [0])
+        self.language = language
+
+    @classmethod
+    def from_text(cls, text: str, language: Optional[str] = None) -> "Transcript":
+        """Transcription sans horodatage (champ "text" de l'API)."""
+        return cls(text, language=language)
+
+    @classmethod
+    def from_segments(cls, entries: Iterable[Dict[str, Any]], language: Optional[str] = None) -> "Transcript":
+        """
+        Construit la transcription depuis les segments de l'API
+        ({"text": ..., "start": ..., "dur": ...}).
+        """
+        starts = array("d")
+        durations = array("d")
+        offsets = array("I", [0])
+        parts = []
+        position = 0
+        for entry in entries:
+            segment = entry.get("text", "") or ""
+            parts.append(segment)
+            starts.append(_to_float(entry.get("start")))
+            durations.append(_to_float(entry.get("dur", entry.get("duration"))))
+            position += len(segment) + 1
+            offsets.append(position)
+        return cls(" ".join(parts), starts, durations, offsets, language)
+
+    def __len__(self) -> int:
+        """Nombre de segments horodatés."""
+        return len(self.starts)
+
+    @property
+    def has_timing(self) -> bool:
+        return len(self.starts) > 0
+
+    @property
+    def duration(self) -> float:
+        """Durée couverte par la transcription (secondes)."""
+        if not self.has_timing:
+            return 0.0
+        return self.starts[-1] + self.durations[-1]
+
+    def segment(self, index: int) -> Tuple[float, float, str]:
+        """Retourne (début, durée, texte) du segment `index`."""
+        return (
+            self.starts[index],
+            self.durations[index],
+            self.text[self.offsets[index]:self.offsets[index + 1] - 1],
+        )
+
+    def segments(self) -> Iterator[Tuple[float, float, str]]:
+        for index in range(len(self)):
+            yield self.segment(index)
+
+    def window(self, start: float, end: float) -> TranscriptWindow:
+        """
+        Segments qui commencent entre `start` et `end` secondes.
+
+        Args:
+            start: Début de la plage (secondes)
+            end: Fin de la plage (secondes)
+
+        Returns:
+            Une vue sur les segments (vide si la transcription n'est pas horodatée)
+        """
+        first = bisect_left(self.starts, start)
+        last = bisect_right(self.starts, end)
+        return TranscriptWindow(self, first, max(first, last))
+
+    def first_minutes(self, minutes: float) -> TranscriptWindow:
+        """Les `minutes` premières minutes de la vidéo (l'accroche)."""
+        return self.window(0.0, minutes * 60)
+
+    def around_keyword(self, keyword: str, radius: float = 60.0) -> Optional[TranscriptWindow]:
+        """
+        Le passage autour de la première occurrence d'un mot-clé.
+
+        Args:
+            keyword: Mot ou expression recherchée (insensible à la casse)
+            radius: Secondes gardées avant et après l'occurrence
+
+        Returns:
+            La fenêtre autour du mot-clé, ou None s'il est absent ou sans horodatage
+        """
+        if not self.has_timing or not keyword:
+            return None
+        position = self.text.lower().find(keyword.lower())
+        if position < 0:
+            return None
+        index = bisect_right(self.offsets, position) - 1
+        index = min(max(index, 0), len(self) - 1)
+        moment = self.starts[index]
+        return self.window(max(0.0, moment - radius), moment + radius)
+
+    def to_bytes(self) -> bytes:
+        """Sérialisation compacte (pour le cache)."""
+        language = (self.language or "").encode("utf-8")
+        arrays = [self.starts, self.durations, self.offsets]
+        if sys.byteorder == "big":
+            arrays = [array(a.typecode, a) for a in arrays]
+            for a in arrays:
+                a.byteswap()
+        return b"".join([
+            _HEADER.pack(_MAGIC, len(self.starts), len(language)),
+            language,
+            *(a.tobytes() for a in arrays),
+            self.text.encode("utf-8"),
+        ])
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Transcript":
+        """
+        Désérialise une transcription. Les anciennes entrées de cache (texte UTF-8 brut)
+        sont acceptées et donnent une transcription sans horodatage.
+        """
+        if not data.startswith(_MAGIC):
+            return cls.from_text(data.decode("utf-8"))
+
+        _, count, language_length = _HEADER.unpack_from(data)
+        position = _HEADER.size
+        language = data[position:position + language_length].decode("utf-8") or None
+        position += language_length
+
+        arrays = []
+        for typecode, length in (("d", count), ("d", count), ("I", count + 1)):
+            values = array(typecode)
+            size = values.itemsize * length
+            values.frombytes(data[position:position + size])
+            if sys.byteorder == "big":
+                values.byteswap()
+            arrays.append(values)
+            position += size
+
+        text = data[position:].decode("utf-8")
+        return cls(text, arrays[0], arrays[1], arrays[2], language)
+
+    def __str__(self) -> str:
+        return self.text
@@ -0,0 +1,254 @@
+"""
+Score Word Balance calculé localement (sans appel à Claude)
+Reprend la grille de prompts/system_prompt.txt : part de mots communs, peu communs et
+émotionnels, présence d'un mot de pouvoir, longueur, chiffres/crochets, majuscules et
+emojis. Les titres sont notés par lots : chaque mot n'est classé qu'une fois (lexiques
+normalisés sans accents, table de correspondance mémorisée) : un millier de titres
+candidats se classe en une vingtaine de millisecondes.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Catégories de mots (par ordre de priorité : un mot n'est compté que dans une seule)
+POWER = "power"
+EMOTIONAL = "emotional"
+UNCOMMON = "uncommon"
+COMMON = "common"
+CATEGORIES = (COMMON, UNCOMMON, EMOTIONAL, POWER)
+
+# Mots communs : liants grammaticaux (dont les élisions l', d', qu'...)
+COMMON_WORDS = """
+le la les l un une des de du d au aux à a et ou mais donc car ni que qu qui quoi dont où
+ce cet cette ces c ça ceci cela il elle ils elles on nous vous je j tu me m te t se s y en
+mon ma mes ton ta tes son sa ses notre nos votre vos leur leurs lui eux moi toi
+est sont être était suis es sommes êtes ai as avons avez ont avoir fait faire va vont peut
+dans pour avec sans sur sous par entre chez vers contre depuis pendant avant après
+ne n pas plus moins très trop bien tout tous toute toutes comme si aussi même
+comment pourquoi quand quel quelle quels quelles combien ici là voilà
+""".split()
+
+# Mots peu communs : apportent substance et spécificité
+UNCOMMON_WORDS = """
+révolutionnaire surprenant monde jamais toujours vraiment vrai vraie réalité
+erreur astuce méthode technique preuve meilleur meilleure pire seul seule unique
+vie histoire raison façon fois nouveau nouvelle nouveaux énorme total complet complète
+essentiel essentielle indispensable puissant puissante efficace radical radicale
+impossible incontournable ultra mythe piège arnaque solution problème changer transformer
+""".split()
+
+# Mots émotionnels, par registre
+EMOTIONAL_WORDS = {
+    "peur": "choquant choquante dangereux dangereuse terrifiant terrifiante alarme alarmant "
+            "attention danger peur horrible effrayant effrayante catastrophe désastre",
+    "joie": "génial géniale extraordinaire merveilleux merveilleuse magnifique "
+            "fantastique sublime parfait parfaite bonheur",
+    "surprise": "inattendu inattendue stupéfiant stupéfiante incroyable fou folle dingue "
+                "hallucinant hallucinante surprise choc",
+    "urgence": "maintenant immédiat immédiate immédiatement urgent urgente vite dernière",
+}
+
+# Mots de pouvoir, par registre (les expressions de plusieurs mots sont cherchées à part)
+POWER_WORDS = {
+    "exclusivité": "secret secrète secrets caché cachée interdit interdite révélé révélée révéler "
+                   "confidentiel confidentielle exclusif exclusive inédit inédite",
+    "autorité": "prouvé prouvée scientifique scientifiquement expert experte ultime définitif "
+                "définitive officiel officielle professionnel",
+    "bénéfice": "gratuit gratuite gratuitement facile facilement simple simplement rapide "
+                "rapidement garanti garantie économiser gagner",
+    "curiosité": "découvrez découvrir découverte voici enfin vérité",
+}
+POWER_PHRASES = ("personne ne", "tout le monde", "avant qu il soit trop tard")
+
+# Répartition visée (en % des mots) et tolérance : un écart de TOLERANCE points donne 0
+TARGETS = {COMMON: (20.0, 30.0), UNCOMMON: (10.0, 20.0), EMOTIONAL: (10.0, 15.0)}
+TOLERANCE = 20.0
+
+# Longueur : 50-70 caractères optimal (affichage mobile complet), 100 maximum (limite YouTube)
+OPTIMAL_LENGTH = (50, 70)
+MAX_LENGTH = 100
+
+# Poids de chaque critère dans la note sur 10 (somme = 1)
+WEIGHTS = {COMMON: 0.15, UNCOMMON: 0.15, EMOTIONAL: 0.15, POWER: 0.25, "length": 0.2, "specificity": 0.1}
+
+# Pénalités retirées de la note
+CAPS_PENALTY = 1.5        # plus d'un mot en majuscules
+EMOJI_PENALTY = 1.0       # plus de 2 emojis
+PUNCTUATION_PENALTY = 0.5  # "!!!", "???"
+
+_WORD = re.compile(r"[^\W\d_]+", re.UNICODE)
+_NUMBER = re.compile(r"\d")
+_BRACKETS = re.compile(r"[\(\[].+?[\)\]]")
+_EMOJI = re.compile("[\U0001F300-\U0001FAFF\u2600-\u27BF\u2B50\u2B55]")
+_REPEATED_PUNCTUATION = re.compile(r"[!?]{2,}")
+
+
+def normalize(text: str) -> str:
+    """Minuscules sans accents (les titres en majuscules perdent souvent leurs accents)."""
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def _build_lexicon() -> Dict[str, Tuple[str, Optional[str]]]:
+    """Table mot normalisé -> (catégorie, registre), la catégorie prioritaire l'emportant."""
+    lexicon: Dict[str, Tuple[str, Optional[str]]] = {}
+    for word in COMMON_WORDS:
+        lexicon[normalize(word)] = (COMMON, None)
+    for word in UNCOMMON_WORDS:
+        lexicon[normalize(word)] = (UNCOMMON, None)
+    for group, words in EMOTIONAL_WORDS.items():
+        for word in words.split():
+            lexicon[normalize(word)] = (EMOTIONAL, group)
+    for group, words in POWER_WORDS.items():
+        for word in words.split():
+            lexicon[normalize(word)] = (POWER, group)
+    return lexicon
+
+
+_LEXICON = _build_lexicon()
+# Expressions de pouvoir indexées par leur premier mot normalisé
+_PHRASES: Dict[str, List[Tuple[str, ...]]] = {}
+for _phrase in POWER_PHRASES:
+    _PHRASES.setdefault(_phrase.split()[0], []).append(tuple(_phrase.split()))
+
+
+@lru_cache(maxsize=65536)
+def classify(word: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Catégorie et registre d'un mot normalisé : forme exacte, sinon sans marque du pluriel
+    ou du féminin (révélés, cachées). (None, None) pour un mot hors lexiques.
+    """
+    entry = _LEXICON.get(word)
+    if entry is None and len(word) > 3:
+        base = word[:-1] if word[-1] in "sx" else word
+        entry = _LEXICON.get(base)
+        if entry is None and base.endswith("e"):
+            entry = _LEXICON.get(base[:-1])
+    return entry or (None, None)
+
+
+@lru_cache(maxsize=65536)
+def _token(word: str) -> Tuple[str, Optional[str], bool]:
+    """Mot tel qu'écrit dans le titre -> (forme normalisée, catégorie, en majuscules ?), mémorisé."""
+    normalized = normalize(word)
+    return normalized, classify(normalized)[0], len(word) > 1 and word.isupper()
+
+
+def _closeness(value: float, low: float, high: float, tolerance: float) -> float:
+    """1 dans l'intervalle [low, high], puis décroît linéairement jusqu'à 0 à `tolerance` d'écart."""
+    if low <= value <= high:
+        return 1.0
+    distance = low - value if value < low else value - high
+    return max(0.0, 1.0 - distance / tolerance)
+
+
+def _length_score(length: int) -> float:
+    """1 entre 50 et 70 caractères, 0,5 à 100, 0 au-delà ; les titres courts perdent progressivement."""
+    low, high = OPTIMAL_LENGTH
+    if length > MAX_LENGTH:
+        return 0.0
+    if length > high:
+        return 1.0 - 0.5 * (length - high) / (MAX_LENGTH - high)
+    if length < low:
+        return max(0.0, (length - 20) / (low - 20))
+    return 1.0
+
+
+def score_title(title: str) -> Dict[str, Any]:
+    """
+    Note Word Balance d'un titre.
+
+    Returns:
+        Dict avec 'title', 'score' (sur 10), 'word_balance' (% de mots communs, peu communs,
+        émotionnels et de pouvoir), 'power_words', 'emotional_words', 'length' (caractères)
+        et 'issues' (règles non respectées)
+    """
+    words = _WORD.findall(title)
+    counts = dict.fromkeys(CATEGORIES, 0)
+    power_words: List[str] = []
+    emotional_words: List[str] = []
+    caps_words = 0
+    tokens = [_token(word) for word in words]
+    for position, (normalized, category, is_caps) in enumerate(tokens):
+        if category is not None:
+            counts[category] += 1
+            if category == POWER:
+                power_words.append(words[position])
+            elif category == EMOTIONAL:
+                emotional_words.append(words[position])
+        caps_words += is_caps
+        for phrase in _PHRASES.get(normalized, ()):
+            if tuple(token[0] for token in tokens[position:position + len(phrase)]) == phrase:
+                counts[POWER] += 1
+                power_words.append(" ".join(words[position:position + len(phrase)]))
+
+    total = max(1, len(words))
+    balance = {category: round(100.0 * counts[category] / total, 1) for category in CATEGORIES}
+    length = len(title)
+    emojis = 0 if title.isascii() else len(_EMOJI.findall(title))
+
+    parts = {category: _closeness(balance[category], low, high, TOLERANCE)
+             for category, (low, high) in TARGETS.items()}
+    parts[POWER] = 1.0 if counts[POWER] else 0.0
+    parts["length"] = _length_score(length)
+    if _NUMBER.search(title) or _BRACKETS.search(title):
+        parts["specificity"] = 1.0
+    else:
+        parts["specificity"] = 0.5 if "?" in title else 0.0
+    score = 10.0 * sum(WEIGHTS[name] * value for name, value in parts.items())
+
+    issues = []
+    if not counts[POWER]:
+        issues.append("Aucun mot de pouvoir")
+    if length > MAX_LENGTH:
+        issues.append(f"Trop long ({length} caractères, maximum {MAX_LENGTH})")
+    if caps_words > 1:
+        score -= CAPS_PENALTY
+        issues.append("Plus d'un mot en majuscules")
+    if emojis > 2:
+        score -= EMOJI_PENALTY
+        issues.append("Trop d'emojis")
+    if ("!" in title or "?" in title) and _REPEATED_PUNCTUATION.search(title):
+        score -= PUNCTUATION_PENALTY
+        issues.append("Ponctuation excessive")
+
+    return {
+        "title": title,
+        "score": round(min(10.0, max(0.0, score)), 1),
+        "word_balance": balance,
+        "power_words": power_words,
+        "emotional_words": emotional_words,
+        "length": length,
+        "issues": issues,
+    }
+
+
+def score_titles(titles: Iterable[str]) -> List[Dict[str, Any]]:
+    """Note une liste de titres (même format que score_title), dans l'ordre reçu."""
+    return [score_title(title) for title in titles]
+
+
+def rerank(titles: Sequence[str], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Classe des titres candidats par note Word Balance décroissante (à note égale, l'ordre
+    d'origine est conservé) et écarte les doublons (mêmes mots, à la casse et aux accents près).
+
+    Args:
+        titles: Titres candidats
+        limit: Nombre de titres à garder (None = tous)
+
+    Returns:
+        Les notes des titres retenus (format de score_title), de la meilleure à la moins bonne
+    """
+    seen = set()
+    unique = []
+    for title in titles:
+        key = " ".join(_WORD.findall(normalize(title)))
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(title)
+    ranked = sorted(score_titles(unique), key=lambda scored: -scored["score"])
+    return ranked if limit is None else ranked[:limit]
@@ -2,27 +2,70 @@
 Module pour récupérer les transcriptions YouTube via l'API youtube-transcript.io
 API fiable et rapide qui fonctionne partout (y compris Streamlit Cloud)
 """
-import sys
-import requests
+import asyncio
 import re
-from typing import Optional
+import json
+from typing import Optional, List, Dict, Any, Iterable, Sequence, Tuple
+from concurrent.futures import ThreadPoolExecutor
 import time
 import os
-from dotenv import load_dotenv
+
+from cache import (
+    cache_get, cache_get_async, cache_set_many_async, get_transcript_cache, record_cache_miss,
+    transcript_cache_key, transcript_tracks_key
+)
+from clients import get_http_session, get_async_http_client, HTTP_TIMEOUT
+from config import load_env
+from circuit import create_circuit_breaker
+from logging_config import get_logger
+from metrics import STAGE_SECONDS, UPSTREAM_RESPONSES, UPSTREAM_RETRIES
+from ratelimit import create_rate_limiter, parse_retry_after
+from singleflight import get_single_flight
+from transcript import Transcript
 
 # Charger les variables d'environnement
-load_dotenv()
+load_env()
+
+logger = get_logger("youtube_api")
+
+# URL de l'API youtube-transcript.io (YOUTUBE_TRANSCRIPT_API_URL : serveur local de test ou benchmark)
+TRANSCRIPT_API_URL = os.getenv("YOUTUBE_TRANSCRIPT_API_URL") or "https://www.youtube-transcript.io/api/transcripts"
+
+# Nombre maximum d'IDs acceptés par l'API dans une seule requête
+MAX_IDS_PER_REQUEST = 50
+
+# Langues préférées par défaut, par ordre (ex: "fr,en") ; vide = piste par défaut de la vidéo
+DEFAULT_LANGUAGES = [language.strip() for language in os.getenv("TRANSCRIPT_LANGUAGES", "").split(",") if language.strip()]
+
+# Noms de langues renvoyés par l'API -> codes courts
+LANGUAGE_NAMES = {
+    "french": "fr", "français": "fr", "francais": "fr",
+    "english": "en", "anglais": "en",
+    "spanish": "es", "español": "es", "espagnol": "es",
+    "german": "de", "deutsch": "de", "allemand": "de",
+    "italian": "it", "italiano": "it", "italien": "it",
+    "portuguese": "pt", "português": "pt", "portugais": "pt",
+    "dutch": "nl", "arabic": "ar", "arabe": "ar",
+    "japanese": "ja", "chinese": "zh", "russian": "ru", "korean": "ko",
+}
 
-# Configuration de l'encodage UTF-8 pour Windows
-if sys.platform == 'win32' and hasattr(sys.stdout, 'buffer'):
-    try:
-        import io
-        if sys.stdout.encoding != 'utf-8':
-            sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
-        if sys.stderr.encoding != 'utf-8':
-            sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
-    except:
-        pass
+# Résultat d'une récupération : (transcription retenue, erreur)
+TranscriptResult = tuple[Optional[Transcript], Optional[str]]
+
+# Pistes d'une vidéo {langue: transcription}, la piste par défaut en premier
+TranscriptTracks = Dict[Optional[str], Transcript]
+TracksResult = tuple[Optional[TranscriptTracks], Optional[str]]
+
+# Regroupe les récupérations simultanées d'une même vidéo
+_transcript_flight = get_single_flight("transcript")
+
+# Débit vers youtube-transcript.io (YOUTUBE_TRANSCRIPT_RPS / _BURST), illimité par défaut comme
+# pour Anthropic : un 429 suspend les appels (Retry-After) et ralentit le débit s'il est réglé
+_rate_limiter = create_rate_limiter("youtube", "YOUTUBE_TRANSCRIPT")
+
+# Disjoncteur : après 5 échecs consécutifs (panne, timeout, 5xx), les appels échouent
+# immédiatement pendant 30 s (YOUTUBE_TRANSCRIPT_CIRCUIT_FAILURES / _CIRCUIT_RESET)
+_circuit = create_circuit_breaker("youtube", "YOUTUBE_TRANSCRIPT")
 
 
 def extract_video_id(youtube_url: str) -> Optional[str]:
@@ -45,181 +88,714 @@ def extract_video_id(youtube_url: str) -> Optional[str]:
         r'youtube\.com\/watch\?.*?v=([a-zA-Z0-9_-]{11})',
     ]
 
-    for pattern in patterns:
-        match = re.search(pattern, youtube_url)
-        if match:
-            return match.group(1)
+    with STAGE_SECONDS.time(stage="url_parse"):
+        for pattern in patterns:
+            match = re.search(pattern, youtube_url)
+            if match:
+                return match.group(1)
 
     return None
 
 
-def get_transcript(video_id: str, api_token: Optional[str] = None, retries: int = 3) -> tuple[Optional[str], Optional[str]]:
+def get_transcript(video_id: str, api_token: Optional[str] = None, retries: int = 3,
+                   use_cache: bool = True,
+                   languages: Optional[Sequence[str]] = None) -> tuple[Optional[str], Optional[str]]:
     """
     Récupère la transcription d'une vidéo YouTube via l'API youtube-transcript.io
     API fiable qui fonctionne partout, y compris sur Streamlit Cloud
 
+    Les transcriptions déjà récupérées sont servies depuis le cache (mémoire puis disque)
+    sans rappeler l'API. Voir cache.py pour la configuration (TTL, taille max).
+    Toutes les pistes renvoyées par l'API sont mises en cache : demander ensuite une
+    autre langue de la même vidéo ne refait pas d'appel.
+
     Args:
         video_id: L'ID de la vidéo YouTube
         api_token: Token API youtube-transcript.io (ou None pour utiliser l'env var)
         retries: Nombre de tentatives en cas d'échec
+        use_cache: Lire et alimenter le cache des transcriptions (par défaut True)
+        languages: Langues préférées par ordre (ex: ["fr", "en"]) ; à défaut la piste
+            par défaut de la vidéo. None = variable TRANSCRIPT_LANGUAGES
 
     Returns:
         Un tuple (transcription, erreur) - transcription est le texte ou None,
         erreur est le message d'erreur ou None si succès
     """
+    return _as_text(get_timed_transcript(video_id, api_token, retries, use_cache, languages))
+
+
+async def get_transcript_async(video_id: str, api_token: Optional[str] = None, retries: int = 3,
+                               use_cache: bool = True,
+                               languages: Optional[Sequence[str]] = None) -> tuple[Optional[str], Optional[str]]:
+    """
+    Version asynchrone de get_transcript (même cache, mêmes messages d'erreur).
+    À utiliser depuis l'API FastAPI pour ne pas bloquer la boucle d'événements.
+    """
+    return _as_text(await get_timed_transcript_async(video_id, api_token, retries, use_cache, languages))
+
+
+def get_timed_transcript(video_id: str, api_token: Optional[str] = None, retries: int = 3,
+                         use_cache: bool = True,
+                         languages: Optional[Sequence[str]] = None) -> tuple[Optional[Transcript], Optional[str]]:
+    """
+    Comme get_transcript, mais retourne un objet Transcript qui conserve les segments
+    horodatés (quand l'API les fournit) : transcript.first_minutes(3) ou
+    transcript.around_keyword("mot") donnent un extrait sans copier le texte.
+    transcript.language indique la langue de la piste retenue.
+
+    Returns:
+        Un tuple (transcription, erreur) - transcription est un Transcript ou None,
+        erreur est le message d'erreur ou None si succès
+    """
+    with STAGE_SECONDS.time(stage="transcript_fetch"):
+        languages = _preferred_languages(languages)
+        cache = get_transcript_cache() if use_cache else None
+
+        if cache is not None:
+            transcript = _cached_transcript(cache, video_id, languages)
+            if transcript is not None:
+                return transcript, None
+
+        # Les appels simultanés pour la même vidéo partagent une seule requête HTTP
+        tracks, error = _transcript_flight.do(
+            (video_id, api_token),
+            lambda: _fetch_and_cache(video_id, api_token, retries, cache)
+        )
+
+        return _select_transcript(tracks, error, languages)
+
+
+async def get_timed_transcript_async(video_id: str, api_token: Optional[str] = None, retries: int = 3,
+                                     use_cache: bool = True,
+                                     languages: Optional[Sequence[str]] = None) -> tuple[Optional[Transcript], Optional[str]]:
+    """Version asynchrone de get_timed_transcript."""
+    with STAGE_SECONDS.time(stage="transcript_fetch"):
+        languages = _preferred_languages(languages)
+        cache = get_transcript_cache() if use_cache else None
+
+        if cache is not None:
+            transcript = await _cached_transcript_async(cache, video_id, languages)
+            if transcript is not None:
+                return transcript, None
+
+        tracks, error = await _transcript_flight.do_async(
+            (video_id, api_token),
+            lambda: _fetch_and_cache_async(video_id, api_token, retries, cache)
+        )
+
+        return _select_transcript(tracks, error, languages)
+
+
+def get_transcripts(video_ids: Iterable[str], api_token: Optional[str] = None, retries: int = 3,
+                    use_cache: bool = True, chunk_size: int = MAX_IDS_PER_REQUEST,
+                    max_workers: int = 4,
+                    languages: Optional[Sequence[str]] = None) -> Dict[str, tuple[Optional[str], Optional[str]]]:
+    """
+    Récupère les transcriptions de plusieurs vidéos en regroupant les IDs.
+
+    L'API youtube-transcript.io accepte une liste d'IDs et renvoie un objet par vidéo :
+    les IDs absents du cache sont envoyés par paquets de chunk_size, avec au plus
+    max_workers requêtes HTTP en parallèle.
+
+    Args:
+        video_ids: Les IDs des vidéos YouTube (les doublons sont ignorés)
+        api_token: Token API youtube-transcript.io (ou None pour utiliser l'env var)
+        retries: Nombre de tentatives par requête en cas d'échec
+        use_cache: Lire et alimenter le cache des transcriptions (par défaut True)
+        chunk_size: Nombre maximum d'IDs par requête HTTP
+        max_workers: Nombre maximum de requêtes HTTP simultanées
+        languages: Langues préférées par ordre, appliquées à toutes les vidéos
+
+    Returns:
+        Dict {video_id: (transcription, erreur)} dans l'ordre des IDs fournis
+    """
+    unique_ids = list(dict.fromkeys(video_ids))
+    languages = _preferred_languages(languages)
+    cache = get_transcript_cache() if use_cache else None
+
+    # Étape 1 : servir ce qui est déjà en cache
+    results, missing = _split_cached(unique_ids, cache, languages)
+
+    # Étape 2 : récupérer le reste par paquets, en parallèle
+    if missing:
+        chunk_size = max(1, min(chunk_size, MAX_IDS_PER_REQUEST))
+        chunks = [missing[i:i + chunk_size] for i in range(0, len(missing), chunk_size)]
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as executor:
+            for chunk_results in executor.map(lambda chunk: _fetch_transcripts(chunk, api_token, retries), chunks):
+                _store_results(chunk_results, results, cache, languages)
+
+    return {video_id: _as_text(results[video_id]) for video_id in unique_ids}
+
+
+async def get_transcripts_async(video_ids: Iterable[str], api_token: Optional[str] = None, retries: int = 3,
+                                use_cache: bool = True, chunk_size: int = MAX_IDS_PER_REQUEST,
+                                max_concurrency: int = 4,
+                                languages: Optional[Sequence[str]] = None) -> Dict[str, tuple[Optional[str], Optional[str]]]:
+    """
+    Version asynchrone de get_transcripts : les paquets d'IDs sont envoyés avec au
+    plus max_concurrency requêtes HTTP simultanées, sans bloquer la boucle d'événements.
+
+    Returns:
+        Dict {video_id: (transcription, erreur)} dans l'ordre des IDs fournis
+    """
+    unique_ids = list(dict.fromkeys(video_ids))
+    languages = _preferred_languages(languages)
+    cache = get_transcript_cache() if use_cache else None
+    results, missing = await _split_cached_async(unique_ids, cache, languages)
+
+    if missing:
+        chunk_size = max(1, min(chunk_size, MAX_IDS_PER_REQUEST))
+        chunks = [missing[i:i + chunk_size] for i in range(0, len(missing), chunk_size)]
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def fetch_chunk(chunk: List[str]) -> Dict[str, TracksResult]:
+            async with semaphore:
+                return await _fetch_transcripts_async(chunk, api_token, retries)
+
+        for chunk_results in await asyncio.gather(*(fetch_chunk(chunk) for chunk in chunks)):
+            await _store_results_async(chunk_results, results, cache, languages)
+
+    return {video_id: _as_text(results[video_id]) for video_id in unique_ids}
+
+
+def _as_text(result: TranscriptResult) -> tuple[Optional[str], Optional[str]]:
+    """Convertit un résultat (Transcript, erreur) en (texte, erreur)."""
+    transcript, error = result
+    return (transcript.text if transcript is not None else None), error
+
+
+def _normalize_language(value: Optional[str]) -> Optional[str]:
+    """
+    Ramène une langue à un code court : "fr-FR" -> "fr", "French (auto-generated)" -> "fr".
+    Les noms inconnus sont gardés en minuscules.
+    """
+    if not value:
+        return None
+    name = re.sub(r"\(.*?\)", "", str(value)).strip().lower()
+    if name in LANGUAGE_NAMES:
+        return LANGUAGE_NAMES[name]
+    return re.split(r"[-_]", name)[0] or None
+
+
+def _preferred_languages(languages: Optional[Sequence[str]]) -> List[str]:
+    """Liste des langues préférées normalisées (TRANSCRIPT_LANGUAGES par défaut)."""
+    if languages is None:
+        languages = DEFAULT_LANGUAGES
+    normalized = (_normalize_language(language) for language in languages)
+    return list(dict.fromkeys(language for language in normalized if language))
+
+
+def _select_language(available: List[Optional[str]], languages: List[str]) -> Optional[str]:
+    """Première langue préférée disponible, sinon la piste par défaut (la première)."""
+    for language in languages:
+        if language in available:
+            return language
+    return available[0]
+
+
+def _select_transcript(tracks: Optional[TranscriptTracks], error: Optional[str],
+                       languages: List[str]) -> TranscriptResult:
+    """Choisit la piste à retourner parmi celles renvoyées par l'API."""
+    if not tracks:
+        return None, error
+    return tracks[_select_language(list(tracks), languages)], None
+
+
+def _cached_transcript(cache: Any, video_id: str, languages: List[str]) -> Optional[Transcript]:
+    """
+    Cherche la transcription dans le cache : l'index des pistes indique les langues
+    disponibles pour la vidéo, ce qui évite un appel à l'API pour une langue absente.
+    Seule la lecture de la piste compte dans les stats du cache (une recherche = un hit ou un miss).
+    """
+    key = _cached_track_key(cache_get(cache, transcript_tracks_key(video_id), count=False), video_id, languages)
+    if key is None:
+        record_cache_miss(cache)
+        return None
+    cached = cache.get(key)
+    return Transcript.from_bytes(cached) if cached is not None else None
+
+
+async def _cached_transcript_async(cache: Any, video_id: str, languages: List[str]) -> Optional[Transcript]:
+    """Version asynchrone de _cached_transcript (lectures disque hors de la boucle d'événements)."""
+    index = await cache_get_async(cache, transcript_tracks_key(video_id), count=False)
+    key = _cached_track_key(index, video_id, languages)
+    if key is None:
+        record_cache_miss(cache)
+        return None
+    cached = await cache_get_async(cache, key)
+    return Transcript.from_bytes(cached) if cached is not None else None
+
+
+def _cached_track_key(index: Optional[bytes], video_id: str, languages: List[str]) -> Optional[str]:
+    """Clé de la piste à lire d'après l'index des pistes en cache (None = langue inconnue)."""
+    if index is not None:
+        language = _select_language(json.loads(index), languages)
+    elif languages:
+        # Entrée sans index (avant la sélection de langue) : langue inconnue
+        return None
+    else:
+        language = None
+    return transcript_cache_key(video_id, language)
+
+
+def _cache_tracks(cache: Any, video_id: str, tracks: TranscriptTracks) -> None:
+    """Met en cache toutes les pistes d'une vidéo et l'index de leurs langues."""
+    for key, value in _track_entries(video_id, tracks):
+        cache.set(key, value)
+
+
+async def _cache_tracks_async(cache: Any, video_id: str, tracks: TranscriptTracks) -> None:
+    """Version asynchrone de _cache_tracks (écritures disque hors de la boucle d'événements)."""
+    await cache_set_many_async(cache, _track_entries(video_id, tracks))
+
+
+def _track_entries(video_id: str, tracks: TranscriptTracks) -> List[Tuple[str, bytes]]:
+    """Entrées de cache d'une vidéo : une par piste, puis l'index de leurs langues."""
+    entries = [(transcript_cache_key(video_id, language), transcript.to_bytes())
+               for language, transcript in tracks.items()]
+    entries.append((transcript_tracks_key(video_id), json.dumps(list(tracks)).encode("utf-8")))
+    return entries
+
+
+def _fetch_and_cache(video_id: str, api_token: Optional[str], retries: int, cache: Any) -> TracksResult:
+    """Récupère les pistes d'une vidéo auprès de l'API puis les met en cache."""
+    tracks, error = _fetch_transcript(video_id, api_token, retries)
+    if tracks and cache is not None:
+        _cache_tracks(cache, video_id, tracks)
+    return tracks, error
+
+
+async def _fetch_and_cache_async(video_id: str, api_token: Optional[str], retries: int, cache: Any) -> TracksResult:
+    """Version asynchrone de _fetch_and_cache."""
+    results = await _fetch_transcripts_async([video_id], api_token, retries)
+    tracks, error = results[video_id]
+    if tracks and cache is not None:
+        await _cache_tracks_async(cache, video_id, tracks)
+    return tracks, error
+
+
+def _split_cached(video_ids: List[str], cache: Any,
+                  languages: List[str]) -> tuple[Dict[str, TranscriptResult], List[str]]:
+    """Sépare les IDs déjà en cache (résultats) de ceux à récupérer auprès de l'API."""
+    results: Dict[str, TranscriptResult] = {}
+    missing = []
+    for video_id in video_ids:
+        transcript = _cached_transcript(cache, video_id, languages) if cache is not None else None
+        if transcript is not None:
+            results[video_id] = (transcript, None)
+        else:
+            missing.append(video_id)
+    return results, missing
+
+
+async def _split_cached_async(video_ids: List[str], cache: Any,
+                              languages: List[str]) -> tuple[Dict[str, TranscriptResult], List[str]]:
+    """Version asynchrone de _split_cached."""
+    results: Dict[str, TranscriptResult] = {}
+    missing = []
+    for video_id in video_ids:
+        transcript = await _cached_transcript_async(cache, video_id, languages) if cache is not None else None
+        if transcript is not None:
+            results[video_id] = (transcript, None)
+        else:
+            missing.append(video_id)
+    return results, missing
+
+
+def _store_results(chunk_results: Dict[str, TracksResult], results: Dict[str, TranscriptResult],
+                   cache: Any, languages: List[str]) -> None:
+    """Ajoute les résultats d'un paquet et met en cache les pistes obtenues."""
+    for video_id, (tracks, error) in chunk_results.items():
+        results[video_id] = _select_transcript(tracks, error, languages)
+        if tracks and cache is not None:
+            _cache_tracks(cache, video_id, tracks)
+
+
+async def _store_results_async(chunk_results: Dict[str, TracksResult], results: Dict[str, TranscriptResult],
+                               cache: Any, languages: List[str]) -> None:
+    """Version asynchrone de _store_results."""
+    for video_id, (tracks, error) in chunk_results.items():
+        results[video_id] = _select_transcript(tracks, error, languages)
+        if tracks and cache is not None:
+            await _cache_tracks_async(cache, video_id, tracks)
+
+
+def _fetch_transcript(video_id: str, api_token: Optional[str], retries: int) -> TracksResult:
+    """Appelle l'API youtube-transcript.io (sans cache) pour une seule vidéo."""
+    return _fetch_transcripts([video_id], api_token, retries)[video_id]
+
+
+def _fetch_transcripts(video_ids: List[str], api_token: Optional[str],
+                       retries: int) -> Dict[str, TracksResult]:
+    """
+    Appelle l'API youtube-transcript.io (sans cache) pour une liste d'IDs en une seule
+    requête HTTP, avec tentatives multiples. Une erreur HTTP s'applique à tous les IDs,
+    une erreur dans la réponse d'une vidéo ne concerne que cette vidéo.
+    """
     # Récupérer le token API
     if not api_token:
         api_token = os.getenv("YOUTUBE_TRANSCRIPT_API_KEY")
 
     if not api_token:
-        return None, "Token API youtube-transcript.io non configuré. Configurez YOUTUBE_TRANSCRIPT_API_KEY dans .env"
-
-    # URL de l'API
-    api_url = "https://www.youtube-transcript.io/api/transcripts"
+        return _fail_all(video_ids, "Token API youtube-transcript.io non configuré. Configurez YOUTUBE_TRANSCRIPT_API_KEY dans .env")
 
     last_error = None
 
     for attempt in range(retries):
+        if attempt:
+            UPSTREAM_RETRIES.inc(upstream="youtube")
+
+        # Service en panne (circuit ouvert) : échec immédiat, sans attendre les timeouts
+        if not _circuit.allow():
+            logger.warning("Circuit youtube ouvert : appel refusé", extra={"video_ids": list(video_ids)})
+            return _fail_all(video_ids, _circuit_open_error())
+
         try:
-            # Préparer la requête
-            headers = {
-                "Authorization": f"Basic {api_token}",
-                "Content-Type": "application/json"
-            }
-
-            payload = {
-                "ids": [video_id]
-            }
-
-            # Faire la requête
-            response = requests.post(
-                api_url,
-                headers=headers,
-                json=payload,
-                timeout=30
+            # Attendre son tour (limiteur partagé), puis faire la requête
+            # (session partagée : connexion keep-alive réutilisée)
+            _rate_limiter.acquire()
+            response = get_http_session().post(
+                TRANSCRIPT_API_URL,
+                headers=_request_headers(api_token),
+                json={"ids": list(video_ids)},
+                timeout=HTTP_TIMEOUT
             )
 
-            # Gérer les erreurs HTTP
-            if response.status_code == 401:
-                return None, "Token API invalide. Vérifiez votre YOUTUBE_TRANSCRIPT_API_TOKEN dans .env"
-
-            elif response.status_code == 429:
-                # Rate limit dépassé
-                retry_after = response.headers.get('Retry-After', '10')
-                if attempt < retries - 1:
-                    time.sleep(int(retry_after))
-                    continue
-                return None, f"Trop de requêtes. Réessayez dans {retry_after} secondes."
-
-            elif response.status_code == 404:
-                return None, "Vidéo introuvable ou transcription non disponible."
-
-            elif response.status_code != 200:
-                last_error = f"Erreur HTTP {response.status_code}: {response.text}"
-                if attempt < retries - 1:
-                    time.sleep(2 * (attempt + 1))
-                    continue
-                return None, last_error
-
-            # Parser la réponse JSON
-            data = response.json()
-
-            # L'API retourne un array avec un objet pour chaque video ID
-            if not data or len(data) == 0:
-                return None, "Aucune transcription trouvée pour cette vidéo."
-
-            video_data = data[0]
-
-            # Vérifier s'il y a une erreur
-            if "error" in video_data:
-                return None, f"Erreur API: {video_data['error']}"
-
-            # L'API retourne la transcription de deux façons :
-            # 1. Un champ "text" avec la transcription complète (simple)
-            # 2. Un champ "tracks" avec les segments détaillés (avec timestamps)
-
-            # Méthode 1 : Utiliser le champ "text" (plus simple et direct)
-            if "text" in video_data and video_data["text"]:
-                full_text = video_data["text"]
-                return full_text, None
-
-            # Méthode 2 : Si "text" n'existe pas, utiliser "tracks"
-            if "tracks" in video_data and len(video_data["tracks"]) > 0:
-                # Prendre le premier track (généralement en anglais ou langue principale)
-                track = video_data["tracks"][0]
-                if "transcript" in track:
-                    transcript_entries = track["transcript"]
-                    # Combiner tous les segments
-                    full_text = " ".join([entry.get("text", "") for entry in transcript_entries])
-                    if full_text.strip():
-                        return full_text, None
-
-            # Si aucune méthode ne fonctionne
-            return None, "Transcription non disponible pour cette vidéo."
-
-        except requests.exceptions.Timeout:
-            last_error = "Timeout: La requête a pris trop de temps."
-            if attempt < retries - 1:
-                time.sleep(2 * (attempt + 1))
-                continue
+            results, retry_delay, last_error = _handle_response(video_ids, response, attempt, retries)
+            if results is not None:
+                return results
+            time.sleep(retry_delay)
+            continue
 
-        except requests.exceptions.ConnectionError:
-            last_error = "Erreur de connexion à l'API youtube-transcript.io"
+        except Exception as e:
+            last_error = _describe_exception(e)
+            logger.warning("Échec de l'appel youtube-transcript.io (tentative %d/%d): %s",
+                           attempt + 1, retries, last_error, extra={"video_ids": list(video_ids)})
+            if _is_network_error(e):
+                UPSTREAM_RESPONSES.inc(upstream="youtube", status="error")
+                _circuit.record_failure()
             if attempt < retries - 1:
                 time.sleep(2 * (attempt + 1))
                 continue
 
-        except requests.exceptions.RequestException as e:
-            last_error = f"Erreur de requête: {str(e)}"
-            if attempt < retries - 1:
-                time.sleep(2 * (attempt + 1))
-                continue
+    # Si on arrive ici, toutes les tentatives ont échoué
+    return _fail_all(video_ids, _final_error(last_error, retries))
 
-        except (KeyError, ValueError, TypeError) as e:
-            last_error = f"Erreur de parsing de la réponse: {str(e)}"
-            if attempt < retries - 1:
-                time.sleep(2 * (attempt + 1))
-                continue
+
+async def _fetch_transcripts_async(video_ids: List[str], api_token: Optional[str],
+                                   retries: int) -> Dict[str, TracksResult]:
+    """
+    Version asynchrone de _fetch_transcripts : client HTTP httpx et attentes
+    asyncio.sleep, pour ne jamais bloquer la boucle d'événements de l'API.
+    """
+    if not api_token:
+        api_token = os.getenv("YOUTUBE_TRANSCRIPT_API_KEY")
+
+    if not api_token:
+        return _fail_all(video_ids, "Token API youtube-transcript.io non configuré. Configurez YOUTUBE_TRANSCRIPT_API_KEY dans .env")
+
+    last_error = None
+
+    client = get_async_http_client()
+
+    for attempt in range(retries):
+        if attempt:
+            UPSTREAM_RETRIES.inc(upstream="youtube")
+
+        # Service en panne (circuit ouvert) : échec immédiat, sans attendre les timeouts
+        if not _circuit.allow():
+            logger.warning("Circuit youtube ouvert : appel refusé", extra={"video_ids": list(video_ids)})
+            return _fail_all(video_ids, _circuit_open_error())
+
+        try:
+            await _rate_limiter.acquire_async()
+            response = await client.post(
+                TRANSCRIPT_API_URL,
+                headers=_request_headers(api_token),
+                json={"ids": list(video_ids)}
+            )
+
+            results, retry_delay, last_error = _handle_response(video_ids, response, attempt, retries)
+            if results is not None:
+                return results
+            await asyncio.sleep(retry_delay)
+            continue
 
         except Exception as e:
-            last_error = f"Erreur inattendue: {str(e)}"
+            last_error = _describe_exception(e)
+            logger.warning("Échec de l'appel youtube-transcript.io (tentative %d/%d): %s",
+                           attempt + 1, retries, last_error, extra={"video_ids": list(video_ids)})
+            if _is_network_error(e):
+                UPSTREAM_RESPONSES.inc(upstream="youtube", status="error")
+                _circuit.record_failure()
             if attempt < retries - 1:
-                time.sleep(2 * (attempt + 1))
+                await asyncio.sleep(2 * (attempt + 1))
                 continue
 
-    # Si on arrive ici, toutes les tentatives ont échoué
+    return _fail_all(video_ids, _final_error(last_error, retries))
+
+
+def _request_headers(api_token: str) -> Dict[str, str]:
+    """En-têtes HTTP de l'API youtube-transcript.io."""
+    return {
+        "Authorization": f"Basic {api_token}",
+        "Content-Type": "application/json"
+    }
+
+
+def _fail_all(video_ids: List[str], error: str) -> Dict[str, TracksResult]:
+    """Associe la même erreur à tous les IDs d'une requête."""
+    return {video_id: (None, error) for video_id in video_ids}
+
+
+def _circuit_open_error() -> str:
+    """Message d'erreur quand le disjoncteur refuse l'appel."""
+    return (
+        "youtube-transcript.io est temporairement indisponible (plusieurs échecs consécutifs). "
+        f"Réessayez dans {_circuit.retry_in():.0f} secondes."
+    )
+
+
+def _final_error(last_error: Optional[str], retries: int) -> str:
+    """Message d'erreur une fois toutes les tentatives épuisées."""
     if last_error:
-        return None, f"Échec après {retries} tentatives: {last_error}"
-    return None, "Impossible de récupérer la transcription."
+        return f"Échec après {retries} tentatives: {last_error}"
+    return "Impossible de récupérer la transcription."
+
+
+def _handle_response(video_ids: List[str], response: Any, attempt: int,
+                     retries: int) -> tuple[Optional[Dict[str, TracksResult]], float, Optional[str]]:
+    """
+    Interprète une réponse HTTP de l'API (requests.Response ou httpx.Response).
+
+    Returns:
+        Un tuple (résultats, délai, erreur) - résultats est None s'il faut réessayer
+        après `délai` secondes, erreur est le dernier message d'erreur rencontré
+    """
+    UPSTREAM_RESPONSES.inc(upstream="youtube", status=str(response.status_code))
+
+    # Le service répond : seules les erreurs 5xx comptent comme une panne
+    if response.status_code >= 500:
+        _circuit.record_failure()
+    else:
+        _circuit.record_success()
+
+    # Gérer les erreurs HTTP
+    if response.status_code == 401:
+        return _fail_all(video_ids, "Token API invalide. Vérifiez votre YOUTUBE_TRANSCRIPT_API_TOKEN dans .env"), 0, None
+
+    elif response.status_code == 429:
+        # Rate limit dépassé : le limiteur suspend tous les appels pendant Retry-After
+        # et réduit le débit ; la prochaine tentative attendra son tour
+        retry_after = parse_retry_after(response.headers.get('Retry-After'), 10.0)
+        _rate_limiter.record_rate_limited(retry_after)
+        if attempt < retries - 1:
+            return None, 0, None
+        return _fail_all(video_ids, f"Trop de requêtes. Réessayez dans {retry_after:.0f} secondes."), 0, None
+
+    elif response.status_code == 404:
+        return _fail_all(video_ids, "Vidéo introuvable ou transcription non disponible."), 0, None
+
+    elif response.status_code != 200:
+        last_error = f"Erreur HTTP {response.status_code}: {response.text}"
+        if attempt < retries - 1:
+            return None, 2 * (attempt + 1), last_error
+        return _fail_all(video_ids, last_error), 0, last_error
+
+    _rate_limiter.record_success()
+
+    # Parser la réponse JSON
+    data = response.json()
 
+    # L'API retourne un array avec un objet pour chaque video ID
+    if not data or len(data) == 0:
+        return _fail_all(video_ids, "Aucune transcription trouvée pour cette vidéo."), 0, None
 
-def get_transcript_from_url(youtube_url: str) -> tuple[Optional[str], Optional[str]]:
+    return _map_response(video_ids, data), 0, None
+
+
+def _network_errors() -> Dict[str, tuple]:
+    """
+    Classes d'exceptions réseau de requests et httpx, par famille. Importées ici (et non
+    en tête de module) : seuls les clients créés par clients.py chargent ces bibliothèques.
+    """
+    import httpx
+    import requests
+
+    return {
+        "timeout": (requests.exceptions.Timeout, httpx.TimeoutException),
+        "connection": (requests.exceptions.ConnectionError, httpx.ConnectError),
+        "request": (requests.exceptions.RequestException, httpx.HTTPError),
+    }
+
+
+def _is_network_error(e: Exception) -> bool:
+    """True pour une erreur de transport (timeout, connexion, requête) de requests ou httpx."""
+    return isinstance(e, _network_errors()["request"])
+
+
+def _describe_exception(e: Exception) -> str:
+    """Traduit une exception réseau ou de parsing (requests ou httpx) en message d'erreur."""
+    errors = _network_errors()
+    if isinstance(e, errors["timeout"]):
+        return "Timeout: La requête a pris trop de temps."
+    if isinstance(e, errors["connection"]):
+        return "Erreur de connexion à l'API youtube-transcript.io"
+    if isinstance(e, errors["request"]):
+        return f"Erreur de requête: {str(e)}"
+    if isinstance(e, (KeyError, ValueError, TypeError)):
+        return f"Erreur de parsing de la réponse: {str(e)}"
+    return f"Erreur inattendue: {str(e)}"
+
+
+def _map_response(video_ids: List[str], data: List[Dict[str, Any]]) -> Dict[str, TracksResult]:
+    """
+    Associe chaque objet de la réponse à son video ID.
+    L'API renvoie normalement un champ "id" ; à défaut on se fie à l'ordre des IDs envoyés.
+    """
+    by_id: Dict[str, Dict[str, Any]] = {}
+    for position, video_data in enumerate(data):
+        video_id = video_data.get("id") if isinstance(video_data, dict) else None
+        if not video_id and position < len(video_ids):
+            video_id = video_ids[position]
+        if video_id:
+            by_id[video_id] = video_data
+
+    results = {}
+    for video_id in video_ids:
+        video_data = by_id.get(video_id)
+        if video_data is None:
+            results[video_id] = (None, "Aucune transcription trouvée pour cette vidéo.")
+        else:
+            results[video_id] = _parse_video_data(video_data)
+    return results
+
+
+def _track_language(track: Dict[str, Any]) -> Optional[str]:
+    """Code langue d'une piste (champ code si présent, sinon nom de la langue)."""
+    for field in ("languageCode", "language_code", "lang", "code", "language", "name"):
+        if track.get(field):
+            return _normalize_language(track[field])
+    return None
+
+
+def _is_generated(track: Dict[str, Any]) -> bool:
+    """Vrai si la piste est générée automatiquement (sous-titres automatiques)."""
+    if track.get("kind") == "asr":
+        return True
+    if any(track.get(field) for field in ("isGenerated", "is_generated", "autoGenerated", "auto_generated")):
+        return True
+    return "auto" in str(track.get("language", "")).lower()
+
+
+def _parse_video_data(video_data: Dict[str, Any]) -> TracksResult:
+    """
+    Extrait les pistes d'un objet vidéo renvoyé par l'API : une transcription par
+    langue (piste manuelle de préférence à la piste automatique), la piste par
+    défaut (la première renvoyée) en premier.
+    """
+    # Vérifier s'il y a une erreur
+    if "error" in video_data:
+        return None, f"Erreur API: {video_data['error']}"
+
+    # L'API retourne la transcription de deux façons :
+    # 1. Un champ "tracks" avec les segments détaillés (avec timestamps), une piste par langue
+    # 2. Un champ "text" avec la transcription complète (simple)
+
+    # Méthode 1 : les segments horodatés, conservés dans un Transcript compact
+    tracks: TranscriptTracks = {}
+    generated: Dict[Optional[str], bool] = {}
+    for track in video_data.get("tracks") or []:
+        if not isinstance(track, dict) or not track.get("transcript"):
+            continue
+        language = _track_language(track)
+        is_generated = _is_generated(track)
+        # Une piste manuelle remplace une piste automatique de la même langue
+        if language in tracks and (is_generated or not generated[language]):
+            continue
+        transcript = Transcript.from_segments(track["transcript"], language=language)
+        if transcript.text.strip():
+            tracks[language] = transcript
+            generated[language] = is_generated
+    if tracks:
+        return tracks, None
+
+    # Méthode 2 : le champ "text" (sans horodatage ni langue)
+    if "text" in video_data and video_data["text"]:
+        return {None: Transcript.from_text(video_data["text"])}, None
+
+    # Si aucune méthode ne fonctionne
+    return None, "Transcription non disponible pour cette vidéo."
+
+
+def get_transcript_from_url(youtube_url: str,
+                            languages: Optional[Sequence[str]] = None) -> tuple[Optional[str], Optional[str]]:
     """
     Fonction combinée : extrait l'ID et récupère la transcription en une seule étape.
 
     Args:
         youtube_url: L'URL complète de la vidéo YouTube
+        languages: Langues préférées par ordre (ex: ["fr", "en"]), voir get_transcript
+
+    Returns:
+        Un tuple (transcription, erreur) - transcription est le texte ou None,
+        erreur est le message d'erreur ou None si succès
+    """
+    logger.info("🔍 Extraction de l'ID de la vidéo...")
+    video_id = extract_video_id(youtube_url)
+
+    if not video_id:
+        error_msg = "URL YouTube invalide. Formats acceptés: youtube.com/watch?v=..., youtu.be/..., youtube.com/embed/..."
+        logger.warning("❌ %s", error_msg, extra={"youtube_url": youtube_url})
+        return None, error_msg
+
+    logger.info("✅ ID trouvé: %s", video_id, extra={"video_id": video_id})
+    logger.info("📥 Récupération de la transcription...", extra={"video_id": video_id})
+
+    transcript, error = get_timed_transcript(video_id, languages=languages)
+
+    if transcript:
+        language = f", langue: {transcript.language}" if transcript.language else ""
+        logger.info("✅ Transcription récupérée (%d caractères%s)", len(transcript.text), language,
+                    extra={"video_id": video_id, "language": transcript.language})
+    elif error:
+        logger.warning("❌ %s", error, extra={"video_id": video_id})
+
+    return _as_text((transcript, error))
+
+
+async def get_transcript_from_url_async(youtube_url: str,
+                                        languages: Optional[Sequence[str]] = None) -> tuple[Optional[str], Optional[str]]:
+    """
+    Version asynchrone de get_transcript_from_url.
+
+    Args:
+        youtube_url: L'URL complète de la vidéo YouTube
+        languages: Langues préférées par ordre (ex: ["fr", "en"]), voir get_transcript
 
     Returns:
         Un tuple (transcription, erreur) - transcription est le texte ou None,
         erreur est le message d'erreur ou None si succès
     """
-    print(f"🔍 Extraction de l'ID de la vidéo...")
+    logger.info("🔍 Extraction de l'ID de la vidéo...")
     video_id = extract_video_id(youtube_url)
 
     if not video_id:
         error_msg = "URL YouTube invalide. Formats acceptés: youtube.com/watch?v=..., youtu.be/..., youtube.com/embed/..."
-        print(f"❌ {error_msg}")
+        logger.warning("❌ %s", error_msg, extra={"youtube_url": youtube_url})
         return None, error_msg
 
-    print(f"✅ ID trouvé: {video_id}")
-    print(f"📥 Récupération de la transcription...")
+    logger.info("✅ ID trouvé: %s", video_id, extra={"video_id": video_id})
+    logger.info("📥 Récupération de la transcription...", extra={"video_id": video_id})
 
-    transcript, error = get_transcript(video_id)
+    transcript, error = await get_timed_transcript_async(video_id, languages=languages)
 
     if transcript:
-        print(f"✅ Transcription récupérée ({len(transcript)} caractères)")
+        language = f", langue: {transcript.language}" if transcript.language else ""
+        logger.info("✅ Transcription récupérée (%d caractères%s)", len(transcript.text), language,
+                    extra={"video_id": video_id, "language": transcript.language})
     elif error:
-        print(f"❌ {error}")
+        logger.warning("❌ %s", error, extra={"video_id": video_id})
 
-    return transcript, error
+    return _as_text((transcript, error))